@@ -0,0 +1,91 @@
+import argparse
+import subprocess
+import sys
+
+
+DEFAULT_BUDGET_SECONDS = 1.5
+DEFAULT_REPEATS = 5
+
+HEAVY_MODULES = [
+    'IPython',
+    'matplotlib',
+    'seaborn',
+    'scipy.stats',
+    'statsmodels',
+]
+
+_IMPORT_SCRIPT = '''
+import sys
+import time
+
+start = time.perf_counter()
+import burnaby
+elapsed = time.perf_counter() - start
+
+loaded = [m for m in {heavy_modules!r} if m in sys.modules]
+print(elapsed)
+print(','.join(loaded))
+'''
+
+
+def measure_import(python=sys.executable):
+    output = subprocess.run(
+        [python, '-c', _IMPORT_SCRIPT.format(heavy_modules=HEAVY_MODULES)],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout.splitlines()
+
+    elapsed = float(output[0])
+    loaded = [m for m in output[1].split(',') if m] \
+        if len(output) > 1 else []
+
+    return elapsed, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='check that "import burnaby" stays under a time budget'
+    )
+    parser.add_argument(
+        '--budget',
+        type=float,
+        default=DEFAULT_BUDGET_SECONDS,
+        help='maximum allowed import time in seconds'
+    )
+    parser.add_argument(
+        '--repeats',
+        type=int,
+        default=DEFAULT_REPEATS,
+        help='number of fresh interpreters to time, the best run is used'
+    )
+    args = parser.parse_args()
+
+    timings = []
+    loaded = []
+    for _ in range(args.repeats):
+        elapsed, loaded = measure_import()
+        timings.append(elapsed)
+
+    best = min(timings)
+
+    print('import burnaby: best {:.3f}s, worst {:.3f}s, budget {:.3f}s'.format(
+        best,
+        max(timings),
+        args.budget
+    ))
+
+    failed = False
+    if len(loaded) > 0:
+        print('heavy modules loaded at import time: ' + ', '.join(loaded))
+        failed = True
+
+    if best > args.budget:
+        print('import time is over budget')
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
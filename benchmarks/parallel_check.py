@@ -0,0 +1,180 @@
+import argparse
+import sys
+
+import numpy as np
+
+from synthetic import CONTROL_GROUP_NAME
+from synthetic import DATE_COL
+from synthetic import GROUP_COL
+from synthetic import METRIC_KINDS
+from synthetic import SEGMENT_COL
+from synthetic import UNIT_COL
+from synthetic import generate_experiment
+from synthetic import get_metrics_spec
+
+
+DEFAULT_ROWS = 20000
+DEFAULT_UNITS = 4000
+DEFAULT_N_JOBS = 2
+DEFAULT_MISSING_SHARE = 0.01
+
+
+def get_experiment(n_rows, n_units, missing_share, seed=0):
+    data_df = generate_experiment(
+        n_rows,
+        n_units,
+        n_arms=3,
+        seed=seed
+    )
+
+    rng = np.random.default_rng(seed)
+
+    data_df[UNIT_COL] = data_df[UNIT_COL].astype(np.float64)
+    data_df.loc[rng.random(n_rows) < missing_share, UNIT_COL] = np.nan
+
+    return data_df
+
+
+def get_specs(data_df):
+    specs = [get_metrics_spec(metric_kind) for metric_kind in METRIC_KINDS]
+
+    return specs + [
+        dict(
+            get_metrics_spec(metric_kind),
+            name=get_metrics_spec(metric_kind)['name'] + ' masked',
+            mask=data_df['views'] > 3
+        )
+        for metric_kind in METRIC_KINDS
+    ]
+
+
+def calc_results(data_df, specs, n_jobs):
+    from burnaby.ab_manager import ABManager
+
+    manager = ABManager(
+        'parallel check',
+        data_df.copy(),
+        GROUP_COL,
+        DATE_COL,
+        UNIT_COL,
+        control_group_name=CONTROL_GROUP_NAME,
+        aggregations=['*', SEGMENT_COL],
+        headless=True
+    )
+
+    return manager.calc_metrics_batch(specs, silent=True, n_jobs=n_jobs)
+
+
+def _same_values(values, other_values):
+    return values.shape == other_values.shape and np.allclose(
+        values,
+        other_values,
+        equal_nan=True
+    )
+
+
+def get_mismatches(results, parallel_results):
+    from burnaby.result_cache import stats_to_arrays
+
+    parallel_results = {
+        repr(parallel_result): parallel_result
+        for parallel_result in parallel_results
+    }
+
+    mismatches = []
+    for result in results:
+        parallel_result = parallel_results.get(repr(result))
+        if parallel_result is None:
+            mismatches.append(repr(result))
+            continue
+
+        stats = result.get_metrics().get_stats()
+        parallel_stats = parallel_result.get_metrics().get_stats()
+
+        arrays = stats_to_arrays(stats)
+        parallel_arrays = stats_to_arrays(parallel_stats)
+
+        h_df = result.get_test()
+        parallel_h_df = parallel_result.get_test()
+
+        same = stats.get_index().equals(parallel_stats.get_index()) \
+            and arrays.keys() == parallel_arrays.keys() \
+            and all(
+                _same_values(arrays[key], parallel_arrays[key])
+                for key in arrays
+                if arrays[key].dtype.kind in 'fiu'
+            ) \
+            and (h_df is None) == (parallel_h_df is None) \
+            and (h_df is None or _same_values(
+                h_df.to_numpy(dtype=np.float64),
+                parallel_h_df.to_numpy(dtype=np.float64)
+            ))
+
+        if not same:
+            mismatches.append(repr(result))
+
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='check that metrics calculated in parallel equal serial '
+            'ones on data with missing unit ids'
+    )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=DEFAULT_ROWS,
+        help='number of rows of the synthetic experiment'
+    )
+    parser.add_argument(
+        '--units',
+        type=int,
+        default=DEFAULT_UNITS,
+        help='number of units of the synthetic experiment'
+    )
+    parser.add_argument(
+        '--n-jobs',
+        type=int,
+        default=DEFAULT_N_JOBS,
+        help='number of worker processes of the parallel run'
+    )
+    parser.add_argument(
+        '--missing-share',
+        type=float,
+        default=DEFAULT_MISSING_SHARE,
+        help='share of rows with missing unit id'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='seed of the synthetic data generator'
+    )
+    args = parser.parse_args()
+
+    data_df = get_experiment(
+        args.rows,
+        args.units,
+        args.missing_share,
+        seed=args.seed
+    )
+    specs = get_specs(data_df)
+
+    results = calc_results(data_df, specs, None)
+    parallel_results = calc_results(data_df, specs, args.n_jobs)
+
+    mismatches = get_mismatches(results, parallel_results)
+
+    print('{} of {} metrics differ between serial and parallel runs'.format(
+        len(mismatches),
+        len(results)
+    ))
+    for mismatch in mismatches:
+        print('  ' + mismatch)
+
+    return 1 if len(mismatches) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
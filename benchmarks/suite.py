@@ -0,0 +1,373 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from synthetic import CONTROL_GROUP_NAME
+from synthetic import DATE_COL
+from synthetic import GROUP_COL
+from synthetic import METRIC_KINDS
+from synthetic import SEGMENT_COL
+from synthetic import UNIT_COL
+from synthetic import generate_experiment
+from synthetic import get_metrics_spec
+
+
+DEFAULT_REPEATS = 3
+
+RESULTS_FORMAT_VERSION = 1
+
+SCENARIOS = {
+    'small': dict(
+        n_rows=100000,
+        n_units=20000,
+        n_arms=2,
+        n_days=14,
+        segment_cardinality=4
+    ),
+    'many_units': dict(
+        n_rows=1000000,
+        n_units=500000,
+        n_arms=2,
+        n_days=14,
+        segment_cardinality=4
+    ),
+    'many_arms': dict(
+        n_rows=1000000,
+        n_units=100000,
+        n_arms=6,
+        n_days=14,
+        segment_cardinality=4
+    ),
+    'long_period': dict(
+        n_rows=1000000,
+        n_units=100000,
+        n_arms=2,
+        n_days=90,
+        segment_cardinality=4
+    ),
+    'many_segments': dict(
+        n_rows=1000000,
+        n_units=100000,
+        n_arms=2,
+        n_days=14,
+        segment_cardinality=50
+    ),
+}
+
+STAGES = [
+    'construct',
+    'calc_metrics',
+    'metrics_calc',
+    'hypothesis_test',
+    'pvalue_chart_prepare',
+    'report_prepare',
+    'excel_export',
+]
+
+
+def _construct(context):
+    from burnaby.ab_manager import ABManager
+
+    context['manager'] = ABManager(
+        'benchmark',
+        context['data_df'],
+        GROUP_COL,
+        DATE_COL,
+        UNIT_COL,
+        control_group_name=CONTROL_GROUP_NAME,
+        aggregations=['*', SEGMENT_COL],
+        headless=True
+    )
+
+
+def _calc_metrics(context):
+    context['results'] = context['manager'].calc_metrics_batch(
+        [context['spec']],
+        silent=True
+    )
+
+
+def _metrics_calc(context):
+    from burnaby.metrics import Metrics
+
+    spec = context['spec']
+
+    metrics = Metrics(
+        spec['name'],
+        context['manager'].ab_df,
+        continuous_measure_col=spec.get('continuous_measure_col'),
+        continuous_measure_id_col=UNIT_COL,
+        relation_value=CONTROL_GROUP_NAME,
+        nominator_col=spec.get('nominator_col'),
+        denominator_col=spec.get('denominator_col'),
+        is_uniq_id_proportions=spec.get('is_uniq_id_proportions', False),
+        is_ratio=spec.get('is_ratio', False)
+    )
+    metrics.append_grouping([GROUP_COL])
+    metrics.calc()
+
+    context['metrics'] = metrics
+
+
+def _hypothesis_test(context):
+    hypothesis = context['results'][0].get_hypothesis().copy()
+    hypothesis.test(context['metrics'].get_stats())
+
+    context['hypothesis'] = hypothesis
+
+
+def _pvalue_chart_prepare(context):
+    from burnaby.charts.pvalue_chart import PValueChart
+
+    PValueChart(
+        context['metrics'],
+        GROUP_COL,
+        DATE_COL,
+        context['hypothesis']
+    ).prepare()
+
+
+def _report_prepare(context):
+    context['manager'].get_statistics_report()
+
+
+def _excel_export(context):
+    with tempfile.TemporaryDirectory() as dirname:
+        context['manager'].save_report_to_excel(
+            os.path.join(dirname, 'report.xlsx')
+        )
+
+
+_STAGE_FUNCTIONS = {
+    'construct': _construct,
+    'calc_metrics': _calc_metrics,
+    'metrics_calc': _metrics_calc,
+    'hypothesis_test': _hypothesis_test,
+    'pvalue_chart_prepare': _pvalue_chart_prepare,
+    'report_prepare': _report_prepare,
+    'excel_export': _excel_export,
+}
+
+
+def run_pipeline(data_df, spec, trace_memory=False):
+    context = {'data_df': data_df, 'spec': spec}
+    measurements = {}
+
+    for stage in STAGES:
+        gc.collect()
+
+        if trace_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        _STAGE_FUNCTIONS[stage](context)
+        elapsed = time.perf_counter() - start
+
+        peak_bytes = None
+        if trace_memory:
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        measurements[stage] = (elapsed, peak_bytes)
+
+    return measurements
+
+
+def run_scenario(params, metric_kind, repeats=DEFAULT_REPEATS, seed=0):
+    data_df = generate_experiment(seed=seed, **params)
+    spec = get_metrics_spec(metric_kind)
+
+    run_pipeline(data_df, spec)
+
+    timings = {stage: [] for stage in STAGES}
+    for _ in range(repeats):
+        for stage, (elapsed, _) in run_pipeline(data_df, spec).items():
+            timings[stage].append(elapsed)
+
+    peaks = {
+        stage: peak_bytes
+        for stage, (_, peak_bytes) in run_pipeline(
+            data_df,
+            spec,
+            trace_memory=True
+        ).items()
+    }
+
+    return {
+        stage: {
+            'seconds_min': min(timings[stage]),
+            'seconds_median': statistics.median(timings[stage]),
+            'peak_bytes': peaks[stage],
+        }
+        for stage in STAGES
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare_results(results, baseline):
+    baseline_runs = {
+        (run['scenario'], run['metric_kind']): run['stages']
+        for run in baseline['runs']
+    }
+
+    rows = []
+    for run in results['runs']:
+        baseline_stages = baseline_runs.get(
+            (run['scenario'], run['metric_kind'])
+        )
+        if baseline_stages is None:
+            continue
+
+        for stage, stage_result in run['stages'].items():
+            if stage not in baseline_stages:
+                continue
+
+            baseline_result = baseline_stages[stage]
+
+            rows.append({
+                'scenario': run['scenario'],
+                'metric_kind': run['metric_kind'],
+                'stage': stage,
+                'seconds': stage_result['seconds_min'],
+                'baseline_seconds': baseline_result['seconds_min'],
+                'time_ratio': stage_result['seconds_min']
+                    / baseline_result['seconds_min']
+                    if baseline_result['seconds_min'] > 0 else np.nan,
+                'peak_ratio': stage_result['peak_bytes']
+                    / baseline_result['peak_bytes']
+                    if baseline_result['peak_bytes'] else np.nan,
+            })
+
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='time and measure peak memory of the burnaby pipeline '
+            'on synthetic experiments'
+    )
+    parser.add_argument(
+        '--scenario',
+        action='append',
+        choices=sorted(SCENARIOS),
+        help='scenario to run, may be repeated, all scenarios by default'
+    )
+    parser.add_argument(
+        '--metric-kind',
+        action='append',
+        choices=METRIC_KINDS,
+        help='metric kind to run, may be repeated, all kinds by default'
+    )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        help='override number of rows of every scenario'
+    )
+    parser.add_argument(
+        '--repeats',
+        type=int,
+        default=DEFAULT_REPEATS,
+        help='number of timed runs per scenario after a warm-up run, '
+            'the best run is reported'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='seed of the synthetic data generator'
+    )
+    parser.add_argument(
+        '--output',
+        help='path of the json file to write results to'
+    )
+    parser.add_argument(
+        '--compare',
+        help='path of a previous json results file to compare against'
+    )
+    args = parser.parse_args()
+
+    results = {
+        'version': RESULTS_FORMAT_VERSION,
+        'commit': get_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': get_environment(),
+        'runs': [],
+    }
+
+    for scenario in args.scenario or list(SCENARIOS):
+        params = dict(SCENARIOS[scenario])
+        if args.rows is not None:
+            params['n_rows'] = args.rows
+            params['n_units'] = min(params['n_units'], args.rows)
+
+        for metric_kind in args.metric_kind or METRIC_KINDS:
+            stages = run_scenario(
+                params,
+                metric_kind,
+                repeats=args.repeats,
+                seed=args.seed
+            )
+
+            results['runs'].append({
+                'scenario': scenario,
+                'metric_kind': metric_kind,
+                'params': params,
+                'stages': stages,
+            })
+
+            for stage, stage_result in stages.items():
+                print('{:<14} {:<11} {:<21} {:>9.3f}s {:>10.1f}MB'.format(
+                    scenario,
+                    metric_kind,
+                    stage,
+                    stage_result['seconds_min'],
+                    stage_result['peak_bytes'] / 2 ** 20
+                ))
+
+    if args.output is not None:
+        with open(args.output, 'w') as fresults:
+            json.dump(results, fresults, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as fbaseline:
+            baseline = json.load(fbaseline)
+
+        print(compare_results(results, baseline).to_string(index=False))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+
+GROUP_COL = 'group'
+DATE_COL = 'date'
+UNIT_COL = 'user_id'
+SEGMENT_COL = 'segment'
+
+CONTROL_GROUP_NAME = 'control'
+
+METRIC_KIND_CONTINUOUS = 'continuous'
+METRIC_KIND_PROPORTION = 'proportion'
+METRIC_KIND_RATIO = 'ratio'
+
+METRIC_KINDS = [
+    METRIC_KIND_CONTINUOUS,
+    METRIC_KIND_PROPORTION,
+    METRIC_KIND_RATIO,
+]
+
+DEFAULT_START_DATE = '2021-01-01'
+DEFAULT_CONVERSION_RATE = 0.2
+DEFAULT_UPLIFT = 0.02
+
+
+def get_group_names(n_arms):
+    return [CONTROL_GROUP_NAME] + [
+        'test_' + str(arm) for arm in range(1, n_arms)
+    ]
+
+
+def get_metrics_spec(metric_kind):
+    if metric_kind == METRIC_KIND_CONTINUOUS:
+        return dict(
+            name='revenue per user',
+            continuous_measure_col='revenue',
+            hypothesis={'stat_test': 'ttest_welsh'}
+        )
+
+    if metric_kind == METRIC_KIND_PROPORTION:
+        return dict(
+            name='conversion',
+            nominator_col='converted',
+            denominator_col='views',
+            is_uniq_id_proportions=True,
+            hypothesis={'stat_test': 'chisquare'}
+        )
+
+    if metric_kind == METRIC_KIND_RATIO:
+        return dict(
+            name='ctr',
+            nominator_col='clicks',
+            denominator_col='views',
+            is_ratio=True,
+            hypothesis={'stat_test': 'delta'}
+        )
+
+    raise ValueError('unknown metric kind ' + str(metric_kind))
+
+
+def generate_experiment(
+    n_rows,
+    n_units,
+    n_arms=2,
+    n_days=14,
+    segment_cardinality=4,
+    uplift=DEFAULT_UPLIFT,
+    conversion_rate=DEFAULT_CONVERSION_RATE,
+    seed=0
+):
+    if n_arms < 2:
+        raise ValueError('experiment should have at least 2 arms')
+
+    rng = np.random.default_rng(seed)
+
+    unit_arms = rng.integers(0, n_arms, n_units)
+    unit_segments = rng.integers(0, max(segment_cardinality, 1), n_units)
+    unit_activity = rng.gamma(2.0, 0.5, n_units)
+
+    units = rng.integers(0, n_units, n_rows)
+    arms = unit_arms[units]
+    lift = np.where(arms > 0, 1 + uplift, 1.0)
+
+    views = rng.poisson(5 * unit_activity[units]) + 1
+    clicks = rng.binomial(views, np.minimum(0.1 * lift, 1.0))
+    converted = rng.random(n_rows) < conversion_rate * lift
+    revenue = np.where(
+        converted,
+        rng.exponential(50.0, n_rows) * lift,
+        np.nan
+    )
+
+    dates = pd.date_range(DEFAULT_START_DATE, periods=n_days, freq='D')
+    segments = np.array([
+        'segment_' + str(segment)
+        for segment in range(max(segment_cardinality, 1))
+    ])
+
+    return pd.DataFrame({
+        UNIT_COL: units,
+        GROUP_COL: np.array(get_group_names(n_arms))[arms],
+        DATE_COL: dates[rng.integers(0, n_days, n_rows)],
+        SEGMENT_COL: segments[unit_segments[units]],
+        'views': views,
+        'clicks': clicks,
+        'converted': converted.astype(np.int64),
+        'revenue': revenue,
+    })
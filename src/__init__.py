@@ -1,5 +1,14 @@
 from .main import set_ab_test
+from .main import set_ab_test_from_csv
+from .main import set_ab_test_from_parquet
 from .main import validate_ab_test_data
 from .main import calc_metrics
+from .main import calc_metrics_batch
+from .main import append_ab_test_data
+from .main import get_statistics_report
 from .main import print_statistics_report
-from .main import save_report_to_excel
\ No newline at end of file
+from .main import save_report_to_excel
+from .main import save_report_to_parquet
+from .main import save_report_to_jsonl
+from .main import set_memory_budget
+from .main import remove_ab_test
@@ -19,6 +19,7 @@ CONTINUOUS_MEASURE_FORMAT = '{:.3f}'
 STAT_TEST_CHISQUARE = 'chisquare'
 STAT_TEST_TTEST = 'ttest'
 STAT_TEST_TTEST_WELSH = 'ttest_welsh'
+STAT_TEST_DELTA = 'delta'
 
 H_KIND_PROPORTIONS = 'proportions'
 H_KIND_CONTINUOUS = 'continuous'
@@ -27,8 +28,84 @@ H_CONTROL_GROUP_KEY = 'control'
 H_TEST_GROUP_KEY = 'test'
 H_SIGNIFICANCE_KEY = 'significance'
 H_SIGNIFICANCE_LEVEL_KEY = 'sig_level'
+H_CORRECTED_PVALUE_KEY = 'corrected_pvalue'
+H_CORRECTED_SIGNIFICANCE_KEY = 'corrected_significance'
 
 R_AGGREGATION_COL = '_aggregation'
 
 OUTLIERS_GROUPS_TYPE = 'groups'
-OUTLIERS_METRICS_DATA_TYPE = 'metrics data'
\ No newline at end of file
+OUTLIERS_METRICS_DATA_TYPE = 'metrics data'
+OUTLIERS_GROUPS_SKETCH_TYPE = 'groups sketch'
+OUTLIERS_METRICS_DATA_SKETCH_TYPE = 'metrics data sketch'
+DEFAULT_QUANTILE_SKETCH_ERROR = 0.001
+
+FOLDED_POSITIVE_COUNT_SUFFIX = ' > 0'
+FOLDED_TIMESERIES_FREQ = 'D'
+DEFAULT_CHUNK_ROWS = 1000000
+
+DEFAULT_BOOTSTRAP_REPLICATES = 10000
+DEFAULT_BOOTSTRAP_CHUNK_CELLS = 2 ** 24
+DEFAULT_CONFIDENCE_LEVEL = 0.95
+UPLIFT_CI_LOW_KEY = 'ci_low'
+UPLIFT_CI_HIGH_KEY = 'ci_high'
+
+DEFAULT_RESULT_CACHE_MAX_BYTES = 512 * 2 ** 20
+RESULT_CACHE_VERSION = 2
+
+PROFILE_STAGE_COL = 'stage'
+PROFILE_AGGREGATION_COL = 'aggregation'
+PROFILE_METRICS_COL = 'metrics'
+PROFILE_DEPTH_COL = 'depth'
+PROFILE_ROWS_COL = 'rows'
+PROFILE_SECONDS_COL = 'seconds'
+PROFILE_ALLOCATED_BYTES_COL = 'allocated_bytes'
+PROFILE_CALLS_COL = 'calls'
+
+STAGE_VALIDATION = 'validation'
+STAGE_CALC_METRICS = 'calc metrics'
+STAGE_APPEND = 'append'
+STAGE_CACHE = 'result cache'
+STAGE_SLICE = 'slice'
+STAGE_CUBE = 'cube'
+STAGE_METRICS = 'metrics'
+STAGE_PARALLEL_METRICS = 'parallel metrics'
+STAGE_HYPOTHESIS = 'hypothesis'
+STAGE_UPLIFT_CI = 'uplift ci'
+STAGE_RENDER = 'render'
+STAGE_REPORT = 'report'
+STAGE_EXCEL_EXPORT = 'excel export'
+STAGE_COLUMNAR_EXPORT = 'columnar export'
+
+LONG_AGGREGATION_COL = 'aggregation'
+LONG_AGGREGATION_NAME_COL = 'aggregation_name'
+LONG_AGGREGATION_VALUE_COL = 'aggregation_value'
+LONG_METRIC_COL = 'metric'
+LONG_GROUP_COL = 'group'
+LONG_CONTROL_GROUP_COL = 'control_group'
+LONG_IS_CONTROL_COL = 'is_control'
+LONG_VALUE_COL = 'value'
+LONG_UNITS_COL = 'units'
+LONG_UPLIFT_COL = 'uplift'
+LONG_CORRECTION_METHOD_COL = 'correction_method'
+
+DISTRIBUTION_MODE_AUTO = 'auto'
+DISTRIBUTION_MODE_UNITS = 'units'
+DISTRIBUTION_MODE_HISTOGRAM = 'histogram'
+DISTRIBUTION_MODE_ECDF = 'ecdf'
+DEFAULT_DISTRIBUTION_MAX_UNITS = 5000
+DEFAULT_DISTRIBUTION_POINTS = 200
+
+PERIOD_VIEW_DAILY = 'daily'
+PERIOD_VIEW_CUMULATIVE = 'cumulative'
+PERIOD_VIEW_ROLLING = 'rolling'
+DEFAULT_PERIOD_ROLLING_WINDOW = 7
+
+VALIDATION_TYPE__GROUPS_PER_UNIQ_ID = 'groups_per_uniq_id'
+VALIDATION_TYPE__MISSING_VALUES = 'missing_values'
+VALIDATION_TYPE__SAMPLE_RATIO_MISMATCH = 'sample_ratio_mismatch'
+DEFAULT_SRM_SIGNIFICANCE_LEVEL = 0.001
+
+V_MISSING_TOTAL_COL = 'total'
+V_SRM_STATISTIC_KEY = 'srm_statistic'
+V_SRM_PVALUE_KEY = 'srm_pvalue'
+V_SRM_MISMATCH_KEY = 'sample_ratio_mismatch'
@@ -1,12 +1,8 @@
 import numpy as np
 import pandas as pd
 
-from IPython.display import display
-
-from scipy.stats import ttest_ind
-from statsmodels.stats.proportion import proportions_chisquare
-
 from .ab_consts import STAT_TEST_CHISQUARE
+from .ab_consts import STAT_TEST_DELTA
 from .ab_consts import STAT_TEST_TTEST
 from .ab_consts import STAT_TEST_TTEST_WELSH
 from .ab_consts import DEFAULT_SIGNIFICANCE_LEVEL
@@ -15,6 +11,86 @@ from .ab_consts import H_PVALUE_KEY
 from .ab_consts import H_SIGNIFICANCE_KEY
 from .ab_consts import H_SIGNIFICANCE_LEVEL_KEY
 from .ab_consts import H_TEST_GROUP_KEY
+from .ab_consts import UPLIFT_CI_HIGH_KEY
+from .ab_consts import UPLIFT_CI_LOW_KEY
+from .sufficient_stats import stack_group_stats
+
+
+def chisquare_pvalues(c_successes, c_trials, t_successes, t_trials):
+    from scipy.stats import chi2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        trials = c_trials + t_trials
+        successes = c_successes + t_successes
+
+        chi2_stat = 0
+        for obs_successes, obs_trials in (
+            (c_successes, c_trials),
+            (t_successes, t_trials)
+        ):
+            exp_successes = obs_trials * successes / trials
+            exp_failures = obs_trials * (trials - successes) / trials
+
+            chi2_stat = chi2_stat \
+                + (obs_successes - exp_successes) ** 2 / exp_successes \
+                + (obs_trials - obs_successes - exp_failures) ** 2 \
+                    / exp_failures
+
+        pvalues = chi2.sf(chi2_stat, 1)
+
+    testable = (c_trials > 0) & (t_trials > 0) \
+        & (c_successes > 0) & (t_successes > 0)
+
+    return np.where(testable, pvalues, np.NaN)
+
+
+def ttest_pvalues(
+    c_count,
+    c_mean,
+    c_var,
+    t_count,
+    t_mean,
+    t_var,
+    equal_var=False
+):
+    from scipy.stats import ttest_ind_from_stats
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        _, pvalues = ttest_ind_from_stats(
+            c_mean,
+            np.sqrt(c_var),
+            c_count,
+            t_mean,
+            np.sqrt(t_var),
+            t_count,
+            equal_var=equal_var
+        )
+
+    return np.where((c_count > 1) & (t_count > 1), pvalues, np.NaN)
+
+
+def delta_pvalues(c_ratio, c_var, t_ratio, t_var):
+    from scipy.stats import norm
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_stat = (t_ratio - c_ratio) / np.sqrt(c_var + t_var)
+        pvalues = 2 * norm.sf(np.abs(z_stat))
+
+    return np.where(np.isfinite(z_stat), pvalues, np.NaN)
+
+
+def delta_uplift_ci(c_ratio, c_var, t_ratio, t_var, confidence_level):
+    from scipy.stats import norm
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        uplift = t_ratio / c_ratio - 1
+        uplift_std = np.abs(t_ratio / c_ratio) * np.sqrt(
+            t_var / t_ratio ** 2 + c_var / c_ratio ** 2
+        )
+
+    margin = norm.ppf(1 - (1 - confidence_level) / 2) * uplift_std
+
+    return uplift - margin, uplift + margin
 
 
 class ABHypothesis:
@@ -50,116 +126,161 @@ class ABHypothesis:
     def get_significance_level(self):
         return self.significance_level
 
-    def _get_empty_data(self, combination_name):
-        empty_h_df = pd.DataFrame()
+    def copy(self):
+        return ABHypothesis(
+            name=self.name,
+            nominator_col=self.nominator_col,
+            denominator_col=self.denominator_col,
+            continuous_measure_col=self.continuous_measure_col,
+            control_group_name=self.control_group_name,
+            group_col=self.group_col,
+            combined_groups=self.combined_groups,
+            stat_test=self.stat_test,
+            significance_level=self.significance_level
+        )
 
-        empty_h_df.loc[combination_name, H_PVALUE_KEY] = np.NaN
-        empty_h_df.loc[combination_name, H_SIGNIFICANCE_LEVEL_KEY] = \
-            self.significance_level
-        empty_h_df.loc[combination_name, H_SIGNIFICANCE_KEY] = \
-            np.NaN
+    def get_test_frame(self, pvalues):
+        combination_names = list(self.combined_groups.keys())
+
+        is_tested = ~np.isnan(pvalues)
+
+        significance = np.full(len(pvalues), np.NaN, dtype=object)
+        significance[is_tested] = pvalues[is_tested] < self.significance_level
+
+        return pd.DataFrame(
+            {
+                H_PVALUE_KEY: pvalues,
+                H_SIGNIFICANCE_LEVEL_KEY: self.significance_level,
+                H_SIGNIFICANCE_KEY: significance
+            },
+            index=combination_names
+        )
+
+    def calc_many_pvalues(self, stats_list):
+        if len(self.combined_groups.keys()) == 0:
+            raise ValueError('groups combination are not set')
+
+        if len(stats_list) == 0:
+            return []
+
+        pvalues = self.calc_pvalues(
+            stack_group_stats(stats_list, align=True)
+        )
 
-        return empty_h_df
+        return [pvalues[:, pos] for pos in range(len(stats_list))]
+
+    def test_many(self, stats_list):
+        return [
+            self.get_test_frame(pvalues)
+            for pvalues in self.calc_many_pvalues(stats_list)
+        ]
 
     def test(
         self,
-        m_df,
+        stats,
         save_testing=True
     ):
-        if len(self.combined_groups.keys()) == 0:
-            raise ValueError('groups combination are not set')
-
-        control_df = m_df[m_df.index == self.control_group_name]
-
-        h_df = pd.DataFrame()
-
-        for combination_name, groups_combination in \
-            self.combined_groups.items():
-
-            if groups_combination['test'] not in m_df.index:
-                display(
-                    'no test group "{test_group_name}"' + \
-                    ' in data - empty result'.format(
-                        test_group_name=groups_combination['test']
-                    )
-                )
-
-                h_df = pd.concat([h_df, self._get_empty_data(combination_name)])
-                continue
-
-            test_df = m_df[m_df.index == groups_combination['test']]
-
-            if self.stat_test == STAT_TEST_CHISQUARE:
-                c_successes = control_df[self.nominator_col].values[0]
-                t_successes = test_df[self.nominator_col].values[0]
-                c_trials = control_df[self.denominator_col].values[0]
-                t_trials = test_df[self.denominator_col].values[0]
-
-                if c_trials > 0 and t_trials > 0 \
-                    and c_successes > 0 and t_successes > 0:
-                    _, pvalue, _ = proportions_chisquare(
-                        [
-                            c_successes,
-                            t_successes
-                        ],
-                        [
-                            c_trials,
-                            t_trials
-                        ]
-                    )
-                else:
-                    display(
-                        'zero trials or successes, hypothesis won\'t be tested'
-                            + ' in groups ' + combination_name,
-                        'successes in control = ' + str(c_successes),
-                        'trials in control = ' + str(c_trials),
-                        'successes in test = ' + str(t_successes),
-                        'trials in test = ' + str(t_trials),
-                    )
-                    pvalue = np.NaN
-
-                h_df.loc[combination_name, H_PVALUE_KEY] = pvalue
-                h_df.loc[combination_name, H_SIGNIFICANCE_LEVEL_KEY] = \
-                    self.significance_level
-                h_df.loc[combination_name, H_SIGNIFICANCE_KEY] = \
-                    pvalue < self.significance_level
-
-            elif self.stat_test in (STAT_TEST_TTEST, STAT_TEST_TTEST_WELSH):
-                if control_df[self.continuous_measure_col].shape[0] > 1\
-                and test_df[self.continuous_measure_col].shape[0] > 1:
-
-                    _, pvalue = ttest_ind(
-                        control_df[self.continuous_measure_col],
-                        test_df[self.continuous_measure_col],
-                        equal_var=self.stat_test == STAT_TEST_TTEST
-                    )
-
-                    h_df.loc[combination_name, H_PVALUE_KEY] = pvalue
-                    h_df.loc[combination_name, H_SIGNIFICANCE_LEVEL_KEY] = \
-                        self.significance_level
-                    h_df.loc[combination_name, H_SIGNIFICANCE_KEY] = \
-                        pvalue < self.significance_level
-                else:
-                    display(
-                        'not enough data to test "' +
-                        ABHypothesis.generate_hypothesis_name(
-                            self.name,
-                            self.continuous_measure_col
-                        ) +
-                        '" hypothesis in groups ' +
-                        combination_name
-                    )
-
-                    h_df = pd.concat([
-                        h_df,
-                        self._get_empty_data(combination_name)
-                    ])
+        h_df = self.test_many([stats])[0]
 
         if save_testing:
             self.h_df = h_df
 
         return h_df
 
+    def set_test(self, h_df):
+        self.h_df = h_df
+
+    def _get_arm_locs(self, stats):
+        arm_positions = []
+        t_locs = []
+        for pos, groups_combination in \
+            enumerate(self.combined_groups.values()):
+
+            if groups_combination['test'] in stats:
+                arm_positions.append(pos)
+                t_locs.append(stats.get_loc(groups_combination['test']))
+
+        return arm_positions, np.array(t_locs, dtype=np.int64)
+
+    def calc_uplift_ci(self, stats, confidence_level=None):
+        if confidence_level is None:
+            confidence_level = 1 - self.significance_level
+
+        ci_low = np.full(len(self.combined_groups), np.NaN)
+        ci_high = np.full(len(self.combined_groups), np.NaN)
+
+        arm_positions, t_locs = self._get_arm_locs(stats)
+
+        if self.control_group_name in stats and len(t_locs) > 0:
+            c_loc = stats.get_loc(self.control_group_name)
+            ratios = stats.ratio()
+            ratio_vars = stats.ratio_var()
+
+            ci_low[arm_positions], ci_high[arm_positions] = delta_uplift_ci(
+                ratios[c_loc],
+                ratio_vars[c_loc],
+                ratios[t_locs],
+                ratio_vars[t_locs],
+                confidence_level
+            )
+
+        return pd.DataFrame(
+            {
+                UPLIFT_CI_LOW_KEY: ci_low,
+                UPLIFT_CI_HIGH_KEY: ci_high
+            },
+            index=list(self.combined_groups.keys())
+        )
+
+    def calc_pvalues(self, stats):
+        pvalues = np.full(
+            (len(self.combined_groups),) + np.shape(stats.count)[1:],
+            np.NaN
+        )
+
+        if self.control_group_name not in stats:
+            return pvalues
+
+        c_loc = stats.get_loc(self.control_group_name)
+
+        arm_positions, t_locs = self._get_arm_locs(stats)
+
+        if len(t_locs) == 0:
+            return pvalues
+
+        if self.stat_test == STAT_TEST_CHISQUARE:
+            pvalues[arm_positions] = chisquare_pvalues(
+                stats.x_sum[c_loc],
+                stats.y_sum[c_loc],
+                stats.x_sum[t_locs],
+                stats.y_sum[t_locs]
+            )
+        elif self.stat_test in (STAT_TEST_TTEST, STAT_TEST_TTEST_WELSH):
+            means = stats.x_mean()
+            variances = stats.x_var()
+
+            pvalues[arm_positions] = ttest_pvalues(
+                stats.count[c_loc],
+                means[c_loc],
+                variances[c_loc],
+                stats.count[t_locs],
+                means[t_locs],
+                variances[t_locs],
+                equal_var=self.stat_test == STAT_TEST_TTEST
+            )
+        elif self.stat_test == STAT_TEST_DELTA:
+            ratios = stats.ratio()
+            ratio_vars = stats.ratio_var()
+
+            pvalues[arm_positions] = delta_pvalues(
+                ratios[c_loc],
+                ratio_vars[c_loc],
+                ratios[t_locs],
+                ratio_vars[t_locs]
+            )
+
+        return pvalues
+
     def get_test(self):
         return self.h_df
 
@@ -3,8 +3,6 @@ from collections import OrderedDict
 import numpy as np
 import pandas as pd
 
-from statsmodels.stats.multitest import multipletests
-
 from .ab_consts import DEFAULT_SIGNIFICANCE_LEVEL
 from .ab_consts import H_PVALUE_KEY
 from .ab_consts import METRIC_COL_NAME
@@ -14,6 +12,36 @@ from .ab_consts import H_SIGNIFICANCE_LEVEL_KEY
 
 _CORRECTION_PREFIX = 'corrected_'
 
+
+def holm_correction(pvalues):
+    order = np.argsort(pvalues)
+
+    corrected_pvalues = np.maximum.accumulate(
+        pvalues[order] * np.arange(len(pvalues), 0, -1)
+    )
+    corrected_pvalues[corrected_pvalues > 1] = 1
+
+    result = np.empty_like(corrected_pvalues)
+    result[order] = corrected_pvalues
+
+    return result
+
+
+def bonferroni_correction(pvalues):
+    corrected_pvalues = pvalues * len(pvalues)
+    corrected_pvalues[corrected_pvalues > 1] = 1
+
+    return corrected_pvalues
+
+
+_CORRECTIONS = {
+    'holm': holm_correction,
+    'h': holm_correction,
+    'bonferroni': bonferroni_correction,
+    'b': bonferroni_correction
+}
+
+
 class ABHypothesisManager:
     def __init__(
         self,
@@ -24,61 +52,138 @@ class ABHypothesisManager:
         self.significance_level = significance_level
         self.mh_correction_method = correction_method
 
+        self._pvalues_by_agg = {}
         self.with_correction_by_agg_dataframes = {}
 
     def add_hypothesis(self, agg, metrics, h):
-        self._hypothesis[(agg.get_full_name(), metrics.get_name())] = h
-
-        if agg in self.with_correction_by_agg_dataframes:
-            del self.with_correction_by_agg_dataframes[agg]
+        agg_name = agg.get_full_name()
+
+        self._hypothesis[(agg_name, metrics.get_name())] = h
+
+        h_df = h.get_test()
+        self._pvalues_by_agg.setdefault(agg_name, OrderedDict())[
+            metrics.get_name()
+        ] = {
+            'index': h_df.index.to_numpy(),
+            H_PVALUE_KEY: h_df[H_PVALUE_KEY].to_numpy(dtype=np.float64),
+            H_SIGNIFICANCE_LEVEL_KEY: \
+                h_df[H_SIGNIFICANCE_LEVEL_KEY].to_numpy(dtype=np.float64),
+            H_SIGNIFICANCE_KEY: h_df[H_SIGNIFICANCE_KEY].to_numpy()
+        }
+
+        self.invalidate_correction(agg)
+
+    def invalidate_correction(self, agg=None):
+        if agg is None:
+            self.with_correction_by_agg_dataframes.clear()
+        else:
+            self.with_correction_by_agg_dataframes.pop(
+                agg.get_full_name(),
+                None
+            )
+
+    def has_hypothesis(self, agg, metrics):
+        return (agg.get_full_name(), metrics.get_name()) in self._hypothesis
 
     def get_hypothesis(self, agg, metrics):
         return self._hypothesis[(agg.get_full_name(), metrics.get_name())]
 
     def set_multiple_hypothesis_correction(self, correction_method):
+        if correction_method != self.mh_correction_method:
+            self.invalidate_correction()
+
         self.mh_correction_method = correction_method
 
-    def get_correction(self, agg):
-        with_correction_df = None
+    def _calc_correction(self, agg):
+        pvalues_by_metrics = self._pvalues_by_agg.get(
+            agg.get_full_name(),
+            OrderedDict()
+        )
 
-        # if agg in self.with_correction_by_agg_dataframes:
-        #     return self.with_correction_by_agg_dataframes[agg]
+        columns = [
+            'index',
+            H_PVALUE_KEY,
+            H_SIGNIFICANCE_LEVEL_KEY,
+            H_SIGNIFICANCE_KEY
+        ]
 
-        for hagg, hmetrics in self._hypothesis.keys():
-            if agg.get_full_name() == hagg:
-                h = self._hypothesis[(hagg, hmetrics)]\
-                    .get_test().reset_index()
+        metrics_slices = {}
+        start = 0
+        for metrics_name, pvalues in pvalues_by_metrics.items():
+            metrics_slices[metrics_name] = slice(
+                start,
+                start + len(pvalues['index'])
+            )
+            start += len(pvalues['index'])
+
+        with_correction_df = pd.DataFrame({
+            col: np.concatenate(
+                [pvalues[col] for pvalues in pvalues_by_metrics.values()]
+            ) if len(pvalues_by_metrics) > 0 else []
+            for col in columns
+        })
+
+        with_correction_df[METRIC_COL_NAME] = np.repeat(
+            list(metrics_slices.keys()),
+            [s.stop - s.start for s in metrics_slices.values()]
+        )
 
-                h[METRIC_COL_NAME] = hmetrics
+        pvalues = with_correction_df[H_PVALUE_KEY].to_numpy()
 
-                if with_correction_df is None:
-                    with_correction_df = h
-                else:
-                    with_correction_df = pd.concat([with_correction_df, h])
+        correction = _CORRECTIONS.get(str(self.mh_correction_method).lower())
 
-        _, corrected_pvalues_list, _, _ = multipletests(
-            with_correction_df[H_PVALUE_KEY],
-            method=self.mh_correction_method
-        )
+        if len(pvalues) > 0 and correction is not None:
+            corrected_pvalues_list = correction(
+                pvalues.astype(np.float64)
+            )
+        elif len(pvalues) > 0:
+            from statsmodels.stats.multitest import multipletests
+
+            _, corrected_pvalues_list, _, _ = multipletests(
+                pvalues,
+                method=self.mh_correction_method
+            )
+        else:
+            corrected_pvalues_list = np.array([], dtype=np.float64)
 
         with_correction_df[_CORRECTION_PREFIX + H_PVALUE_KEY] = \
             corrected_pvalues_list
 
+        is_tested = ~np.isnan(corrected_pvalues_list)
+
+        corrected_significance = np.full(
+            len(corrected_pvalues_list),
+            np.NaN,
+            dtype=object
+        )
+        corrected_significance[is_tested] = \
+            with_correction_df[H_SIGNIFICANCE_LEVEL_KEY].to_numpy()[is_tested] \
+                > corrected_pvalues_list[is_tested]
+
         with_correction_df[_CORRECTION_PREFIX + H_SIGNIFICANCE_KEY] = \
-            list(map(
-                lambda pvalue, slevel:
-                    np.NaN if np.isnan(pvalue) else slevel > pvalue,
-                corrected_pvalues_list,
-                with_correction_df[H_SIGNIFICANCE_LEVEL_KEY]
-            ))
+            corrected_significance
+
+        return with_correction_df, metrics_slices
+
+    def _get_cached_correction(self, agg):
+        agg_name = agg.get_full_name()
 
-        self.with_correction_by_agg_dataframes[agg] = with_correction_df
+        if agg_name not in self.with_correction_by_agg_dataframes:
+            self.with_correction_by_agg_dataframes[agg_name] = \
+                self._calc_correction(agg)
+
+        return self.with_correction_by_agg_dataframes[agg_name]
+
+    def get_correction(self, agg):
+        with_correction_df, _ = self._get_cached_correction(agg)
 
         return with_correction_df
 
     def get_metrics_correction_result(self, corrected_df, agg, metrics):
-        metrics_corrected_df = corrected_df[
-            corrected_df[METRIC_COL_NAME] == metrics.get_name()
+        _, metrics_slices = self._get_cached_correction(agg)
+
+        metrics_corrected_df = corrected_df.iloc[
+            metrics_slices[metrics.get_name()]
         ]
 
         metrics_corrected_df = metrics_corrected_df.set_index(
@@ -87,6 +192,13 @@ class ABHypothesisManager:
 
         return metrics_corrected_df
 
+    def get_metrics_correction(self, agg, metrics):
+        return self.get_metrics_correction_result(
+            self.get_correction(agg),
+            agg,
+            metrics
+        )
+
     def get_hypothesis_corrected_pvalue(self, agg, metrics):
         whole_corrected_df = self.get_correction(agg)
 
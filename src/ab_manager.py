@@ -1,26 +1,125 @@
+import warnings
+from contextlib import contextmanager
+
 import pandas as pd
 import numpy as np
 
-from IPython.display import display
-from IPython.core.display import Markdown
-
 from .ab_hypothesis import ABHypothesis
+from .ab_consts import DEFAULT_CHUNK_ROWS
 from .ab_consts import DEFAULT_GROUP_NAMES
-from .ab_consts import H_PVALUE_KEY
+from .ab_consts import DEFAULT_RESULT_CACHE_MAX_BYTES
+from .ab_consts import DEFAULT_SRM_SIGNIFICANCE_LEVEL
+from .ab_consts import UPLIFT_CI_HIGH_KEY
+from .ab_consts import UPLIFT_CI_LOW_KEY
+from .ab_consts import FOLDED_TIMESERIES_FREQ
+from .ab_consts import STAGE_APPEND
+from .ab_consts import STAGE_CACHE
+from .ab_consts import STAGE_CALC_METRICS
+from .ab_consts import STAGE_CUBE
+from .ab_consts import STAGE_COLUMNAR_EXPORT
+from .ab_consts import STAGE_EXCEL_EXPORT
+from .ab_consts import STAGE_HYPOTHESIS
+from .ab_consts import STAGE_METRICS
+from .ab_consts import STAGE_PARALLEL_METRICS
+from .ab_consts import STAGE_RENDER
+from .ab_consts import STAGE_REPORT
+from .ab_consts import STAGE_SLICE
+from .ab_consts import STAGE_UPLIFT_CI
+from .ab_consts import STAGE_VALIDATION
+from .ab_consts import STAT_TEST_DELTA
+from .ab_consts import VALIDATION_TYPE__GROUPS_PER_UNIQ_ID
+from .ab_consts import VALIDATION_TYPE__MISSING_VALUES
+from .ab_consts import VALIDATION_TYPE__SAMPLE_RATIO_MISMATCH
 from .ab_hypothesis_manager import ABHypothesisManager
 from .aggregation import Aggregation
 from .ab_report import ABReport
-from .charts.distribution_chart import DistributionChart
-from .charts.period_chart import PeriodChart
-from .charts.pvalue_chart import PValueChart
+from .bootstrap import bootstrap_uplift_ci
+from .cube import AggregationCube
+from .ingestion import UnitDayFolder
+from .instrumentation import Profiler
+from .instrumentation import profile_stage
+from .ingestion import as_day_category
+from .ingestion import concat_encoded_frames
+from .ingestion import encode_ab_columns
+from .ingestion import get_metrics_cols
+from .ingestion import read_csv_chunks
+from .ingestion import read_parquet_chunks
 from .metrics import Metrics
+from .rendering import display_metrics_results
+from .rendering import display_report_result
+from .rendering import display_validation_result
+from .result_cache import ResultCache
+from .result_cache import fingerprint_values
+from .result_cache import get_cache_key
+from .result_cache import stats_from_arrays
+from .result_cache import stats_to_arrays
+from .result_cache import units_from_arrays
+from .result_cache import units_to_arrays
+from .results import MetricsResult
+from .results import ValidationResult
+from .parallel import GROUP_KEY
+from .parallel import MASK_KEY_PREFIX
+from .parallel import UNIT_KEY
+from .parallel import VALUE_KEY_PREFIX
+from .parallel import SharedColumns
+from .parallel import calc_slices
+from .parallel import codes_with_na
+from .slice_index import FrameSlice
+from .slice_index import SliceIndex
+from .sufficient_stats import GroupStats
+from .sufficient_stats import UnitGrouper
+from .sufficient_stats import merge_unit_values
+from .validation import SliceValidator
 
 
-VALIDATION_TYPE__GROUPS_PER_UNIQ_ID = 'groups_per_uniq_id'
 _ALL_VALIDATORS = [
-    VALIDATION_TYPE__GROUPS_PER_UNIQ_ID
+    VALIDATION_TYPE__GROUPS_PER_UNIQ_ID,
+    VALIDATION_TYPE__MISSING_VALUES,
+    VALIDATION_TYPE__SAMPLE_RATIO_MISMATCH
 ]
 
+def _get_metrics_spec(
+    name,
+    mask=None,
+    continuous_measure_col=None,
+    nominator_col=None,
+    denominator_col=None,
+    outliers=None,
+    outliers_quantile=None,
+    outliers_quantile_min_value=None,
+    outliers_sketch_error=None,
+    is_uniq_id_proportions=False,
+    is_ratio=False,
+    na_is_zero=False,
+    hypothesis=None,
+    bootstrap=None
+):
+    if hypothesis is not None \
+        and hypothesis.get('stat_test') == STAT_TEST_DELTA \
+        and (nominator_col is None or denominator_col is None):
+
+        raise ValueError(
+            'metrics ' + str(name) + ': ' + STAT_TEST_DELTA + ' test needs '
+                'nominator_col and denominator_col'
+        )
+
+    return {
+        'name': name,
+        'mask': mask,
+        'continuous_measure_col': continuous_measure_col,
+        'nominator_col': nominator_col,
+        'denominator_col': denominator_col,
+        'outliers': outliers,
+        'outliers_quantile': outliers_quantile,
+        'outliers_quantile_min_value': outliers_quantile_min_value,
+        'outliers_sketch_error': outliers_sketch_error,
+        'is_uniq_id_proportions': is_uniq_id_proportions,
+        'is_ratio': is_ratio,
+        'na_is_zero': na_is_zero,
+        'hypothesis': hypothesis,
+        'bootstrap': bootstrap
+    }
+
 class ABManager:
     def __init__(
         self,
@@ -32,13 +131,32 @@ class ABManager:
         control_group_name=None,
         data_cols=None,
         significance_level=None,
-        aggregations=None
+        aggregations=None,
+        n_jobs=None,
+        headless=False,
+        encode_columns=True,
+        downcast_numeric=False,
+        cache_dir=None,
+        cache_max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES,
+        profiler=None
     ):
         self.name = ab_test_name
+        self.n_jobs = n_jobs
+        self.profiler = profiler
+        self.headless = headless
         self.abgroup_col = abgroup_col
         self.timeseries_col = timeseries_col
         self.uniq_id_col = uniq_id_col
 
+        self.encode_columns = encode_columns
+        self.downcast_cols = self._get_data_cols(
+            ab_df,
+            data_cols,
+            aggregations
+        ) if encode_columns and downcast_numeric else None
+
+        ab_df = self._prepare_data(ab_df)
+
         self.available_groups = np.sort(ab_df[abgroup_col].unique())
 
         self.control_group_name = None
@@ -60,7 +178,24 @@ class ABManager:
             uniq_id_col
         ]
 
-        ab_df.sort_values(timeseries_col, inplace=True)
+        self.ab_df = ab_df
+        self.folded_positive_count_cols = None
+        self.folder_args = None
+        self.data_loader = None
+        self.appended_rows = []
+        self.metrics_specs = {}
+
+        self.result_cache = None
+        if cache_dir is not None:
+            self.result_cache = ResultCache(cache_dir, cache_max_bytes)
+
+        self._column_fingerprints = {}
+        self._released_cols = None
+
+        self.cube_cols = None
+        if Aggregation.has_combinations(aggregations):
+            self.cube_cols = Aggregation.get_aggregation_cols(aggregations)
+        self._cube = None
 
         self.aggregations = Aggregation.generate_aggregation(
             ab_df,
@@ -71,29 +206,437 @@ class ABManager:
             significance_level=significance_level
         )
 
+        self._combined_groups = self._pair_groups(ab_df)
+
         self.report = ABReport(
             self.aggregations,
-            self.ab_hm
+            self.ab_hm,
+            combined_groups=self._combined_groups
         )
 
-        self._combined_groups = self._pair_groups(ab_df)
+        self.info_df = self._get_info_df()
 
-        self.info_df = pd.DataFrame(
+    def _get_info_df(self):
+        ab_df = self.ab_df
+        timeseries_col = self.timeseries_col
+
+        return pd.DataFrame(
             [
                 ['AB test name: ' + self.name],
                 [
                     'Period: ' +
-                    str(ab_df[timeseries_col].min()) +
+                    self._format_period_value(ab_df[timeseries_col].min()) +
                     ' - ' +
-                    str(ab_df[timeseries_col].max())
+                    self._format_period_value(ab_df[timeseries_col].max())
+                ],
+                [
+                    'Number of groups: '
+                        + str(ab_df[self.abgroup_col].nunique())
                 ],
-                ['Number of groups: ' + str(ab_df[abgroup_col].nunique())],
-                ['Unique ids: ' + str(ab_df[uniq_id_col].nunique())],
-                ['Significance level: ' + str(significance_level)],
+                ['Unique ids: ' + str(ab_df[self.uniq_id_col].nunique())],
+                ['Significance level: ' + str(self.ab_hm.significance_level)],
             ],
             columns=['']
         )
 
+    def _get_data_cols(self, ab_df, data_cols, aggregations):
+        if data_cols is None:
+            data_cols = ab_df.columns
+
+        key_cols = [self.abgroup_col, self.timeseries_col, self.uniq_id_col] \
+            + Aggregation.get_aggregation_cols(aggregations)
+
+        return [
+            col for col in data_cols
+            if col not in key_cols
+                and pd.api.types.is_numeric_dtype(ab_df[col])
+        ]
+
+    def _prepare_data(self, ab_df, sort=True):
+        prepared_df = ab_df
+        if self.encode_columns:
+            prepared_df = encode_ab_columns(
+                ab_df,
+                self.abgroup_col,
+                self.uniq_id_col,
+                self.timeseries_col,
+                downcast_cols=self.downcast_cols
+            )
+
+        if sort:
+            day_codes = as_day_category(
+                prepared_df[self.timeseries_col]
+            ).cat.codes
+
+            # the caller's frame is sorted too, so positional masks built
+            # from it keep selecting the same rows
+            ab_df.sort_values(
+                self.timeseries_col,
+                inplace=True,
+                key=lambda values: day_codes
+            )
+
+            if prepared_df is not ab_df:
+                prepared_df = prepared_df.take(
+                    np.argsort(day_codes.to_numpy(), kind='quicksort')
+                )
+
+        return prepared_df
+
+    def _concat_rows(self, ab_df, new_rows_df):
+        return concat_encoded_frames(
+            ab_df,
+            self._prepare_data(new_rows_df, sort=False)
+        )
+
+    def _set_data(self, ab_df):
+        self.ab_df = ab_df
+        self._cube = None
+
+        for agg in self.aggregations:
+            agg.set_data(ab_df)
+
+            for metrics in agg.get_metrics_list():
+                metrics.rebind_data(ab_df)
+
+    def has_data(self):
+        return self.ab_df is not None
+
+    def get_retained_memory_usage(self):
+        return sum(
+            spec['mask'].nbytes
+            for spec in self.metrics_specs.values()
+            if spec['mask'] is not None
+        )
+
+    def get_memory_usage(self):
+        memory_bytes = self.get_retained_memory_usage()
+        if self.ab_df is not None:
+            memory_bytes += int(
+                self.ab_df.memory_usage(index=True, deep=True).sum()
+            )
+
+        return memory_bytes
+
+    def set_data_loader(self, data_loader):
+        self.data_loader = data_loader
+
+    def get_data_loader(self):
+        return self.data_loader
+
+    def release_data(self):
+        if self.ab_df is None:
+            return
+
+        self._released_cols = list(self.ab_df.columns)
+        for col in self._released_cols:
+            self._get_column_fingerprint(col)
+
+        self._set_data(None)
+
+    def restore_data(self, ab_df=None):
+        if self.ab_df is not None:
+            return
+
+        if ab_df is None:
+            if self.data_loader is None:
+                raise ValueError(
+                    'no data loader to restore data of ab test ' + self.name
+                )
+
+            ab_df = self.data_loader()
+
+        ab_df = self._prepare_data(ab_df)
+        for new_rows_df in self.appended_rows:
+            ab_df = self._concat_rows(ab_df, new_rows_df)
+
+        if list(ab_df.columns) != self._released_cols or any(
+            fingerprint_values(ab_df[col]) != self._column_fingerprints[col]
+            for col in self._released_cols
+        ):
+            raise ValueError(
+                'restored data differs from released data of ab test '
+                    + self.name
+            )
+
+        self._set_data(ab_df)
+
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+
+    def get_profiler(self):
+        return self.profiler
+
+    @contextmanager
+    def profile(self, trace_memory=False, callbacks=None):
+        previous_profiler = self.profiler
+
+        profiler = Profiler(trace_memory=trace_memory, callbacks=callbacks)
+        self.set_profiler(profiler)
+        profiler.start()
+
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            self.set_profiler(previous_profiler)
+
+    def _profile(self, stage, agg=None, metrics=None, rows=None):
+        return profile_stage(
+            self.profiler,
+            stage,
+            aggregation=agg,
+            metrics=metrics,
+            rows=rows
+        )
+
+    @staticmethod
+    def _get_agg_rows(agg):
+        positions = agg.get_positions()
+        if positions is None:
+            return len(agg.get_data())
+
+        return len(positions)
+
+    @staticmethod
+    def _format_period_value(value):
+        if isinstance(value, pd.Timestamp) and value == value.normalize():
+            return str(value.date())
+        return str(value)
+
+    @staticmethod
+    def from_chunks(
+        ab_test_name,
+        chunks,
+        abgroup_col,
+        timeseries_col,
+        uniq_id_col,
+        metrics_specs,
+        dimension_cols=None,
+        timeseries_freq=FOLDED_TIMESERIES_FREQ,
+        control_group_name=None,
+        significance_level=None,
+        aggregations=None,
+        n_jobs=None,
+        headless=False,
+        downcast_numeric=False,
+        cache_dir=None,
+        cache_max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES
+    ):
+        folder_args = (
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            metrics_specs,
+            dimension_cols,
+            timeseries_freq,
+            aggregations
+        )
+        folder = ABManager._get_folder(*folder_args)
+
+        ab_manager = ABManager(
+            ab_test_name,
+            folder.add_chunks(chunks).get_frame(),
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            control_group_name=control_group_name,
+            significance_level=significance_level,
+            aggregations=aggregations,
+            n_jobs=n_jobs,
+            headless=headless,
+            downcast_numeric=downcast_numeric,
+            cache_dir=cache_dir,
+            cache_max_bytes=cache_max_bytes
+        )
+        ab_manager.folded_positive_count_cols = \
+            folder.get_positive_count_cols()
+        ab_manager.folder_args = folder_args
+
+        return ab_manager
+
+    @staticmethod
+    def from_csv(
+        ab_test_name,
+        path,
+        abgroup_col,
+        timeseries_col,
+        uniq_id_col,
+        metrics_specs,
+        dimension_cols=None,
+        timeseries_freq=FOLDED_TIMESERIES_FREQ,
+        chunksize=DEFAULT_CHUNK_ROWS,
+        read_csv_kwargs=None,
+        **kwargs
+    ):
+        folder = ABManager._get_folder(
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            metrics_specs,
+            dimension_cols,
+            timeseries_freq,
+            kwargs.get('aggregations')
+        )
+
+        def _read_chunks():
+            return read_csv_chunks(
+                path,
+                folder.get_input_cols(),
+                chunksize=chunksize,
+                **(read_csv_kwargs or {})
+            )
+
+        ab_manager = ABManager.from_chunks(
+            ab_test_name,
+            _read_chunks(),
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            metrics_specs,
+            dimension_cols=dimension_cols,
+            timeseries_freq=timeseries_freq,
+            **kwargs
+        )
+        ab_manager.set_data_loader(ABManager._get_chunks_loader(
+            _read_chunks,
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            metrics_specs,
+            dimension_cols,
+            timeseries_freq,
+            kwargs.get('aggregations')
+        ))
+
+        return ab_manager
+
+    @staticmethod
+    def from_parquet(
+        ab_test_name,
+        path,
+        abgroup_col,
+        timeseries_col,
+        uniq_id_col,
+        metrics_specs,
+        dimension_cols=None,
+        timeseries_freq=FOLDED_TIMESERIES_FREQ,
+        batch_size=DEFAULT_CHUNK_ROWS,
+        **kwargs
+    ):
+        folder = ABManager._get_folder(
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            metrics_specs,
+            dimension_cols,
+            timeseries_freq,
+            kwargs.get('aggregations')
+        )
+
+        def _read_chunks():
+            return read_parquet_chunks(
+                path,
+                folder.get_input_cols(),
+                batch_size=batch_size
+            )
+
+        ab_manager = ABManager.from_chunks(
+            ab_test_name,
+            _read_chunks(),
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            metrics_specs,
+            dimension_cols=dimension_cols,
+            timeseries_freq=timeseries_freq,
+            **kwargs
+        )
+        ab_manager.set_data_loader(ABManager._get_chunks_loader(
+            _read_chunks,
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            metrics_specs,
+            dimension_cols,
+            timeseries_freq,
+            kwargs.get('aggregations')
+        ))
+
+        return ab_manager
+
+    @staticmethod
+    def _get_chunks_loader(
+        read_chunks,
+        abgroup_col,
+        timeseries_col,
+        uniq_id_col,
+        metrics_specs,
+        dimension_cols,
+        timeseries_freq,
+        aggregations
+    ):
+        def _load_data():
+            return ABManager._get_folder(
+                abgroup_col,
+                timeseries_col,
+                uniq_id_col,
+                metrics_specs,
+                dimension_cols,
+                timeseries_freq,
+                aggregations
+            ).add_chunks(read_chunks()).get_frame()
+
+        return _load_data
+
+    @staticmethod
+    def _get_folder(
+        abgroup_col,
+        timeseries_col,
+        uniq_id_col,
+        metrics_specs,
+        dimension_cols,
+        timeseries_freq,
+        aggregations
+    ):
+        value_cols, positive_count_cols = get_metrics_cols(metrics_specs)
+
+        return UnitDayFolder(
+            abgroup_col,
+            timeseries_col,
+            uniq_id_col,
+            value_cols,
+            positive_count_cols=positive_count_cols,
+            dimension_cols=Aggregation.get_aggregation_cols(aggregations)
+                + list(dimension_cols or []),
+            timeseries_freq=timeseries_freq
+        )
+
+    def _get_folded_spec(self, spec):
+        if self.folded_positive_count_cols is None \
+            or not spec['is_uniq_id_proportions'] \
+            or spec['continuous_measure_col'] is not None:
+
+            return spec
+
+        for col in (spec['nominator_col'], spec['denominator_col']):
+            if col not in self.folded_positive_count_cols:
+                raise ValueError(
+                    'column ' + str(col) + ' was not folded with unique id '
+                    'counts, add the metrics to metrics_specs of the ab test'
+                )
+
+        return dict(
+            spec,
+            nominator_col=self.folded_positive_count_cols[
+                spec['nominator_col']
+            ],
+            denominator_col=self.folded_positive_count_cols[
+                spec['denominator_col']
+            ],
+            is_uniq_id_proportions=False
+        )
+
     def _pair_groups(self, h_df):
         combined_groups = {}
         for group in np.sort(h_df[self.abgroup_col].unique()):
@@ -108,26 +651,60 @@ class ABManager:
 
         return combined_groups
 
-    def validate_ab_test_data(self, validators = _ALL_VALIDATORS):
-        for aggregation in self.aggregations:
-            display(Markdown('# Aggregation ' + aggregation.get_name()))
-            vl_df = aggregation.get_dataframe()
-            display(self._describe_by_group(vl_df))
+    def validate_ab_test_data(
+        self,
+        validators=_ALL_VALIDATORS,
+        describe=False,
+        expected_group_ratios=None,
+        srm_significance_level=DEFAULT_SRM_SIGNIFICANCE_LEVEL
+    ):
+        self.restore_data()
+
+        validation_result = ValidationResult()
+
+        with self._profile(STAGE_VALIDATION, rows=len(self.ab_df)):
+            SliceValidator(
+                self.ab_df,
+                self.abgroup_col,
+                self.uniq_id_col
+            ).validate(
+                self.aggregations,
+                validation_result,
+                validators,
+                expected_group_ratios,
+                srm_significance_level
+            )
+
+        if describe:
+            for aggregation in self.aggregations:
+                with self._profile(
+                    STAGE_VALIDATION,
+                    aggregation,
+                    rows=self._get_agg_rows(aggregation)
+                ):
+                    validation_result.set_describe(
+                        aggregation,
+                        self._describe_by_group(aggregation.get_dataframe())
+                    )
 
-            if VALIDATION_TYPE__GROUPS_PER_UNIQ_ID in validators:
-                display(self._get_groups_stats(vl_df))
+        if not self.headless:
+            display_validation_result(validation_result)
 
-    def _get_groups_stats(self, df_w_test_groups):
-        return df_w_test_groups\
-            .groupby(self.uniq_id_col, as_index=False)[self.abgroup_col]\
-            .nunique()\
-            .groupby(self.abgroup_col, as_index=False)[self.uniq_id_col]\
-            .nunique()
+        return validation_result
 
     def _describe_by_group(self, df_to_desc):
-        return df_to_desc.groupby(self.abgroup_col).describe().T
+        groups = df_to_desc[self.abgroup_col]
+        if isinstance(groups.dtype, pd.CategoricalDtype):
+            groups = groups.astype(groups.cat.categories.dtype)
+
+        return df_to_desc.drop(columns=[self.abgroup_col])\
+            .groupby(groups)\
+            .describe()\
+            .T
 
     def get_aggregations(self, values=None):
+        self.restore_data()
+
         if values is not None:
             agg_list = []
             for agg_name, agg_values in values.items():
@@ -143,25 +720,6 @@ class ABManager:
 
         return self.aggregations
 
-    def _get_metrics_report(self, metrics_df, h_df):
-        rep_df = metrics_df.copy()
-
-        pvalue_cols = list(map(
-            lambda c: c + ' pvalue',
-            h_df.columns
-        ))
-
-        if h_df.shape[0] > 0:
-            pvalue_df = h_df[h_df.index == H_PVALUE_KEY]
-            pvalue_df.index = metrics_df.index
-
-            rep_df[pvalue_cols] = pvalue_df
-        else:
-            rep_df[pvalue_cols] = \
-                pd.DataFrame([np.NaN] * rep_df.shape[0], index=rep_df.index)
-
-        return rep_df
-
     def calc_metrics(
         self,
         name,
@@ -173,113 +731,959 @@ class ABManager:
         outliers=None,
         outliers_quantile=None,
         outliers_quantile_min_value=None,
+        outliers_sketch_error=None,
         is_uniq_id_proportions=False,
+        is_ratio=False,
         na_is_zero=False,
         hypothesis=None,
-        aggregation_values=None
+        bootstrap=None,
+        aggregation_values=None,
+        n_jobs=None
     ):
-        for agg in self.get_aggregations(aggregation_values):
-            display(agg.get_formatted_name())
-
-            metrics = Metrics(
-                name,
-                agg.get_dataframe(),
-                continuous_measure_col=continuous_measure_col,
-                continuous_measure_id_col=self.uniq_id_col,
-                outliers=outliers,
-                outliers_quantile=outliers_quantile,
-                outliers_quantile_min_value=outliers_quantile_min_value,
-                relation_value=self.control_group_name,
-                nominator_col=nominator_col,
-                denominator_col=denominator_col,
-                is_uniq_id_proportions=is_uniq_id_proportions,
-                na_is_zero=na_is_zero
+        return self.calc_metrics_batch(
+            [
+                _get_metrics_spec(
+                    name=name,
+                    mask=mask,
+                    continuous_measure_col=continuous_measure_col,
+                    nominator_col=nominator_col,
+                    denominator_col=denominator_col,
+                    outliers=outliers,
+                    outliers_quantile=outliers_quantile,
+                    outliers_quantile_min_value=outliers_quantile_min_value,
+                    outliers_sketch_error=outliers_sketch_error,
+                    is_uniq_id_proportions=is_uniq_id_proportions,
+                    is_ratio=is_ratio,
+                    na_is_zero=na_is_zero,
+                    hypothesis=hypothesis,
+                    bootstrap=bootstrap
+                )
+            ],
+            silent=silent,
+            aggregation_values=aggregation_values,
+            n_jobs=n_jobs
+        )
+
+    def _create_metrics(self, agg, spec):
+        metrics = Metrics(
+            spec['name'],
+            agg.get_data(),
+            rows=agg.get_positions(),
+            continuous_measure_col=spec['continuous_measure_col'],
+            continuous_measure_id_col=self.uniq_id_col,
+            outliers=spec['outliers'],
+            outliers_quantile=spec['outliers_quantile'],
+            outliers_quantile_min_value=spec['outliers_quantile_min_value'],
+            outliers_sketch_error=spec['outliers_sketch_error'],
+            relation_value=self.control_group_name,
+            nominator_col=spec['nominator_col'],
+            denominator_col=spec['denominator_col'],
+            is_uniq_id_proportions=spec['is_uniq_id_proportions'],
+            is_ratio=spec['is_ratio'],
+            na_is_zero=spec['na_is_zero']
+        )
+
+        if spec['mask'] is not None:
+            metrics.append_mask(spec['mask'])
+
+        metrics.append_grouping(
+            [
+                self.abgroup_col
+            ]
+        )
+
+        return metrics
+
+    def _create_hypothesis(self, spec):
+        return ABHypothesis(
+            name=spec['name'],
+            nominator_col=spec['nominator_col'],
+            denominator_col=spec['denominator_col'],
+            continuous_measure_col=spec['continuous_measure_col'],
+            control_group_name=self.control_group_name,
+            combined_groups=self._combined_groups,
+            group_col=self.abgroup_col,
+            **spec['hypothesis']
+        )
+
+    def _calc_agg_metrics(self, agg, specs):
+        rows = self._get_agg_rows(agg)
+
+        with self._profile(STAGE_SLICE, agg, rows=rows):
+            unit_grouper = UnitGrouper.from_columns(
+                FrameSlice(agg.get_data(), agg.get_positions()),
+                [self.abgroup_col],
+                self.uniq_id_col
+            )
+
+        metrics_list = []
+        for spec in specs:
+            metrics = self._create_metrics(agg, spec)
+
+            with self._profile(STAGE_METRICS, agg, spec['name'], rows):
+                metrics.calc(
+                    unit_grouper=unit_grouper,
+                    row_mask=unit_grouper.get_row_mask(spec['mask'])
+                        if spec['mask'] is not None else None
+                )
+
+            metrics_list.append(metrics)
+
+        return metrics_list
+
+    def _get_cube(self):
+        if self._cube is None:
+            with self._profile(STAGE_CUBE, rows=len(self.ab_df)):
+                self._cube = AggregationCube(
+                    self.ab_df,
+                    self.abgroup_col,
+                    self.uniq_id_col,
+                    self.cube_cols
+                )
+
+        return self._cube
+
+    def _calc_cube_metrics(self, aggs, specs):
+        cube = self._get_cube()
+        unit_grouper = cube.get_grouper()
+
+        levels = {}
+        for agg_pos, agg in enumerate(aggs):
+            levels.setdefault(tuple(agg.get_cols()), []).append(agg_pos)
+
+        metrics_by_agg = [
+            [self._create_metrics(agg, spec) for spec in specs]
+            for agg in aggs
+        ]
+
+        for spec_pos, spec in enumerate(specs):
+            with self._profile(
+                STAGE_CUBE,
+                metrics=spec['name'],
+                rows=len(self.ab_df)
+            ):
+                row_mask = None
+                pair_counts = None
+                if spec['mask'] is not None:
+                    row_mask = unit_grouper.get_row_mask(spec['mask'])
+                    pair_counts = unit_grouper.get_pair_counts(row_mask)
+
+                units = metrics_by_agg[0][spec_pos].calc_units(
+                    unit_grouper,
+                    row_mask=row_mask,
+                    keep_empty=True
+                )
+
+            for agg_positions in levels.values():
+                with self._profile(
+                    STAGE_CUBE,
+                    metrics=spec['name'],
+                    rows=len(units)
+                ):
+                    rolled_up = cube.roll_up(
+                        units,
+                        [aggs[agg_pos] for agg_pos in agg_positions],
+                        pair_counts
+                    )
+
+                for agg_pos, (agg_units, group_index) in zip(
+                    agg_positions,
+                    rolled_up
+                ):
+                    with self._profile(
+                        STAGE_METRICS,
+                        aggs[agg_pos],
+                        spec['name'],
+                        len(agg_units)
+                    ):
+                        metrics_by_agg[agg_pos][spec_pos].set_units(
+                            agg_units,
+                            group_index
+                        )
+
+        return metrics_by_agg
+
+    def _get_worker_spec(self, spec, shared_columns, spec_pos):
+        value_keys = {}
+        for col in (
+            spec['continuous_measure_col'],
+            spec['nominator_col'],
+            spec['denominator_col']
+        ):
+            if col is not None:
+                value_keys[col] = shared_columns.add(
+                    VALUE_KEY_PREFIX + str(col),
+                    pd.to_numeric(self.ab_df[col], errors='coerce').to_numpy(
+                        dtype=np.float64,
+                        na_value=np.NaN
+                    )
+                )
+
+        mask_key = None
+        if spec['mask'] is not None:
+            mask_key = shared_columns.add(
+                MASK_KEY_PREFIX + str(spec_pos),
+                FrameSlice(self.ab_df).get_mask_values(spec['mask'])
+            )
+
+        hypothesis = None
+        if spec['hypothesis'] is not None:
+            hypothesis = dict(
+                control_group_name=self.control_group_name,
+                combined_groups=self._combined_groups,
+                **spec['hypothesis']
+            )
+
+        return {
+            'name': spec['name'],
+            'mask': mask_key,
+            'metrics': {
+                'continuous_measure_col': \
+                    value_keys.get(spec['continuous_measure_col']),
+                'nominator_col': value_keys.get(spec['nominator_col']),
+                'denominator_col': value_keys.get(spec['denominator_col']),
+                'outliers': spec['outliers'],
+                'outliers_quantile': spec['outliers_quantile'],
+                'outliers_quantile_min_value': \
+                    spec['outliers_quantile_min_value'],
+                'outliers_sketch_error': spec['outliers_sketch_error'],
+                'is_uniq_id_proportions': spec['is_uniq_id_proportions']
+            },
+            'hypothesis': hypothesis
+        }
+
+    def _calc_metrics_parallel(self, aggs, specs, n_jobs):
+        shared_columns = SharedColumns()
+
+        try:
+            group_codes, group_labels = pd.factorize(
+                self.ab_df[self.abgroup_col],
+                sort=True
             )
+            shared_columns.add(GROUP_KEY, codes_with_na(group_codes))
 
-            agg.add_metrics(metrics)
+            unit_codes, unit_labels = pd.factorize(
+                self.ab_df[self.uniq_id_col],
+                sort=True
+            )
+            shared_columns.add(UNIT_KEY, codes_with_na(unit_codes))
+
+            worker_specs = [
+                self._get_worker_spec(spec, shared_columns, spec_pos)
+                for spec_pos, spec in enumerate(specs)
+            ]
 
-            if mask is not None:
-                metrics.append_mask(mask)
+            group_labels = pd.Index(group_labels, name=self.abgroup_col)
 
-            metrics.append_grouping(
+            results = calc_slices(
                 [
-                    self.abgroup_col
+                    (agg.get_positions(), group_labels, worker_specs)
+                    for agg in aggs
+                ],
+                shared_columns,
+                n_jobs
+            )
+        finally:
+            shared_columns.close()
+
+        unit_labels = pd.Index(unit_labels)
+
+        metrics_by_agg = []
+        pvalues_by_agg = []
+        for agg, agg_results in zip(aggs, results):
+            metrics_list = []
+            pvalues_list = []
+
+            for spec, (stats, units, pvalues) in zip(specs, agg_results):
+                units.unit_levels = unit_labels.take(
+                    np.asarray(units.unit_levels, dtype=np.int64)
+                )
+
+                metrics = self._create_metrics(agg, spec)
+                metrics.set_stats(stats, units)
+
+                metrics_list.append(metrics)
+                pvalues_list.append(pvalues)
+
+            metrics_by_agg.append(metrics_list)
+            pvalues_by_agg.append(pvalues_list)
+
+        return metrics_by_agg, pvalues_by_agg
+
+    def _get_column_fingerprint(self, col):
+        if col not in self._column_fingerprints:
+            self._column_fingerprints[col] = \
+                fingerprint_values(self.ab_df[col])
+
+        return self._column_fingerprints[col]
+
+    def _get_spec_cache_key(self, spec):
+        data_cols = [self.abgroup_col, self.uniq_id_col, self.timeseries_col]
+        for col in (
+            spec['continuous_measure_col'],
+            spec['nominator_col'],
+            spec['denominator_col']
+        ):
+            if col is not None and col not in data_cols:
+                data_cols.append(col)
+
+        mask_fingerprint = None
+        if spec['mask'] is not None:
+            mask_fingerprint = fingerprint_values(
+                FrameSlice(self.ab_df).get_mask_values(spec['mask'])
+            )
+
+        return get_cache_key(
+            [self._get_column_fingerprint(col) for col in data_cols],
+            mask_fingerprint,
+            dict(spec, mask=None),
+            self.control_group_name,
+            self._combined_groups,
+            self.ab_hm.significance_level
+        )
+
+    def _get_agg_cache_key(self, agg):
+        positions = agg.get_positions()
+
+        return get_cache_key(
+            agg.get_full_name(),
+            fingerprint_values(positions) if positions is not None else None
+        )
+
+    def _load_cached_metrics(self, agg, spec, arrays):
+        metrics = self._create_metrics(agg, spec)
+        metrics.set_stats(stats_from_arrays(arrays), units_from_arrays(arrays))
+
+        if 'ci' in arrays:
+            metrics.set_uplift_ci(pd.DataFrame(
+                arrays['ci'],
+                index=list(self._combined_groups.keys()),
+                columns=[UPLIFT_CI_LOW_KEY, UPLIFT_CI_HIGH_KEY]
+            ))
+
+        return metrics, arrays.get('pvalues')
+
+    def _get_cache_arrays(self, metrics, spec, pvalues):
+        arrays = stats_to_arrays(metrics.get_stats())
+        if arrays is None:
+            return None
+
+        if spec['continuous_measure_col'] is not None \
+            and metrics.get_units() is not None:
+
+            units_arrays = units_to_arrays(metrics.get_units())
+            if units_arrays is None:
+                return None
+
+            arrays.update(units_arrays)
+
+        if pvalues is not None:
+            arrays['pvalues'] = pvalues
+
+        if metrics.get_uplift_ci() is not None:
+            arrays['ci'] = metrics.get_uplift_ci()[
+                [UPLIFT_CI_LOW_KEY, UPLIFT_CI_HIGH_KEY]
+            ].to_numpy(dtype=np.float64)
+
+        return arrays
+
+    def _calc_metrics(self, aggs, specs, n_jobs):
+        metrics_by_agg = [[None] * len(specs) for _ in aggs]
+        pvalues_by_agg = [[None] * len(specs) for _ in aggs]
+        cache_keys = [[None] * len(specs) for _ in aggs]
+
+        if self.result_cache is not None:
+            spec_keys = [self._get_spec_cache_key(spec) for spec in specs]
+
+            for agg_pos, agg in enumerate(aggs):
+                agg_key = self._get_agg_cache_key(agg)
+
+                for spec_pos, spec in enumerate(specs):
+                    cache_key = get_cache_key(agg_key, spec_keys[spec_pos])
+                    cache_keys[agg_pos][spec_pos] = cache_key
+
+                    with self._profile(STAGE_CACHE, agg, spec['name']):
+                        arrays = self.result_cache.get(cache_key)
+
+                    if arrays is None:
+                        continue
+
+                    metrics, pvalues = self._load_cached_metrics(
+                        agg,
+                        spec,
+                        arrays
+                    )
+                    metrics_by_agg[agg_pos][spec_pos] = metrics
+                    pvalues_by_agg[agg_pos][spec_pos] = pvalues
+
+        missing = [
+            (agg_pos, spec_pos)
+            for agg_pos in range(len(aggs))
+            for spec_pos in range(len(specs))
+            if metrics_by_agg[agg_pos][spec_pos] is None
+        ]
+        miss_aggs = sorted(set(agg_pos for agg_pos, _ in missing))
+        miss_specs = sorted(set(spec_pos for _, spec_pos in missing))
+
+        if len(missing) == 0:
+            calc_metrics_by_agg, calc_pvalues_by_agg = [], []
+        elif self.cube_cols is None and n_jobs is not None and n_jobs > 1 \
+            and len(miss_aggs) > 1:
+
+            with self._profile(
+                STAGE_PARALLEL_METRICS,
+                rows=sum(self._get_agg_rows(aggs[pos]) for pos in miss_aggs)
+            ):
+                calc_metrics_by_agg, calc_pvalues_by_agg = \
+                    self._calc_metrics_parallel(
+                        [aggs[agg_pos] for agg_pos in miss_aggs],
+                        [specs[spec_pos] for spec_pos in miss_specs],
+                        n_jobs
+                    )
+        else:
+            calc_specs = [specs[spec_pos] for spec_pos in miss_specs]
+
+            if self.cube_cols is not None:
+                if n_jobs is not None and n_jobs > 1:
+                    warnings.warn(
+                        'ab test ' + self.name + ' has aggregation '
+                            'combinations, its metrics are rolled up from '
+                            'the aggregation cube in one process, n_jobs is '
+                            'only used for bootstrap',
+                        RuntimeWarning
+                    )
+
+                calc_metrics_by_agg = self._calc_cube_metrics(
+                    [aggs[agg_pos] for agg_pos in miss_aggs],
+                    calc_specs
+                )
+            else:
+                calc_metrics_by_agg = [
+                    self._calc_agg_metrics(aggs[agg_pos], calc_specs)
+                    for agg_pos in miss_aggs
                 ]
+
+            calc_pvalues_by_agg = self._calc_pvalues(
+                calc_specs,
+                calc_metrics_by_agg
+            )
+
+        for calc_pos, agg_pos in enumerate(miss_aggs):
+            for pos, spec_pos in enumerate(miss_specs):
+                if metrics_by_agg[agg_pos][spec_pos] is not None:
+                    continue
+
+                agg = aggs[agg_pos]
+                spec = specs[spec_pos]
+                metrics = calc_metrics_by_agg[calc_pos][pos]
+                pvalues = calc_pvalues_by_agg[calc_pos][pos]
+
+                with self._profile(STAGE_UPLIFT_CI, agg, spec['name']):
+                    self._calc_uplift_ci(metrics, spec, n_jobs)
+
+                metrics_by_agg[agg_pos][spec_pos] = metrics
+                pvalues_by_agg[agg_pos][spec_pos] = pvalues
+
+                if self.result_cache is not None:
+                    with self._profile(STAGE_CACHE, agg, spec['name']):
+                        self.result_cache.put(
+                            cache_keys[agg_pos][spec_pos],
+                            self._get_cache_arrays(metrics, spec, pvalues)
+                        )
+
+        if self.result_cache is not None:
+            for metrics_list, keys in zip(metrics_by_agg, cache_keys):
+                for metrics, cache_key in zip(metrics_list, keys):
+                    metrics.set_result_cache(self.result_cache, cache_key)
+
+        return metrics_by_agg, pvalues_by_agg
+
+    def _calc_pvalues(self, specs, metrics_by_agg):
+        pvalues_by_agg = [[None] * len(specs) for _ in metrics_by_agg]
+
+        for spec_pos, spec in enumerate(specs):
+            agg_positions = [
+                agg_pos
+                for agg_pos, metrics_list in enumerate(metrics_by_agg)
+                if metrics_list[spec_pos] is not None
+            ]
+
+            if spec['hypothesis'] is None or len(agg_positions) == 0:
+                continue
+
+            with self._profile(STAGE_HYPOTHESIS, metrics=spec['name']):
+                pvalues_list = self._create_hypothesis(
+                    spec
+                ).calc_many_pvalues([
+                    metrics_by_agg[agg_pos][spec_pos].get_stats()
+                    for agg_pos in agg_positions
+                ])
+
+            for agg_pos, pvalues in zip(agg_positions, pvalues_list):
+                pvalues_by_agg[agg_pos][spec_pos] = pvalues
+
+        return pvalues_by_agg
+
+    def _calc_uplift_ci(self, metrics, spec, n_jobs):
+        if spec['bootstrap'] is not None:
+            bootstrap = dict(spec['bootstrap'])
+            bootstrap.setdefault('n_jobs', n_jobs)
+
+            metrics.set_uplift_ci(bootstrap_uplift_ci(
+                metrics.get_units(),
+                metrics.get_stats().get_index(),
+                self._combined_groups,
+                **bootstrap
+            ))
+        elif spec['hypothesis'] is not None \
+            and spec['hypothesis'].get('stat_test') == STAT_TEST_DELTA:
+
+            metrics.set_uplift_ci(
+                self._create_hypothesis(spec).calc_uplift_ci(
+                    metrics.get_stats()
+                )
+            )
+
+    def calc_metrics_batch(
+        self,
+        metrics_specs,
+        silent=False,
+        aggregation_values=None,
+        n_jobs=None
+    ):
+        self.restore_data()
+
+        specs = [
+            self._get_folded_spec(_get_metrics_spec(**spec))
+            for spec in metrics_specs
+        ]
+        aggs = self.get_aggregations(aggregation_values)
+
+        if n_jobs is None:
+            n_jobs = self.n_jobs
+
+        with self._profile(STAGE_CALC_METRICS, rows=len(self.ab_df)):
+            metrics_by_agg, pvalues_by_agg = self._calc_metrics(
+                aggs,
+                specs,
+                n_jobs
+            )
+
+        for spec in specs:
+            self._set_metrics_spec(spec)
+
+        self.report.mark_dirty(aggs)
+
+        metrics_results = self._add_metrics_results(
+            aggs,
+            specs,
+            metrics_by_agg,
+            pvalues_by_agg
+        )
+
+        if not self.headless:
+            with self._profile(STAGE_RENDER):
+                display_metrics_results(
+                    metrics_results,
+                    self.abgroup_col,
+                    self.timeseries_col,
+                    silent=silent
+                )
+
+        return metrics_results
+
+    def _set_metrics_spec(self, spec):
+        if spec['mask'] is not None:
+            spec = dict(
+                spec,
+                mask=FrameSlice(self.ab_df).get_mask_values(spec['mask'])
+            )
+
+        self.metrics_specs[spec['name']] = spec
+
+    def _get_appended_mask(self, mask, new_mask, new_rows_df):
+        mask_values = np.concatenate([
+            FrameSlice(self.ab_df).get_mask_values(mask),
+            FrameSlice(new_rows_df).get_mask_values(new_mask)
+        ])
+
+        if len(mask_values) != len(self.ab_df) + len(new_rows_df):
+            raise ValueError(
+                'mask of appended rows does not match appended rows'
+            )
+
+        return mask_values
+
+    def _append_aggregations(self, n_rows):
+        new_rows = np.arange(n_rows, len(self.ab_df))
+        new_rows_by_agg = {}
+        new_aggs = []
+
+        agg_cols = {}
+        for agg in self.aggregations:
+            if agg.is_whole_data:
+                new_rows_by_agg[agg] = new_rows
+            elif agg.get_name() not in agg_cols:
+                agg_cols[agg.get_name()] = tuple(agg.get_cols()) \
+                    if agg.is_combination else agg.get_name()
+
+        for agg_name, agg_col in agg_cols.items():
+            col_aggs = {
+                agg.get_value(): agg
+                for agg in self.aggregations
+                if agg.get_name() == agg_name
+            }
+            slice_index = SliceIndex(
+                self.ab_df.iloc[n_rows:],
+                list(agg_col) if Aggregation.is_combination_col(agg_col)
+                    else agg_col
+            )
+
+            for agg_value in slice_index.get_values():
+                positions = new_rows[slice_index.get_positions(agg_value)]
+
+                if agg_value in col_aggs:
+                    col_aggs[agg_value].append_positions(positions)
+                    new_rows_by_agg[col_aggs[agg_value]] = positions
+                    continue
+
+                last_pos = max(
+                    pos for pos, agg in enumerate(self.aggregations)
+                    if agg.get_name() == agg_name
+                )
+                agg = Aggregation(
+                    agg_col,
+                    agg_value,
+                    self.ab_df,
+                    positions=positions
+                )
+                self.aggregations.insert(last_pos + 1, agg)
+                new_aggs.append(agg)
+
+        aggs = [agg for agg in self.aggregations if agg in new_rows_by_agg]
+
+        return aggs, [new_rows_by_agg[agg] for agg in aggs], new_aggs
+
+    @staticmethod
+    def _is_foldable(metrics, spec):
+        return metrics.get_units() is not None and (
+            spec['outliers'] is None
+                or spec['continuous_measure_col'] is None
+        )
+
+    def _append_agg_metrics(self, agg, specs, new_rows):
+        specs = [
+            spec if spec['name'] in agg.metrics_dct else None
+            for spec in specs
+        ]
+
+        recalc_specs = [
+            spec for spec in specs
+            if spec is not None and not self._is_foldable(
+                agg.metrics_dct[spec['name']],
+                spec
+            )
+        ]
+
+        recalc_metrics = {}
+        if len(recalc_specs) > 0:
+            for spec, metrics in zip(
+                recalc_specs,
+                self._calc_agg_metrics(agg, recalc_specs)
+            ):
+                recalc_metrics[spec['name']] = metrics
+
+        with self._profile(STAGE_SLICE, agg, rows=len(new_rows)):
+            unit_grouper = UnitGrouper.from_columns(
+                FrameSlice(self.ab_df, new_rows),
+                [self.abgroup_col],
+                self.uniq_id_col
+            )
+
+        metrics_list = []
+        for spec in specs:
+            if spec is None:
+                metrics_list.append(None)
+                continue
+
+            if spec['name'] in recalc_metrics:
+                metrics_list.append(recalc_metrics[spec['name']])
+                continue
+
+            previous_metrics = agg.metrics_dct[spec['name']]
+            metrics = self._create_metrics(agg, spec)
+
+            with self._profile(
+                STAGE_METRICS,
+                agg,
+                spec['name'],
+                len(new_rows)
+            ):
+                units, group_index = merge_unit_values(
+                    previous_metrics.get_units(),
+                    previous_metrics.get_stats().get_index(),
+                    metrics.calc_units(
+                        unit_grouper,
+                        row_mask=unit_grouper.get_row_mask(spec['mask'])
+                            if spec['mask'] is not None else None
+                    ),
+                    unit_grouper.get_group_index()
+                )
+
+                metrics.set_stats(
+                    GroupStats.from_unit_values(units, group_index),
+                    units
+                )
+
+            metrics_list.append(metrics)
+
+        return metrics_list
+
+    def _cache_metrics(self, aggs, specs, metrics_by_agg, pvalues_by_agg):
+        if self.result_cache is None:
+            return
+
+        spec_keys = [self._get_spec_cache_key(spec) for spec in specs]
+
+        for agg, metrics_list, pvalues_list in zip(
+            aggs,
+            metrics_by_agg,
+            pvalues_by_agg
+        ):
+            agg_key = self._get_agg_cache_key(agg)
+
+            for spec, spec_key, metrics, pvalues in zip(
+                specs,
+                spec_keys,
+                metrics_list,
+                pvalues_list
+            ):
+                if metrics is None:
+                    continue
+
+                cache_key = get_cache_key(agg_key, spec_key)
+
+                with self._profile(STAGE_CACHE, agg, spec['name']):
+                    self.result_cache.put(
+                        cache_key,
+                        self._get_cache_arrays(metrics, spec, pvalues)
+                    )
+
+                metrics.set_result_cache(self.result_cache, cache_key)
+
+    def append(self, new_rows_df, masks=None, silent=False, n_jobs=None):
+        self.restore_data()
+
+        if n_jobs is None:
+            n_jobs = self.n_jobs
+
+        masks = masks or {}
+        specs = list(self.metrics_specs.values())
+
+        for spec in specs:
+            if spec['mask'] is not None and spec['name'] not in masks:
+                raise ValueError(
+                    'metrics ' + str(spec['name']) + ' has a mask, '
+                    'pass the mask of the appended rows in masks'
+                )
+
+        if self.folder_args is not None:
+            if len(masks) > 0:
+                raise ValueError('masks can not be appended to folded data')
+
+            new_rows_df = ABManager._get_folder(*self.folder_args)\
+                .add_chunks([new_rows_df])\
+                .get_frame()
+
+        missing_cols = [
+            col for col in self.ab_df.columns
+            if col not in new_rows_df.columns
+        ]
+        if len(missing_cols) > 0:
+            raise ValueError(
+                'appended rows have no columns '
+                    + ', '.join(map(str, missing_cols))
+            )
+
+        new_groups = pd.Index(
+            np.asarray(new_rows_df[self.abgroup_col].dropna().unique())
+        ).difference(pd.Index(np.asarray(self.available_groups)))
+        if len(new_groups) > 0:
+            raise ValueError(
+                'appended rows have new groups '
+                    + ', '.join(map(str, new_groups))
+                    + ', set the ab test again'
             )
 
-            metrics.calc()
+        new_rows_df = new_rows_df[list(self.ab_df.columns)]
+        specs = [
+            dict(
+                spec,
+                mask=self._get_appended_mask(
+                    spec['mask'],
+                    masks[spec['name']],
+                    new_rows_df
+                )
+            ) if spec['mask'] is not None else spec
+            for spec in specs
+        ]
+
+        with self._profile(STAGE_APPEND, rows=len(new_rows_df)):
+            n_rows = len(self.ab_df)
+            for agg in self.aggregations:
+                agg.get_positions()
+
+            self._set_data(self._concat_rows(self.ab_df, new_rows_df))
+            self._column_fingerprints = {}
+            self.appended_rows.append(new_rows_df)
 
-            self.report.clear_report()
+            for spec in specs:
+                self._set_metrics_spec(spec)
 
+            aggs, new_rows_by_agg, new_aggs = self._append_aggregations(
+                n_rows
+            )
+
+            metrics_by_agg = [
+                self._append_agg_metrics(agg, specs, new_rows)
+                for agg, new_rows in zip(aggs, new_rows_by_agg)
+            ]
+            pvalues_by_agg = self._calc_pvalues(specs, metrics_by_agg)
+
+            for agg, metrics_list in zip(aggs, metrics_by_agg):
+                for spec, metrics in zip(specs, metrics_list):
+                    if metrics is None:
+                        continue
+
+                    with self._profile(STAGE_UPLIFT_CI, agg, spec['name']):
+                        self._calc_uplift_ci(metrics, spec, n_jobs)
+
+            self._cache_metrics(aggs, specs, metrics_by_agg, pvalues_by_agg)
+
+            new_metrics_by_agg, new_pvalues_by_agg = self._calc_metrics(
+                new_aggs,
+                specs,
+                n_jobs
+            )
+
+            self.info_df = self._get_info_df()
+
+        self.report.mark_dirty(aggs + new_aggs)
+
+        metrics_results = self._add_metrics_results(
+            aggs + new_aggs,
+            specs,
+            metrics_by_agg + new_metrics_by_agg,
+            pvalues_by_agg + new_pvalues_by_agg
+        )
+
+        if not self.headless:
+            with self._profile(STAGE_RENDER):
+                display_metrics_results(
+                    metrics_results,
+                    self.abgroup_col,
+                    self.timeseries_col,
+                    silent=silent
+                )
+
+        return metrics_results
+
+    def _add_metrics_results(
+        self,
+        aggs,
+        specs,
+        metrics_by_agg,
+        pvalues_by_agg
+    ):
+        hypothesis_by_agg = [[None] * len(specs) for _ in aggs]
+        for spec_pos, spec in enumerate(specs):
             h = None
-            if hypothesis is not None:
-                h = ABHypothesis(
-                    name=name,
-                    nominator_col=nominator_col,
-                    denominator_col=denominator_col,
-                    continuous_measure_col=continuous_measure_col,
-                    control_group_name=self.control_group_name,
-                    combined_groups=self._combined_groups,
-                    group_col=self.abgroup_col,
-                    **hypothesis
+            if spec['hypothesis'] is not None:
+                h = self._create_hypothesis(spec)
+
+            for agg_pos, agg in enumerate(aggs):
+                metrics = metrics_by_agg[agg_pos][spec_pos]
+                if metrics is None:
+                    continue
+
+                agg.add_metrics(metrics)
+
+                if h is None:
+                    continue
+
+                agg_h = h.copy()
+                agg_h.set_test(
+                    h.get_test_frame(pvalues_by_agg[agg_pos][spec_pos])
                 )
 
-                output_df = metrics.get_output()
-
-                output_df.index = \
-                    output_df.index.get_level_values(self.abgroup_col)
-
-                h.test(output_df)
-
-                self.ab_hm.add_hypothesis(agg, metrics, h)
-
-            if not silent:
-                display(Markdown('### Metrics ' + metrics.get_name()))
-                display(self._get_metrics_report(
-                    metrics.get_calc(
-                        calc_relation=True,
-                        use_format=True
-                    ).T,
-                    h.get_test().T
-                ))
-
-                PeriodChart(
-                    metrics.copy(),
-                    hue_col=self.abgroup_col,
-                    timeseries_col=self.timeseries_col
-                ).draw()
-
-                if continuous_measure_col is not None:
-                    DistributionChart(
-                        metrics.copy(),
-                        hue_col=self.abgroup_col,
-                        outliers=outliers,
-                        outliers_quantile=outliers_quantile,
-                        outliers_quantile_min_value=outliers_quantile_min_value
-                    ).draw()
-
-                if h is not None:
-                    PValueChart(
-                        metrics.copy(),
-                        self.abgroup_col,
-                        timeseries_col=self.timeseries_col,
-                        hypothesis=h
-                    ).draw()
+                self.ab_hm.add_hypothesis(agg, metrics, agg_h)
 
-    def print_statistics_report(self, correction_method='holm'):
+                hypothesis_by_agg[agg_pos][spec_pos] = agg_h
+
+        return [
+            MetricsResult(agg, metrics, h)
+            for agg, metrics_list, hypothesis_list in zip(
+                aggs,
+                metrics_by_agg,
+                hypothesis_by_agg
+            )
+            for metrics, h in zip(metrics_list, hypothesis_list)
+            if metrics is not None
+        ]
+
+    def get_statistics_report(self, correction_method='holm'):
         self.ab_hm.set_multiple_hypothesis_correction(correction_method)
 
-        self.report.display()
+        with self._profile(STAGE_REPORT):
+            return self.report.get_result()
+
+    def print_statistics_report(self, correction_method='holm'):
+        report_result = self.get_statistics_report(correction_method)
+
+        if not self.headless:
+            display_report_result(report_result)
+
+        return report_result
 
     def save_report_to_excel(self, filename_or_path, correction_method='holm'):
         self.ab_hm.set_multiple_hypothesis_correction(correction_method)
 
-        self.report.save_to_excel(
-            filename_or_path,
-            info_df=self.info_df
-        )
+        with self._profile(STAGE_EXCEL_EXPORT):
+            self.report.save_to_excel(
+                filename_or_path,
+                info_df=self.info_df
+            )
+
+        if not self.headless:
+            print('saved to file', filename_or_path)
+
+    def get_long_report(self, correction_method='holm'):
+        self.ab_hm.set_multiple_hypothesis_correction(correction_method)
+
+        with self._profile(STAGE_REPORT):
+            return self.report.get_long_report()
+
+    def save_report_to_parquet(
+        self,
+        filename_or_path,
+        correction_method='holm'
+    ):
+        self.ab_hm.set_multiple_hypothesis_correction(correction_method)
+
+        with self._profile(STAGE_COLUMNAR_EXPORT):
+            self.report.save_to_parquet(filename_or_path)
+
+        if not self.headless:
+            print('saved to file', filename_or_path)
+
+    def save_report_to_jsonl(self, filename_or_path, correction_method='holm'):
+        self.ab_hm.set_multiple_hypothesis_correction(correction_method)
+
+        with self._profile(STAGE_COLUMNAR_EXPORT):
+            self.report.save_to_jsonl(filename_or_path)
 
-        print('saved to file', filename_or_path)
+        if not self.headless:
+            print('saved to file', filename_or_path)
 
     def __repr__(self):
         return self.name
\ No newline at end of file
@@ -1,17 +1,30 @@
 import pandas as pd
 
-from IPython.display import display
-
 from .ab_consts import R_AGGREGATION_COL
 from .ab_consts import METRIC_COL_NAME
+from .columnar_export import get_empty_long_report
+from .columnar_export import get_metrics_long_report
+from .columnar_export import write_jsonl
+from .columnar_export import write_parquet
+from .excel_export import StreamingSheetWriter
+from .excel_export import get_sheet_name
+from .excel_export import open_write_only_workbook
+from .rendering import display_report_result
+from .results import ReportResult
 
 
 REPORTS_BOTTOM_MARGIN = 3
 
 class ABReport:
-    def __init__(self, aggregations, ab_hypothesis_manager):
+    def __init__(
+        self,
+        aggregations,
+        ab_hypothesis_manager,
+        combined_groups=None
+    ):
         self.aggregations = aggregations
         self.ab_hm = ab_hypothesis_manager
+        self.combined_groups = combined_groups or {}
 
         self.clear_report()
 
@@ -19,157 +32,226 @@ class ABReport:
         self.report_df = None
         self.report_mh_df = None
 
-    def prepare_report(self):
-        if self.report_df is not None:
-            return self.report_df
+        self.correction_method = None
+        self.agg_reports = {}
+        self.agg_mh_reports = {}
 
-        self.report_df = pd.DataFrame()
+    def mark_dirty(self, aggs):
+        for agg in aggs:
+            self.agg_reports.pop(agg.get_full_name(), None)
+            self.agg_mh_reports.pop(agg.get_full_name(), None)
 
-        for agg in self.aggregations:
-            agg_df = pd.DataFrame()
-            print('agg: ', agg.get_full_name())
-            for metrics in agg.get_metrics_list():
-                m_df = metrics.get_calc(
-                    calc_relation=True,
-                    use_format=True
-                )
+        self.report_df = None
+        self.report_mh_df = None
 
-                hcorr_pvalues_df = self.ab_hm.get_hypothesis_corrected_pvalue(
-                    agg,
-                    metrics
-                )
+    def _check_correction_method(self):
+        if self.ab_hm.mh_correction_method != self.correction_method:
+            self.clear_report()
+            self.correction_method = self.ab_hm.mh_correction_method
 
-                hcorr_pvalues_df.index = list(
-                    map(
-                        lambda i: hcorr_pvalues_df.columns[0] + ' ' + str(i),
-                        hcorr_pvalues_df.index
-                    )
-                )
-                hcorr_pvalues_df.columns = m_df.columns
-                m_df = pd.concat([m_df, hcorr_pvalues_df])
+    def _get_cached_agg_report(self, reports, agg, get_report):
+        agg_name = agg.get_full_name()
 
-                hacceptance_df = self.ab_hm.get_hypothesis_acceptance(
-                    agg,
-                    metrics
-                )
+        if agg_name not in reports:
+            reports[agg_name] = get_report(agg)
 
-                hacceptance_df.index = list(
-                    map(
-                        lambda i: hacceptance_df.columns[0] + ' ' + str(i),
-                        hacceptance_df.index
-                    )
-                )
-                hacceptance_df.columns = m_df.columns
-                m_df = pd.concat([m_df, hacceptance_df])
-                m_df.columns = [metrics.get_name()]
+        return reports[agg_name]
 
-                agg_df = pd.concat([agg_df, m_df.T])
+    def _get_agg_report(self, agg):
+        metrics_dfs = []
+        for metrics in agg.get_metrics_list():
+            m_df = metrics.get_calc(
+                calc_relation=True,
+                use_format=True
+            )
 
-                agg_df[R_AGGREGATION_COL] = agg.get_full_name()
-            self.report_df = pd.concat([self.report_df, agg_df])
+            hcorr_pvalues_df = self.ab_hm.get_hypothesis_corrected_pvalue(
+                agg,
+                metrics
+            )
 
-    def prepare_multiple_hypothesis_report(self):
-        if self.report_mh_df is not None:
-            return self.report_mh_df
+            hcorr_pvalues_df.index = list(
+                map(
+                    lambda i: hcorr_pvalues_df.columns[0] + ' ' + str(i),
+                    hcorr_pvalues_df.index
+                )
+            )
+            hcorr_pvalues_df.columns = m_df.columns
+            m_df = pd.concat([m_df, hcorr_pvalues_df])
+
+            hacceptance_df = self.ab_hm.get_hypothesis_acceptance(
+                agg,
+                metrics
+            )
+
+            hacceptance_df.index = list(
+                map(
+                    lambda i: hacceptance_df.columns[0] + ' ' + str(i),
+                    hacceptance_df.index
+                )
+            )
+            hacceptance_df.columns = m_df.columns
+            m_df = pd.concat([m_df, hacceptance_df])
+            m_df.columns = [metrics.get_name()]
 
-        self.report_mh_df = pd.DataFrame()
+            metrics_dfs.append(m_df.T)
 
-        for agg in self.aggregations:
-            agg_df = pd.DataFrame()
+        return self._concat_agg_dfs(agg, metrics_dfs)
 
-            for metrics in agg.get_metrics_list():
-                h_df = self.ab_hm.get_hypothesis(agg, metrics).get_test()
+    def _get_agg_mh_report(self, agg):
+        metrics_dfs = []
 
-                hcorr_pvalues_df = self.ab_hm.get_hypothesis_corrected_pvalue(
-                    agg,
-                    metrics
-                )
+        for metrics in agg.get_metrics_list():
+            h_df = self.ab_hm.get_hypothesis(agg, metrics).get_test()
 
-                hacceptance_df = self.ab_hm.get_hypothesis_acceptance(
-                    agg,
-                    metrics
-                )
+            hcorr_pvalues_df = self.ab_hm.get_hypothesis_corrected_pvalue(
+                agg,
+                metrics
+            )
 
-                corrected_h_df = h_df.join(
-                    hcorr_pvalues_df
-                ).join(
-                    hacceptance_df
-                )
+            hacceptance_df = self.ab_hm.get_hypothesis_acceptance(
+                agg,
+                metrics
+            )
 
-                corrected_h_df.index = pd.MultiIndex.from_product(
-                    [[metrics.get_name()], corrected_h_df.index],
-                    names=[METRIC_COL_NAME, '']
-                )
+            corrected_h_df = h_df.join(
+                hcorr_pvalues_df
+            ).join(
+                hacceptance_df
+            )
 
-                agg_df = pd.concat([agg_df, corrected_h_df])
+            corrected_h_df.index = pd.MultiIndex.from_product(
+                [[metrics.get_name()], corrected_h_df.index],
+                names=[METRIC_COL_NAME, '']
+            )
 
-                agg_df[R_AGGREGATION_COL] = agg.get_full_name()
+            metrics_dfs.append(corrected_h_df)
 
-            self.report_mh_df = pd.concat([self.report_mh_df, agg_df])
+        return self._concat_agg_dfs(agg, metrics_dfs)
 
-    def display(self):
-        self.prepare_report()
-        self.prepare_multiple_hypothesis_report()
+    @staticmethod
+    def _concat_agg_dfs(agg, metrics_dfs):
+        agg_df = pd.concat([pd.DataFrame()] + metrics_dfs)
 
-        for agg in self.aggregations:
-            agg_df = self.report_df[
-                self.report_df[R_AGGREGATION_COL] == agg.get_full_name()
-            ]
-
-            agg_mh_df = self.report_mh_df[
-                self.report_mh_df[R_AGGREGATION_COL] == agg.get_full_name()
-            ]
+        if len(metrics_dfs) > 0:
+            agg_df[R_AGGREGATION_COL] = agg.get_full_name()
 
-            display(agg.get_formatted_name())
+        return agg_df
 
-            display(agg_df.drop(columns=[R_AGGREGATION_COL]))
+    def _get_agg_long_report(self, agg):
+        metrics_dfs = []
+        for metrics in agg.get_metrics_list():
+            correction_df = None
+            if self.ab_hm.has_hypothesis(agg, metrics):
+                correction_df = self.ab_hm.get_metrics_correction(
+                    agg,
+                    metrics
+                )
 
-            display(agg_mh_df.drop(columns=[R_AGGREGATION_COL]))
+            metrics_dfs.append(get_metrics_long_report(
+                agg,
+                metrics,
+                self.combined_groups,
+                correction_df=correction_df,
+                correction_method=self.ab_hm.mh_correction_method
+            ))
 
-    def save_to_excel(self, filename_or_path, info_df = None):
-        self.prepare_multiple_hypothesis_report()
-        self.prepare_report()
+        if len(metrics_dfs) == 0:
+            return get_empty_long_report()
 
-        with pd.ExcelWriter(
-                filename_or_path
-            ) as fexcel:
-            for agg in self.aggregations:
-                if agg.get_value() == '*':
-                    sheet_name = '_all'
-                else:
-                    sheet_name = agg.get_value()
+        return pd.concat(metrics_dfs, ignore_index=True)
 
-                start_row = 0
+    def iter_long_reports(self):
+        for agg in self.aggregations:
+            yield self._get_agg_long_report(agg)
 
-                agg_df = self.report_df[
-                    self.report_df[R_AGGREGATION_COL] == agg.get_full_name()
-                ]
+    def get_long_report(self):
+        return pd.concat(
+            [get_empty_long_report()] + list(self.iter_long_reports()),
+            ignore_index=True
+        )
 
-                agg_mh_df = self.report_mh_df[
-                    self.report_mh_df[R_AGGREGATION_COL] == agg.get_full_name()
-                ]
+    def save_to_parquet(self, filename_or_path):
+        write_parquet(self.iter_long_reports(), filename_or_path)
 
+    def save_to_jsonl(self, filename_or_path):
+        write_jsonl(self.iter_long_reports(), filename_or_path)
 
-                if info_df is not None:
-                    info_df.to_excel(
-                        fexcel,
-                        sheet_name=sheet_name,
-                        startrow=start_row,
-                        index=None
-                    )
+    def prepare_report(self):
+        self._check_correction_method()
 
-                    start_row += info_df.shape[0] + 1 + REPORTS_BOTTOM_MARGIN
+        if self.report_df is not None:
+            return self.report_df
 
-                agg_df.drop(columns=[R_AGGREGATION_COL]).to_excel(
-                    fexcel,
-                    sheet_name=sheet_name,
-                    startrow=start_row
+        self.report_df = pd.concat(
+            [pd.DataFrame()] + [
+                self._get_cached_agg_report(
+                    self.agg_reports,
+                    agg,
+                    self._get_agg_report
                 )
+                for agg in self.aggregations
+            ]
+        )
 
-                start_row += agg_df.shape[0] + 1 + REPORTS_BOTTOM_MARGIN
+    def prepare_multiple_hypothesis_report(self):
+        self._check_correction_method()
+
+        if self.report_mh_df is not None:
+            return self.report_mh_df
 
-                agg_mh_df.drop(columns=[R_AGGREGATION_COL]).to_excel(
-                    fexcel,
-                    sheet_name=sheet_name,
-                    startrow=start_row
+        self.report_mh_df = pd.concat(
+            [pd.DataFrame()] + [
+                self._get_cached_agg_report(
+                    self.agg_mh_reports,
+                    agg,
+                    self._get_agg_mh_report
                 )
+                for agg in self.aggregations
+            ]
+        )
+
+    def get_result(self):
+        self.prepare_report()
+        self.prepare_multiple_hypothesis_report()
+
+        return ReportResult(
+            self.aggregations,
+            self.report_df,
+            self.report_mh_df
+        )
+
+    def display(self):
+        display_report_result(self.get_result())
+
+    def save_to_excel(self, filename_or_path, info_df = None):
+        workbook = open_write_only_workbook()
+        used_sheet_names = set()
+
+        for agg in self.aggregations:
+            if agg.get_value() == '*':
+                sheet_name = '_all'
+            else:
+                sheet_name = agg.get_value_label()
+
+            sheet_writer = StreamingSheetWriter(workbook.create_sheet(
+                get_sheet_name(sheet_name, used_sheet_names)
+            ))
+
+            if info_df is not None:
+                sheet_writer.append_frame(info_df, index=False)
+                sheet_writer.append_empty_rows(REPORTS_BOTTOM_MARGIN)
+
+            agg_df = self._get_agg_report(agg)
+            sheet_writer.append_frame(
+                agg_df.drop(columns=[R_AGGREGATION_COL], errors='ignore')
+            )
+            sheet_writer.append_empty_rows(REPORTS_BOTTOM_MARGIN)
+
+            agg_mh_df = self._get_agg_mh_report(agg)
+            sheet_writer.append_frame(
+                agg_mh_df.drop(columns=[R_AGGREGATION_COL], errors='ignore')
+            )
+            sheet_writer.close()
+
+        workbook.save(filename_or_path)
@@ -1,4 +1,6 @@
-from IPython.core.display import Markdown
+import numpy as np
+
+from .slice_index import SliceIndex
 
 
 _USE_WHOLE_DATA_KEYWORDS = [
@@ -14,16 +16,28 @@ class Aggregation:
         agg_name,
         agg_value,
         data_df,
-        grouping_cols = None
+        grouping_cols = None,
+        positions = None
     ) -> None:
+        self.is_combination = Aggregation.is_combination_col(agg_name)
+        if self.is_combination:
+            self.agg_cols = list(agg_name)
+            agg_name = ', '.join(map(str, agg_name))
+            if not isinstance(agg_value, tuple):
+                agg_value = (agg_value,)
+        else:
+            self.agg_cols = [agg_name]
+
         self.agg_name = agg_name
-        self.is_whole_data = agg_name in _USE_WHOLE_DATA_KEYWORDS
+        self.is_whole_data = not self.is_combination \
+            and agg_name in _USE_WHOLE_DATA_KEYWORDS
 
         self.agg_value = _USE_WHOLE_DATA_KEYWORDS[0] if self.is_whole_data\
             else agg_value
 
         self.data_df = data_df
         self.grouping_cols = grouping_cols
+        self.positions = None if self.is_whole_data else positions
 
         self.metrics_dct = {}
 
@@ -33,18 +47,40 @@ class Aggregation:
     def get_value(self):
         return self.agg_value
 
+    def get_values(self):
+        if self.is_combination:
+            return list(self.agg_value)
+
+        return [self.agg_value]
+
+    def get_value_label(self):
+        return ', '.join(map(str, self.get_values()))
+
+    def get_cols(self):
+        if self.is_whole_data:
+            return []
+
+        return list(self.agg_cols)
+
     def __repr__(self) -> str:
         return self.get_full_name()
 
     def get_full_name(self, use_markdown=False):
         if self.is_whole_data:
             fname = 'Whole dataset'
+        elif self.is_combination:
+            fname = ', '.join(
+                str(col) + ' = ' + str(value)
+                for col, value in zip(self.agg_cols, self.agg_value)
+            )
         else:
             fname = self.agg_name + (
                 ' = ' + self.agg_value if self.agg_value is not None else ''
             )
 
         if use_markdown:
+            from IPython.core.display import Markdown
+
             return Markdown('# ' + fname)
 
         return fname
@@ -62,25 +98,77 @@ class Aggregation:
     def get_metrics_list(self):
         return list(self.metrics_dct.values())
 
+    def get_positions(self):
+        if self.positions is None and not self.is_whole_data:
+            mask = np.ones(len(self.data_df), dtype=bool)
+            for col, value in zip(self.get_cols(), self.get_values()):
+                mask &= (self.data_df[col] == value).to_numpy()
+
+            self.positions = np.flatnonzero(mask)
+
+        return self.positions
+
+    def append_positions(self, positions):
+        if not self.is_whole_data:
+            self.positions = np.concatenate([self.get_positions(), positions])
+
+    def get_data(self):
+        return self.data_df
+
+    def set_data(self, data_df):
+        self.data_df = data_df
+
     def get_mask(self):
         if not self.is_whole_data:
-            return self.data_df[self.agg_name] == self.agg_value
+            mask = np.zeros(len(self.data_df), dtype=bool)
+            mask[self.get_positions()] = True
+
+            return mask
 
     def get_dataframe(self):
-        mask = self.get_mask()
-        if mask is not None:
-            return self.data_df[mask]
+        if not self.is_whole_data:
+            return self.data_df.take(self.get_positions())
 
         return self.data_df
 
     def get_group_col_list(self):
-        if self.is_whole_data:
-            return []
-        return [self.agg_name]
+        return self.get_cols()
 
     def get_formatted_name(self):
+        from IPython.core.display import Markdown
+
         return Markdown('# Aggregation: ' + self.get_full_name())
 
+    @staticmethod
+    def is_combination_col(agg_col):
+        return isinstance(agg_col, (tuple, list))
+
+    @staticmethod
+    def has_combinations(aggregations):
+        return aggregations is not None and any(
+            Aggregation.is_combination_col(agg_col) for agg_col in aggregations
+        )
+
+    @staticmethod
+    def get_aggregation_cols(aggregations):
+        if aggregations is None:
+            return []
+
+        agg_cols = []
+        for agg_col in aggregations:
+            if Aggregation.is_combination_col(agg_col):
+                cols = list(agg_col)
+            elif agg_col not in _USE_WHOLE_DATA_KEYWORDS:
+                cols = [agg_col]
+            else:
+                cols = []
+
+            for col in cols:
+                if col not in agg_cols:
+                    agg_cols.append(col)
+
+        return agg_cols
+
     @staticmethod
     def generate_aggregation(data_df, aggregations):
         aggs = []
@@ -92,6 +180,17 @@ class Aggregation:
             ))
         else:
             for agg_col in aggregations:
+                if Aggregation.is_combination_col(agg_col):
+                    slice_index = SliceIndex(data_df, list(agg_col))
+                    for agg_value in slice_index.get_values():
+                        aggs.append(Aggregation(
+                            tuple(agg_col),
+                            agg_value,
+                            data_df,
+                            positions=slice_index.get_positions(agg_value)
+                        ))
+                    continue
+
                 if agg_col in _USE_WHOLE_DATA_KEYWORDS:
                     aggs.append(Aggregation(
                         _USE_WHOLE_DATA_KEYWORDS[0],
@@ -100,12 +199,13 @@ class Aggregation:
                     ))
                     continue
 
-                agg_values = data_df[agg_col].drop_duplicates()
-                for agg_value in agg_values:
+                slice_index = SliceIndex(data_df, agg_col)
+                for agg_value in slice_index.get_values():
                     aggs.append(Aggregation(
                         agg_col,
                         agg_value,
-                        data_df
+                        data_df,
+                        positions=slice_index.get_positions(agg_value)
                     ))
 
         return aggs
\ No newline at end of file
@@ -0,0 +1,216 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .ab_consts import DEFAULT_BOOTSTRAP_CHUNK_CELLS
+from .ab_consts import DEFAULT_BOOTSTRAP_REPLICATES
+from .ab_consts import DEFAULT_CONFIDENCE_LEVEL
+from .ab_consts import H_CONTROL_GROUP_KEY
+from .ab_consts import H_TEST_GROUP_KEY
+from .ab_consts import UPLIFT_CI_HIGH_KEY
+from .ab_consts import UPLIFT_CI_LOW_KEY
+
+
+_POISSON_TABLE_BITS = 16
+
+_worker_cells = {}
+
+
+def _get_poisson_table():
+    size = 2 ** _POISSON_TABLE_BITS
+
+    k = np.arange(32)
+    log_pmf = -1.0 - np.cumsum(np.log(np.maximum(k, 1)))
+    cdf = np.cumsum(np.exp(log_pmf))
+
+    return np.searchsorted(
+        np.round(cdf * size),
+        np.arange(size),
+        side='right'
+    ).astype(np.uint8)
+
+
+_POISSON_TABLE = _get_poisson_table()
+
+
+class BootstrapCells:
+    def __init__(self, units, n_groups):
+        columns = {'group': units.group_codes, 'x': units.x}
+        if units.y is not None:
+            columns['y'] = units.y
+
+        cells = pd.DataFrame(columns)\
+            .groupby(list(columns), sort=False)\
+            .size()\
+            .reset_index(name='count')
+
+        group_codes = cells['group'].to_numpy()
+        count = cells['count'].to_numpy(dtype=np.int64)
+
+        order = np.lexsort((count > 1, group_codes))
+        group_codes = group_codes[order]
+
+        self.n_groups = n_groups
+        self.x = cells['x'].to_numpy(dtype=np.float64)[order]
+        self.y = cells['y'].to_numpy(dtype=np.float64)[order] \
+            if units.y is not None else None
+        self.count = count[order]
+
+        self.bounds = np.searchsorted(group_codes, np.arange(n_groups + 1))
+        self.multi_starts = self.bounds[:-1] + np.bincount(
+            group_codes[self.count == 1],
+            minlength=n_groups
+        )
+
+    def __len__(self):
+        return len(self.count)
+
+    def draw_weights(self, rng, n_replicates, group):
+        start = self.bounds[group]
+        multi_start = self.multi_starts[group]
+        end = self.bounds[group + 1]
+
+        weights = np.empty((n_replicates, end - start), dtype=np.float64)
+
+        weights[:, :multi_start - start] = _POISSON_TABLE[
+            rng.integers(
+                0,
+                len(_POISSON_TABLE),
+                size=(n_replicates, multi_start - start),
+                dtype=np.uint16
+            )
+        ]
+        weights[:, multi_start - start:] = rng.poisson(
+            self.count[multi_start:end],
+            size=(n_replicates, end - multi_start)
+        )
+
+        return weights
+
+    def resample(self, seed, n_replicates):
+        rng = np.random.default_rng(seed)
+
+        x_sums = np.zeros((n_replicates, self.n_groups))
+        y_sums = np.zeros((n_replicates, self.n_groups)) \
+            if self.y is not None else None
+
+        for group in range(self.n_groups):
+            group_cells = slice(self.bounds[group], self.bounds[group + 1])
+            weights = self.draw_weights(rng, n_replicates, group)
+
+            x_sums[:, group] = weights @ self.x[group_cells]
+            if y_sums is not None:
+                y_sums[:, group] = weights @ self.y[group_cells]
+
+        return x_sums, y_sums
+
+
+def _init_worker(cells):
+    _worker_cells['cells'] = cells
+
+
+def _resample_task(task):
+    seed, n_replicates = task
+
+    return _worker_cells['cells'].resample(seed, n_replicates)
+
+
+def get_replicate_chunks(
+    n_cells,
+    n_replicates,
+    seed=0,
+    chunk_cells=DEFAULT_BOOTSTRAP_CHUNK_CELLS
+):
+    chunk_size = max(1, min(n_replicates, chunk_cells // max(n_cells, 1)))
+    chunk_sizes = [chunk_size] * (n_replicates // chunk_size)
+    if n_replicates % chunk_size > 0:
+        chunk_sizes.append(n_replicates % chunk_size)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    return list(zip(seeds, chunk_sizes))
+
+
+def poisson_bootstrap(
+    units,
+    n_groups,
+    n_replicates=DEFAULT_BOOTSTRAP_REPLICATES,
+    seed=0,
+    chunk_cells=DEFAULT_BOOTSTRAP_CHUNK_CELLS,
+    n_jobs=None
+):
+    cells = BootstrapCells(units, n_groups)
+    tasks = get_replicate_chunks(len(cells), n_replicates, seed, chunk_cells)
+
+    if n_jobs is not None and n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(cells,)
+        ) as executor:
+            results = list(executor.map(_resample_task, tasks))
+    else:
+        results = [
+            cells.resample(chunk_seed, chunk_size)
+            for chunk_seed, chunk_size in tasks
+        ]
+
+    x_sums = np.concatenate([x_sums for x_sums, _ in results])
+    if cells.y is None:
+        return x_sums, None
+
+    return x_sums, np.concatenate([y_sums for _, y_sums in results])
+
+
+def bootstrap_uplift_ci(
+    units,
+    group_index,
+    combined_groups,
+    n_replicates=DEFAULT_BOOTSTRAP_REPLICATES,
+    confidence_level=DEFAULT_CONFIDENCE_LEVEL,
+    seed=0,
+    chunk_cells=DEFAULT_BOOTSTRAP_CHUNK_CELLS,
+    n_jobs=None
+):
+    x_sums, y_sums = poisson_bootstrap(
+        units,
+        len(group_index),
+        n_replicates=n_replicates,
+        seed=seed,
+        chunk_cells=chunk_cells,
+        n_jobs=n_jobs
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = x_sums / y_sums if y_sums is not None else x_sums
+
+    alpha = 1 - confidence_level
+    ci = {}
+    for combination_name, groups in combined_groups.items():
+        if groups[H_CONTROL_GROUP_KEY] not in group_index \
+            or groups[H_TEST_GROUP_KEY] not in group_index:
+
+            ci[combination_name] = [np.nan, np.nan]
+            continue
+
+        control_values = values[
+            :,
+            group_index.get_loc(groups[H_CONTROL_GROUP_KEY])
+        ]
+        test_values = values[:, group_index.get_loc(groups[H_TEST_GROUP_KEY])]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            uplift = test_values / control_values - 1
+
+        uplift = uplift[np.isfinite(uplift)]
+        ci[combination_name] = np.quantile(
+            uplift,
+            [alpha / 2, 1 - alpha / 2]
+        ) if len(uplift) > 0 else [np.nan, np.nan]
+
+    return pd.DataFrame.from_dict(
+        ci,
+        orient='index',
+        columns=[UPLIFT_CI_LOW_KEY, UPLIFT_CI_HIGH_KEY]
+    )
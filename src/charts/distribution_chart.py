@@ -1,6 +1,7 @@
 import itertools
 
 import numpy as np
+import pandas as pd
 
 import seaborn as sns
 import matplotlib.pyplot as plt
@@ -9,7 +10,20 @@ from IPython.display import display
 from IPython.core.display import Markdown
 
 from .base_chart import BaseChart
+from burnaby.ab_consts import DEFAULT_DISTRIBUTION_MAX_UNITS
+from burnaby.ab_consts import DEFAULT_DISTRIBUTION_POINTS
+from burnaby.ab_consts import DISTRIBUTION_MODE_AUTO
+from burnaby.ab_consts import DISTRIBUTION_MODE_ECDF
+from burnaby.ab_consts import DISTRIBUTION_MODE_HISTOGRAM
+from burnaby.ab_consts import DISTRIBUTION_MODE_UNITS
 from burnaby.ab_consts import OUTLIERS_GROUPS_TYPE
+from burnaby.ab_consts import OUTLIERS_GROUPS_SKETCH_TYPE
+from burnaby.sufficient_stats import group_histograms
+from burnaby.sufficient_stats import group_quantile_grid
+
+
+ECDF_COL_NAME = 'ecdf'
+SHARE_COL_NAME = 'share'
 
 
 class DistributionChart(BaseChart):
@@ -19,7 +33,10 @@ class DistributionChart(BaseChart):
         hue_col=None,
         outliers=None,
         outliers_quantile=None,
-        outliers_quantile_min_value=None
+        outliers_quantile_min_value=None,
+        mode=DISTRIBUTION_MODE_AUTO,
+        max_units=DEFAULT_DISTRIBUTION_MAX_UNITS,
+        n_points=DEFAULT_DISTRIBUTION_POINTS
     ):
         super().__init__(metrics, hue_col)
 
@@ -27,6 +44,19 @@ class DistributionChart(BaseChart):
         self.outliers_quantile = outliers_quantile
         self.outliers_quantile_min_value = outliers_quantile_min_value
 
+        if mode not in (
+            DISTRIBUTION_MODE_AUTO,
+            DISTRIBUTION_MODE_UNITS,
+            DISTRIBUTION_MODE_HISTOGRAM,
+            DISTRIBUTION_MODE_ECDF
+        ):
+            raise ValueError('wrong distribution chart mode ' + str(mode))
+
+        self.mode = mode
+        self.max_units = max_units
+        self.n_points = n_points
+        self.draw_mode = DISTRIBUTION_MODE_UNITS
+
     def display_name(self):
         display(Markdown('### Distribution chart ' + self.metrics.get_name()))
 
@@ -53,6 +83,44 @@ class DistributionChart(BaseChart):
 
         ax.axvline(x_value, color=color)
 
+    def draw_binned_chart(
+        self,
+        data_df,
+        additional_lines,
+        x_col,
+        y_col,
+        hue_col,
+        title=None
+    ):
+        hue_list = list(pd.unique(data_df[hue_col]))
+        palette = dict(zip(
+            hue_list,
+            sns.color_palette('bright', n_colors=len(hue_list))
+        ))
+
+        ax = sns.lineplot(
+            data=data_df,
+            x=x_col,
+            y=y_col,
+            hue=hue_col,
+            palette=palette,
+            estimator=None,
+            drawstyle='steps-mid'
+                if self.draw_mode == DISTRIBUTION_MODE_HISTOGRAM else None
+        )
+
+        if additional_lines is not None:
+            for hue_nm, x_value in zip(
+                additional_lines[hue_col],
+                additional_lines[x_col]
+            ):
+                if hue_nm in palette and not np.isnan(x_value):
+                    ax.axvline(x_value, color=palette[hue_nm], linestyle='--')
+
+        ax.set_title(title)
+
+        plt.show()
+
     def draw_chart(
         self,
         data_df,
@@ -62,13 +130,26 @@ class DistributionChart(BaseChart):
         hue_col,
         title=None
     ):
+        if self.draw_mode != DISTRIBUTION_MODE_UNITS:
+            return self.draw_binned_chart(
+                data_df,
+                additional_lines,
+                x_col,
+                y_col,
+                hue_col,
+                title
+            )
+
         hl_palette_iter = itertools.cycle(
             sns.color_palette('bright')
         )
 
         hue_list = np.sort(data_df[hue_col].unique())
 
-        if self.outliers == OUTLIERS_GROUPS_TYPE:
+        if self.outliers in (
+            OUTLIERS_GROUPS_TYPE,
+            OUTLIERS_GROUPS_SKETCH_TYPE
+        ):
             uniq_hues = data_df[hue_col].nunique()
             lines_n = int(np.ceil(uniq_hues / 2))
             _, axes = plt.subplots(lines_n, 2, squeeze=False, figsize=(16,10))
@@ -141,9 +222,109 @@ class DistributionChart(BaseChart):
 
         plt.show()
 
+    def _get_draw_mode(self, n_units):
+        if self.mode != DISTRIBUTION_MODE_AUTO:
+            return self.mode
+
+        if n_units <= self.max_units:
+            return DISTRIBUTION_MODE_UNITS
+
+        return DISTRIBUTION_MODE_ECDF
+
     def prepare(self):
-        self.metrics.calc(remove_outliers=False)
+        self.metrics.calc_unfiltered()
+
+        units = self.metrics.get_units()
+        self.draw_mode = self._get_draw_mode(
+            len(units) if units is not None else 0
+        )
+
+        if self.draw_mode == DISTRIBUTION_MODE_UNITS:
+            return self._prepare_units()
+
+        return self._prepare_binned(units)
+
+    def _prepare_binned(self, units):
+        group_index = self.metrics.get_stats().get_index()
+        n_groups = len(group_index)
+
+        hue_col = self.hue_col
+        if hue_col is None:
+            hue_col = group_index.name
+        value_col = self.metrics.get_output_col()
+
+        values = np.asarray(units.x, dtype=np.float64)
+        group_codes = units.group_codes
+
+        if self.outliers is not None \
+            and self.outliers_quantile_min_value is not None:
+
+            is_kept = values > self.outliers_quantile_min_value
+            values = values[is_kept]
+            group_codes = group_codes[is_kept]
+
+        if self.draw_mode == DISTRIBUTION_MODE_ECDF:
+            quantiles = np.linspace(0, 1, self.n_points)
+
+            data_df = pd.DataFrame({
+                hue_col: np.repeat(np.asarray(group_index), len(quantiles)),
+                value_col: group_quantile_grid(
+                    values,
+                    group_codes,
+                    n_groups,
+                    quantiles
+                ).ravel(),
+                ECDF_COL_NAME: np.tile(quantiles, n_groups)
+            })
+            y_col = ECDF_COL_NAME
+        else:
+            finite_values = values[np.isfinite(values)]
+            bin_edges = np.histogram_bin_edges(
+                finite_values if len(finite_values) > 0 else [0, 1],
+                bins=self.n_points
+            )
+
+            counts = group_histograms(
+                values,
+                group_codes,
+                n_groups,
+                bin_edges
+            )
+            with np.errstate(divide='ignore', invalid='ignore'):
+                shares = counts / counts.sum(axis=1, keepdims=True)
+
+            data_df = pd.DataFrame({
+                hue_col: np.repeat(np.asarray(group_index), len(counts[0])),
+                value_col: np.tile(
+                    (bin_edges[:-1] + bin_edges[1:]) / 2,
+                    n_groups
+                ),
+                SHARE_COL_NAME: shares.ravel()
+            })
+            y_col = SHARE_COL_NAME
+
+        quantiles_df = None
+        if self.outliers is not None:
+            quantiles_df = pd.DataFrame({
+                hue_col: np.asarray(group_index),
+                value_col: self.metrics.get_outliers_quantiles(
+                    values,
+                    group_codes,
+                    n_groups,
+                    self.outliers
+                )
+            })
+
+        return {
+            'data_df': data_df,
+            'additional_lines': quantiles_df,
+            'x_col': value_col,
+            'y_col': y_col,
+            'hue_col': hue_col,
+            'title': self.metrics.get_name()
+        }
 
+    def _prepare_units(self):
         output_df = self.metrics.get_output()
 
         if self.outliers is not None:
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 import matplotlib.pyplot as plt
@@ -6,6 +7,11 @@ from IPython.display import display
 from IPython.core.display import Markdown
 
 from .base_chart import BaseChart
+from burnaby.ab_consts import DEFAULT_PERIOD_ROLLING_WINDOW
+from burnaby.ab_consts import PERIOD_VIEW_CUMULATIVE
+from burnaby.ab_consts import PERIOD_VIEW_DAILY
+from burnaby.ab_consts import PERIOD_VIEW_ROLLING
+from burnaby.sufficient_stats import rolling_sums
 
 
 class PeriodChart(BaseChart):
@@ -14,13 +20,33 @@ class PeriodChart(BaseChart):
         metrics,
         hue_col=None,
         timeseries_col=None,
-        date_unit='day'
+        date_unit='day',
+        view=PERIOD_VIEW_DAILY,
+        window=DEFAULT_PERIOD_ROLLING_WINDOW
     ):
         super().__init__(metrics, hue_col)
 
         self.timeseries_col = timeseries_col
         self.date_unit = date_unit
-        self.tmp_timeseries_col = str(self.__hash__()) + timeseries_col
+
+        self.period_stats = None
+        self.periods = None
+
+        self.set_view(view, window)
+
+    def set_view(self, view, window=DEFAULT_PERIOD_ROLLING_WINDOW):
+        if view not in (
+            PERIOD_VIEW_DAILY,
+            PERIOD_VIEW_CUMULATIVE,
+            PERIOD_VIEW_ROLLING
+        ):
+            raise ValueError('wrong period chart view ' + str(view))
+
+        if view == PERIOD_VIEW_ROLLING and window < 1:
+            raise ValueError('rolling window should be positive')
+
+        self.view = view
+        self.window = window
 
     def display_name(self):
         display(Markdown('### Period chart ' + self.metrics.get_name()))
@@ -34,41 +60,61 @@ class PeriodChart(BaseChart):
 
         return ax
 
-    def _as_date_type(self, metrics):
-        pd.options.mode.chained_assignment = None
-        m_df = metrics.get_data()
+    def _get_period_labels(self, periods):
+        periods = pd.Index(np.asarray(periods))
+
+        if self.date_unit == 'day' and isinstance(periods, pd.DatetimeIndex):
+            return periods.to_period('D').astype(str)
 
-        if m_df.dtypes[self.timeseries_col] == 'object':
-            m_df[self.tmp_timeseries_col] = pd.to_datetime(
-                m_df[self.timeseries_col]
+        return periods
+
+    def get_period_stats(self):
+        if self.period_stats is None:
+            self.period_stats, periods = self.metrics.calc_daily(
+                self.timeseries_col
             )
-        else:
-            m_df[self.tmp_timeseries_col] = m_df[self.timeseries_col]
+            self.periods = self._get_period_labels(periods)
 
-        if self.date_unit == 'day':
-            m_df[self.tmp_timeseries_col] = \
-                m_df[self.tmp_timeseries_col].dt.to_period('D')
+        return self.period_stats, self.periods
 
-        pd.options.mode.chained_assignment = 'warn'
+    def _get_view_sums(self, values):
+        if values is None:
+            return None
 
-    def prepare(self):
-        self._as_date_type(self.metrics)
+        if self.view == PERIOD_VIEW_CUMULATIVE:
+            return np.cumsum(values, axis=-1)
 
-        self.metrics.append_grouping([self.tmp_timeseries_col])
-        self.metrics.calc()
-        r = self.metrics.get_calc(use_format=False).reset_index()
+        if self.view == PERIOD_VIEW_ROLLING:
+            return rolling_sums(values, self.window)
 
-        r[self.timeseries_col] = r[self.tmp_timeseries_col].astype(str)
+        return values
 
+    def get_period_frame(self):
+        stats, periods = self.get_period_stats()
+        group_index = stats.get_index()
+
+        values = self.metrics.calc_values(
+            self._get_view_sums(stats.x_sum),
+            self._get_view_sums(stats.y_sum)
+        )
+        is_present = self._get_view_sums(stats.count).ravel() > 0
+
+        group_codes = np.repeat(np.arange(len(group_index)), len(periods))
+
+        r = group_index.take(group_codes[is_present]).to_frame(index=False)
+        r[self.metrics.get_col()] = values.ravel()[is_present]
+        r[self.timeseries_col] = np.tile(
+            np.asarray(periods).astype(str),
+            len(group_index)
+        )[is_present]
+
+        return r
+
+    def prepare(self):
         return {
-            'data_df': r,
+            'data_df': self.get_period_frame(),
             'x_col': self.timeseries_col,
             'y_col': self.metrics.get_col(),
             'hue_col': self.hue_col,
             'title': self.metrics.get_name()
         }
-
-    def clean_after(self):
-        m_df = self.metrics.get_data()
-
-        del m_df[self.tmp_timeseries_col]
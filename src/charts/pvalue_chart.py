@@ -1,5 +1,6 @@
 import matplotlib.pyplot as plt
 
+import numpy as np
 import pandas as pd
 
 from IPython.display import display
@@ -24,39 +25,21 @@ class PValueChart(PeriodChart):
     def display_name(self):
         display(Markdown('### Pvalue By timeseries ' + self.metrics.get_name()))
 
-    def get_periods(self, m_df):
-        start_dt = m_df[self.timeseries_col].min()
-        uniq_dts = sorted(m_df[self.timeseries_col].unique())
-
-        for dt in uniq_dts:
-            yield start_dt, dt
-
     def prepare(self):
-        self._as_date_type(self.metrics)
-        m_df = self.metrics.get_data()
-
-        r = None
-        for period_start, period_end in self.get_periods(m_df):
-            self.metrics.calc()
-
-            self.metrics.calc(
-                mask=(m_df[self.timeseries_col] >= period_start)
-                    & (m_df[self.timeseries_col] <= period_end)
+        stats, periods = self.metrics.calc_cumulative(self.timeseries_col)
+        periods = self._get_period_labels(periods)
+
+        pvalues = self.h.calc_pvalues(stats)
+        combination_names = list(self.h.combined_groups.keys())
+
+        r = pd.DataFrame({
+            self.hue_col: np.tile(combination_names, len(periods)),
+            H_PVALUE_KEY: pvalues.T.ravel(),
+            self.timeseries_col: np.repeat(
+                np.asarray(periods),
+                len(combination_names)
             )
-
-            output_df = self.metrics.get_output()
-
-            pv_df = self.h.test(output_df, save_testing=False)[[H_PVALUE_KEY]]
-
-            pv_df[self.timeseries_col] = period_end
-
-            if r is None:
-                r = pv_df
-            else:
-                r = pd.concat([r, pv_df])
-
-        r.index.name = self.hue_col
-        r.reset_index(inplace=True)
+        })
 
         return {
             'data_df': r,
@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+from .ab_consts import H_CORRECTED_PVALUE_KEY
+from .ab_consts import H_CORRECTED_SIGNIFICANCE_KEY
+from .ab_consts import H_PVALUE_KEY
+from .ab_consts import H_SIGNIFICANCE_KEY
+from .ab_consts import H_SIGNIFICANCE_LEVEL_KEY
+from .ab_consts import H_TEST_GROUP_KEY
+from .ab_consts import LONG_AGGREGATION_COL
+from .ab_consts import LONG_AGGREGATION_NAME_COL
+from .ab_consts import LONG_AGGREGATION_VALUE_COL
+from .ab_consts import LONG_CONTROL_GROUP_COL
+from .ab_consts import LONG_CORRECTION_METHOD_COL
+from .ab_consts import LONG_GROUP_COL
+from .ab_consts import LONG_IS_CONTROL_COL
+from .ab_consts import LONG_METRIC_COL
+from .ab_consts import LONG_UNITS_COL
+from .ab_consts import LONG_UPLIFT_COL
+from .ab_consts import LONG_VALUE_COL
+from .ab_consts import METRIC_COL_NAME
+from .ab_consts import UPLIFT_CI_HIGH_KEY
+from .ab_consts import UPLIFT_CI_LOW_KEY
+
+
+_STRING_COLS = [
+    LONG_AGGREGATION_COL,
+    LONG_AGGREGATION_NAME_COL,
+    LONG_AGGREGATION_VALUE_COL,
+    LONG_METRIC_COL,
+    LONG_GROUP_COL,
+    LONG_CONTROL_GROUP_COL,
+    LONG_CORRECTION_METHOD_COL
+]
+_FLOAT_COLS = [
+    LONG_VALUE_COL,
+    LONG_UNITS_COL,
+    LONG_UPLIFT_COL,
+    UPLIFT_CI_LOW_KEY,
+    UPLIFT_CI_HIGH_KEY,
+    H_PVALUE_KEY,
+    H_SIGNIFICANCE_LEVEL_KEY,
+    H_CORRECTED_PVALUE_KEY
+]
+_BOOLEAN_COLS = [
+    LONG_IS_CONTROL_COL,
+    H_SIGNIFICANCE_KEY,
+    H_CORRECTED_SIGNIFICANCE_KEY
+]
+
+LONG_REPORT_COLUMNS = [
+    LONG_AGGREGATION_COL,
+    LONG_AGGREGATION_NAME_COL,
+    LONG_AGGREGATION_VALUE_COL,
+    LONG_METRIC_COL,
+    LONG_GROUP_COL,
+    LONG_CONTROL_GROUP_COL,
+    LONG_IS_CONTROL_COL,
+    LONG_VALUE_COL,
+    LONG_UNITS_COL,
+    LONG_UPLIFT_COL,
+    UPLIFT_CI_LOW_KEY,
+    UPLIFT_CI_HIGH_KEY,
+    H_PVALUE_KEY,
+    H_SIGNIFICANCE_LEVEL_KEY,
+    H_SIGNIFICANCE_KEY,
+    H_CORRECTED_PVALUE_KEY,
+    H_CORRECTED_SIGNIFICANCE_KEY,
+    LONG_CORRECTION_METHOD_COL
+]
+
+
+def as_nullable_boolean(values):
+    return pd.array(
+        [
+            None if value is None or value is pd.NA
+                or (isinstance(value, float) and np.isnan(value))
+                else bool(value)
+            for value in values
+        ],
+        dtype='boolean'
+    )
+
+
+def get_empty_long_report():
+    return set_long_report_types(pd.DataFrame(columns=LONG_REPORT_COLUMNS))
+
+
+def set_long_report_types(long_df):
+    long_df = long_df.reindex(columns=LONG_REPORT_COLUMNS)
+
+    for col in _STRING_COLS:
+        long_df[col] = long_df[col].astype(object).where(
+            long_df[col].notna(),
+            None
+        )
+    for col in _FLOAT_COLS:
+        long_df[col] = long_df[col].astype(np.float64)
+    for col in _BOOLEAN_COLS:
+        long_df[col] = as_nullable_boolean(
+            long_df[col].to_numpy(dtype=object)
+        )
+
+    return long_df
+
+
+def get_metrics_long_report(
+    agg,
+    metrics,
+    combined_groups,
+    correction_df=None,
+    correction_method=None
+):
+    values = metrics.get_calc()[METRIC_COL_NAME]
+    groups = values.index
+    control_group = metrics.get_relation_value()
+
+    values = values.to_numpy(dtype=np.float64)
+    is_control = np.asarray(groups == control_group, dtype=bool)
+
+    control_value = values[is_control][0] if is_control.any() else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        uplift = np.where(is_control, np.nan, values / control_value - 1)
+
+    stats = metrics.get_stats()
+    units = np.full(len(groups), np.nan)
+    if stats is not None:
+        indexer = stats.get_index().get_indexer(groups)
+        units[indexer >= 0] = np.asarray(stats.count)[indexer[indexer >= 0]]
+
+    agg_value = agg.get_value()
+
+    long_df = pd.DataFrame({
+        LONG_AGGREGATION_COL: agg.get_full_name(),
+        LONG_AGGREGATION_NAME_COL: str(agg.get_name()),
+        LONG_AGGREGATION_VALUE_COL: agg.get_value_label()
+            if agg_value is not None else None,
+        LONG_METRIC_COL: metrics.get_name(),
+        LONG_GROUP_COL: [str(group) for group in groups],
+        LONG_CONTROL_GROUP_COL: str(control_group),
+        LONG_IS_CONTROL_COL: is_control,
+        LONG_VALUE_COL: values,
+        LONG_UNITS_COL: units,
+        LONG_UPLIFT_COL: uplift,
+        LONG_CORRECTION_METHOD_COL: correction_method
+            if correction_df is not None else None
+    })
+
+    combinations = []
+    if correction_df is not None:
+        combinations.append(correction_df[[
+            H_PVALUE_KEY,
+            H_SIGNIFICANCE_LEVEL_KEY,
+            H_SIGNIFICANCE_KEY,
+            H_CORRECTED_PVALUE_KEY,
+            H_CORRECTED_SIGNIFICANCE_KEY
+        ]])
+    if metrics.get_uplift_ci() is not None:
+        combinations.append(
+            metrics.get_uplift_ci()[[UPLIFT_CI_LOW_KEY, UPLIFT_CI_HIGH_KEY]]
+        )
+
+    if len(combinations) > 0:
+        combination_df = pd.concat(combinations, axis=1)
+        combination_df = combination_df[
+            combination_df.index.isin(list(combined_groups))
+        ]
+        combination_df.index = [
+            str(combined_groups[name][H_TEST_GROUP_KEY])
+            for name in combination_df.index
+        ]
+
+        long_df = long_df.join(combination_df, on=LONG_GROUP_COL)
+
+    return set_long_report_types(long_df)
+
+
+def get_long_report_schema():
+    import pyarrow as pa
+
+    fields = []
+    for col in LONG_REPORT_COLUMNS:
+        if col in _FLOAT_COLS:
+            fields.append(pa.field(col, pa.float64()))
+        elif col in _BOOLEAN_COLS:
+            fields.append(pa.field(col, pa.bool_()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+
+    return pa.schema(fields)
+
+
+def write_parquet(long_dfs, filename_or_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = get_long_report_schema()
+
+    with pq.ParquetWriter(filename_or_path, schema) as writer:
+        is_empty = True
+        for long_df in long_dfs:
+            if long_df.shape[0] == 0:
+                continue
+
+            writer.write_table(pa.Table.from_pandas(
+                long_df,
+                schema=schema,
+                preserve_index=False
+            ))
+            is_empty = False
+
+        if is_empty:
+            writer.write_table(schema.empty_table())
+
+
+def write_jsonl(long_dfs, filename_or_path):
+    with open(filename_or_path, 'w') as fjson:
+        for long_df in long_dfs:
+            if long_df.shape[0] == 0:
+                continue
+
+            lines = long_df.to_json(
+                orient='records',
+                lines=True,
+                double_precision=15
+            )
+            fjson.write(lines if lines.endswith('\n') else lines + '\n')
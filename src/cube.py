@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+from .slice_index import FrameSlice
+from .sufficient_stats import UnitGrouper
+from .sufficient_stats import UnitValues
+
+
+def _factorize_with_na(values):
+    codes, levels = pd.factorize(values, sort=True)
+    codes = codes.astype(np.int64)
+
+    return np.where(codes < 0, len(levels), codes), pd.Index(levels)
+
+
+class AggregationCube:
+    def __init__(self, data_df, abgroup_col, unit_col, dimension_cols):
+        self.dimension_cols = list(dimension_cols)
+
+        frame_slice = FrameSlice(data_df)
+
+        group_codes, group_levels = pd.factorize(
+            frame_slice[abgroup_col],
+            sort=True
+        )
+        group_codes = group_codes.astype(np.int64)
+        self.group_index = pd.Index(group_levels, name=abgroup_col)
+
+        codes_list = [group_codes]
+        self.dimension_levels = {}
+        for col in self.dimension_cols:
+            codes, self.dimension_levels[col] = _factorize_with_na(
+                frame_slice[col]
+            )
+            codes_list.append(codes)
+
+        dims = tuple(
+            [max(len(self.group_index), 1)]
+            + [len(self.dimension_levels[col]) + 1 for col in dimension_cols]
+        )
+
+        valid = group_codes >= 0
+        flat = np.full(len(frame_slice), -1, dtype=np.int64)
+        flat[valid] = np.ravel_multi_index(
+            [codes[valid] for codes in codes_list],
+            dims
+        )
+
+        inverse, uniq_flat = pd.factorize(flat[valid], sort=True)
+
+        cell_codes = np.full(len(frame_slice), -1, dtype=np.int64)
+        cell_codes[valid] = inverse
+
+        level_codes = np.unravel_index(uniq_flat, dims)
+        self.cell_group_codes = level_codes[0]
+        self.cell_dimension_codes = dict(
+            zip(self.dimension_cols, level_codes[1:])
+        )
+
+        self.grouper = UnitGrouper(
+            frame_slice,
+            cell_codes,
+            pd.RangeIndex(len(uniq_flat)),
+            unit_col
+        )
+
+        self._plans = {}
+
+    def __len__(self):
+        return len(self.cell_group_codes)
+
+    def get_grouper(self):
+        return self.grouper
+
+    def _get_cell_slices(self, aggs):
+        n_cells = len(self)
+
+        cols = aggs[0].get_cols()
+        if len(cols) == 0:
+            return np.zeros(n_cells, dtype=np.int64)
+
+        dims = tuple(len(self.dimension_levels[col]) + 1 for col in cols)
+        cell_flat = np.ravel_multi_index(
+            [self.cell_dimension_codes[col] for col in cols],
+            dims
+        )
+
+        agg_codes = [
+            self.dimension_levels[col].get_indexer(
+                [agg.get_values()[pos] for agg in aggs]
+            )
+            for pos, col in enumerate(cols)
+        ]
+        known = np.logical_and.reduce([codes >= 0 for codes in agg_codes])
+
+        agg_flat = np.full(len(aggs), -1, dtype=np.int64)
+        agg_flat[known] = np.ravel_multi_index(
+            [codes[known] for codes in agg_codes],
+            dims
+        )
+
+        return pd.Index(agg_flat).get_indexer(cell_flat)
+
+    def _get_roll_up_plan(self, aggs):
+        n_groups = max(len(self.group_index), 1)
+        n_unit_levels = self.grouper.n_unit_levels
+        pairs = self.grouper.pairs
+
+        cell_slices = self._get_cell_slices(aggs)
+
+        pair_cells = pairs // n_unit_levels
+        pair_slices = cell_slices[pair_cells]
+        valid = pair_slices >= 0
+
+        keys = (
+            pair_slices[valid] * n_groups
+                + self.cell_group_codes[pair_cells[valid]]
+        ) * n_unit_levels + pairs[valid] % n_unit_levels
+
+        key_codes, uniq_keys = pd.factorize(keys)
+
+        slices = uniq_keys // (n_groups * n_unit_levels)
+        group_codes = uniq_keys // n_unit_levels % n_groups
+        unit_codes = uniq_keys % n_unit_levels
+
+        order = np.argsort(
+            slices.astype(np.min_scalar_type(len(aggs))),
+            kind='stable'
+        )
+        bounds = np.searchsorted(slices[order], np.arange(len(aggs) + 1))
+
+        slice_unit_keys, slice_unit_codes = np.unique(
+            slices * n_unit_levels + unit_codes,
+            return_inverse=True
+        )
+        unit_bounds = np.searchsorted(
+            slice_unit_keys // n_unit_levels,
+            np.arange(len(aggs) + 1)
+        )
+        slice_unit_codes = slice_unit_codes - unit_bounds[slices]
+
+        cell_valid = cell_slices >= 0
+        slice_group_keys = np.unique(
+            cell_slices[cell_valid] * n_groups
+                + self.cell_group_codes[cell_valid]
+        )
+        group_bounds = np.searchsorted(
+            slice_group_keys // n_groups,
+            np.arange(len(aggs) + 1)
+        )
+
+        unit_levels = pd.Index(self.grouper.unit_levels)
+
+        slices_plan = []
+        for slice_pos in range(len(aggs)):
+            rows = order[bounds[slice_pos]:bounds[slice_pos + 1]]
+
+            slice_groups = slice_group_keys[
+                group_bounds[slice_pos]:group_bounds[slice_pos + 1]
+            ] % n_groups
+            slice_units = slice_unit_keys[
+                unit_bounds[slice_pos]:unit_bounds[slice_pos + 1]
+            ] % n_unit_levels
+
+            slices_plan.append((
+                rows,
+                np.searchsorted(slice_groups, group_codes[rows]),
+                slice_unit_codes[rows],
+                unit_levels.take(slice_units),
+                self.group_index.take(slice_groups)
+            ))
+
+        return valid, key_codes, len(uniq_keys), slices_plan
+
+    def roll_up(self, units, aggs, pair_counts=None):
+        plan_key = tuple(agg.get_full_name() for agg in aggs)
+        if plan_key not in self._plans:
+            self._plans[plan_key] = self._get_roll_up_plan(aggs)
+
+        valid, key_codes, n_keys, slices_plan = self._plans[plan_key]
+
+        def _sum(values):
+            if values is None:
+                return None
+
+            return np.bincount(
+                key_codes,
+                weights=values[valid],
+                minlength=n_keys
+            )
+
+        x = _sum(units.x)
+        y = _sum(units.y)
+        counts = _sum(pair_counts)
+
+        results = []
+        for rows, group_codes, unit_codes, unit_levels, group_index \
+            in slices_plan:
+
+            if counts is not None:
+                present = counts[rows] > 0
+                rows = rows[present]
+                group_codes = group_codes[present]
+                unit_codes = unit_codes[present]
+
+            results.append((
+                UnitValues(
+                    group_codes=group_codes,
+                    unit_codes=unit_codes,
+                    unit_levels=unit_levels,
+                    x=x[rows],
+                    y=y[rows] if y is not None else None
+                ),
+                group_index
+            ))
+
+        return results
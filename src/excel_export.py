@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+EXCEL_MAX_SHEET_NAME_LENGTH = 31
+_INVALID_SHEET_NAME_CHARS = '[]:*?/\\'
+
+
+def get_sheet_name(value, used_names):
+    name = ''.join(
+        '_' if char in _INVALID_SHEET_NAME_CHARS else char
+        for char in str(value)
+    )[:EXCEL_MAX_SHEET_NAME_LENGTH]
+
+    if name == '':
+        name = '_'
+
+    uniq_name = name
+    suffix = 1
+    while uniq_name.lower() in used_names:
+        suffix_str = '_' + str(suffix)
+        uniq_name = name[:EXCEL_MAX_SHEET_NAME_LENGTH - len(suffix_str)] \
+            + suffix_str
+        suffix += 1
+
+    used_names.add(uniq_name.lower())
+
+    return uniq_name
+
+
+def get_cell_value(value):
+    if value is None:
+        return None
+
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    if isinstance(value, float) and np.isnan(value):
+        return None
+
+    if isinstance(value, (str, bool, int, float)):
+        return value
+
+    if value is pd.NaT or value is pd.NA:
+        return None
+
+    return str(value)
+
+
+class StreamingSheetWriter:
+    def __init__(self, worksheet):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        self.worksheet = worksheet
+        self.write_only_cell = WriteOnlyCell
+        self.header_font = Font(bold=True)
+
+    def _header_cell(self, value):
+        cell = self.write_only_cell(
+            self.worksheet,
+            value=get_cell_value(value)
+        )
+        cell.font = self.header_font
+
+        return cell
+
+    def append_empty_rows(self, n_rows):
+        for _ in range(n_rows):
+            self.worksheet.append([])
+
+    def append_frame(self, data_df, index=True):
+        n_index_levels = data_df.index.nlevels if index else 0
+
+        header = []
+        if index:
+            header = [
+                self._header_cell(name) if name is not None else None
+                for name in data_df.index.names
+            ]
+
+        header += [self._header_cell(col) for col in data_df.columns]
+        self.worksheet.append(header)
+
+        index_values = [
+            data_df.index.get_level_values(level)
+            for level in range(n_index_levels)
+        ]
+        prev_labels = None
+
+        for pos, row in enumerate(data_df.itertuples(index=False, name=None)):
+            labels = [values[pos] for values in index_values]
+
+            index_cells = []
+            for level, label in enumerate(labels):
+                is_repeated = level < n_index_levels - 1 \
+                    and prev_labels is not None \
+                    and labels[:level + 1] == prev_labels[:level + 1]
+
+                index_cells.append(
+                    None if is_repeated else self._header_cell(label)
+                )
+
+            self.worksheet.append(
+                index_cells + [get_cell_value(value) for value in row]
+            )
+
+            prev_labels = labels
+
+        return data_df.shape[0] + 1
+
+    def close(self):
+        self.worksheet.close()
+
+
+def open_write_only_workbook():
+    from openpyxl import Workbook
+
+    return Workbook(write_only=True)
@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+
+from .ab_consts import DEFAULT_CHUNK_ROWS
+from .ab_consts import FOLDED_POSITIVE_COUNT_SUFFIX
+
+
+def read_csv_chunks(
+    path,
+    columns,
+    chunksize=DEFAULT_CHUNK_ROWS,
+    **read_csv_kwargs
+):
+    return pd.read_csv(
+        path,
+        usecols=columns,
+        chunksize=chunksize,
+        **read_csv_kwargs
+    )
+
+
+def read_parquet_chunks(path, columns, batch_size=DEFAULT_CHUNK_ROWS):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+
+    for batch in parquet_file.iter_batches(
+        batch_size=batch_size,
+        columns=columns
+    ):
+        yield batch.to_pandas()
+
+
+def as_category(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+
+    return values.astype('category')
+
+
+def as_day_category(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_datetime(values).dt.normalize()
+
+    codes, days = pd.factorize(values, sort=True)
+
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=days, ordered=True),
+        index=values.index,
+        name=values.name
+    )
+
+
+def downcast_numeric(values):
+    if pd.api.types.is_float_dtype(values):
+        return pd.to_numeric(values, downcast='float')
+    if pd.api.types.is_integer_dtype(values) \
+        and not pd.api.types.is_bool_dtype(values):
+
+        return pd.to_numeric(values, downcast='integer')
+
+    return values
+
+
+def encode_ab_columns(
+    ab_df,
+    abgroup_col,
+    uniq_id_col,
+    timeseries_col,
+    downcast_cols=None
+):
+    encoded_df = ab_df.copy(deep=False)
+
+    encoded_df[abgroup_col] = as_category(ab_df[abgroup_col])
+    encoded_df[uniq_id_col] = as_category(ab_df[uniq_id_col])
+    encoded_df[timeseries_col] = as_day_category(ab_df[timeseries_col])
+
+    for col in downcast_cols or []:
+        encoded_df[col] = downcast_numeric(ab_df[col])
+
+    return encoded_df
+
+
+def union_categories(values, other_values):
+    categories = values.cat.categories
+    if categories.equals(other_values.cat.categories):
+        return values, other_values
+
+    categories = categories.union(other_values.cat.categories)
+
+    return values.cat.set_categories(categories), \
+        other_values.cat.set_categories(categories)
+
+
+def concat_encoded_frames(encoded_df, new_df):
+    encoded_df = encoded_df.copy(deep=False)
+    new_df = new_df[list(encoded_df.columns)].copy(deep=False)
+
+    for col in encoded_df.columns:
+        if isinstance(encoded_df[col].dtype, pd.CategoricalDtype) \
+            and isinstance(new_df[col].dtype, pd.CategoricalDtype):
+
+            encoded_df[col], new_df[col] = union_categories(
+                encoded_df[col],
+                new_df[col]
+            )
+
+    return pd.concat([encoded_df, new_df])
+
+
+def get_metrics_cols(metrics_specs):
+    value_cols = []
+    positive_count_cols = []
+
+    for spec in metrics_specs:
+        for col in (
+            spec.get('continuous_measure_col'),
+            spec.get('nominator_col'),
+            spec.get('denominator_col')
+        ):
+            if col is not None and col not in value_cols:
+                value_cols.append(col)
+
+        if spec.get('is_uniq_id_proportions', False) \
+            and spec.get('continuous_measure_col') is None:
+
+            for col in (spec.get('nominator_col'), spec.get('denominator_col')):
+                if col is not None and col not in positive_count_cols:
+                    positive_count_cols.append(col)
+
+    return value_cols, positive_count_cols
+
+
+class UnitDayFolder:
+    def __init__(
+        self,
+        abgroup_col,
+        timeseries_col,
+        uniq_id_col,
+        value_cols,
+        positive_count_cols=None,
+        dimension_cols=None,
+        timeseries_freq=None,
+        min_pending_rows=DEFAULT_CHUNK_ROWS
+    ):
+        self.timeseries_col = timeseries_col
+        self.timeseries_freq = timeseries_freq
+        self.value_cols = list(value_cols)
+        self.positive_count_cols = {
+            col: col + FOLDED_POSITIVE_COUNT_SUFFIX
+            for col in (positive_count_cols or [])
+        }
+        self.min_pending_rows = min_pending_rows
+
+        self.key_cols = [abgroup_col, uniq_id_col, timeseries_col]
+        for col in dimension_cols or []:
+            if col not in self.key_cols:
+                self.key_cols.append(col)
+
+        self.folded_df = None
+        self.pending = []
+        self.pending_rows = 0
+
+    def get_input_cols(self):
+        input_cols = list(self.key_cols)
+        for col in self.value_cols + list(self.positive_count_cols):
+            if col not in input_cols:
+                input_cols.append(col)
+
+        return input_cols
+
+    def get_positive_count_cols(self):
+        return dict(self.positive_count_cols)
+
+    def _get_keys(self, chunk_df):
+        keys = []
+        for col in self.key_cols:
+            values = chunk_df[col]
+
+            if col == self.timeseries_col and self.timeseries_freq is not None:
+                values = pd.to_datetime(values).dt.floor(self.timeseries_freq)
+
+            keys.append(values)
+
+        return keys
+
+    def _fold_chunk(self, chunk_df):
+        values = {}
+        for col in self.value_cols:
+            values[col] = pd.to_numeric(chunk_df[col], errors='coerce')
+
+        for col, count_col in self.positive_count_cols.items():
+            col_values = values[col] if col in values \
+                else pd.to_numeric(chunk_df[col], errors='coerce')
+
+            values[count_col] = (col_values > 0).astype(np.int64)
+
+        return pd.DataFrame(values, index=chunk_df.index).groupby(
+            self._get_keys(chunk_df),
+            sort=False,
+            observed=True,
+            dropna=False
+        ).sum()
+
+    def _compact(self):
+        frames = self.pending
+        if self.folded_df is not None:
+            frames = [self.folded_df] + frames
+
+        if len(frames) == 0:
+            return
+
+        folded_df = pd.concat(frames)
+
+        self.pending = []
+        self.pending_rows = 0
+
+        self.folded_df = folded_df.groupby(
+            level=list(range(folded_df.index.nlevels)),
+            sort=False,
+            dropna=False
+        ).sum()
+
+    def add(self, chunk_df):
+        folded_chunk_df = self._fold_chunk(chunk_df)
+
+        self.pending.append(folded_chunk_df)
+        self.pending_rows += len(folded_chunk_df)
+
+        folded_rows = len(self.folded_df) if self.folded_df is not None else 0
+        if self.pending_rows >= max(folded_rows, self.min_pending_rows):
+            self._compact()
+
+    def add_chunks(self, chunks):
+        for chunk_df in chunks:
+            self.add(chunk_df)
+
+        return self
+
+    def get_frame(self):
+        self._compact()
+
+        if self.folded_df is None:
+            return pd.DataFrame(
+                columns=self.key_cols
+                    + self.value_cols
+                    + list(self.positive_count_cols.values())
+            )
+
+        folded_df = self.folded_df.reset_index()
+        folded_df.columns = self.key_cols + list(self.folded_df.columns)
+
+        return folded_df
@@ -0,0 +1,175 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextlib import nullcontext
+
+import pandas as pd
+
+from .ab_consts import PROFILE_AGGREGATION_COL
+from .ab_consts import PROFILE_ALLOCATED_BYTES_COL
+from .ab_consts import PROFILE_CALLS_COL
+from .ab_consts import PROFILE_DEPTH_COL
+from .ab_consts import PROFILE_METRICS_COL
+from .ab_consts import PROFILE_ROWS_COL
+from .ab_consts import PROFILE_SECONDS_COL
+from .ab_consts import PROFILE_STAGE_COL
+
+
+PROFILE_COLUMNS = [
+    PROFILE_STAGE_COL,
+    PROFILE_AGGREGATION_COL,
+    PROFILE_METRICS_COL,
+    PROFILE_DEPTH_COL,
+    PROFILE_ROWS_COL,
+    PROFILE_SECONDS_COL,
+    PROFILE_ALLOCATED_BYTES_COL
+]
+
+
+class StageFrame:
+    def __init__(self, stage, aggregation, metrics, rows, depth, memory):
+        self.stage = stage
+        self.aggregation = aggregation
+        self.metrics = metrics
+        self.rows = rows
+        self.depth = depth
+        self.start_memory = memory
+        self.peak_memory = memory
+        self.start = time.perf_counter()
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+
+class Profiler:
+    def __init__(self, trace_memory=False, callbacks=None):
+        self.trace_memory = trace_memory
+        self.callbacks = list(callbacks or [])
+        self.records = []
+
+        self._frames = []
+        self._started_tracing = False
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _is_tracing(self):
+        return self.trace_memory and tracemalloc.is_tracing()
+
+    def _update_peak(self):
+        current, peak = tracemalloc.get_traced_memory()
+
+        if len(self._frames) > 0:
+            frame = self._frames[-1]
+            frame.peak_memory = max(frame.peak_memory, peak)
+
+        return current
+
+    @contextmanager
+    def stage(self, stage, aggregation=None, metrics=None, rows=None):
+        memory = None
+        if self._is_tracing():
+            memory = self._update_peak()
+            tracemalloc.reset_peak()
+
+        frame = StageFrame(
+            stage,
+            aggregation,
+            metrics,
+            rows,
+            len(self._frames),
+            memory
+        )
+        self._frames.append(frame)
+
+        try:
+            yield frame
+        finally:
+            seconds = time.perf_counter() - frame.start
+
+            allocated_bytes = None
+            if frame.start_memory is not None and self._is_tracing():
+                self._update_peak()
+                allocated_bytes = frame.peak_memory - frame.start_memory
+
+            self._frames.pop()
+
+            if len(self._frames) > 0 and frame.peak_memory is not None:
+                parent = self._frames[-1]
+                if parent.peak_memory is not None:
+                    parent.peak_memory = max(
+                        parent.peak_memory,
+                        frame.peak_memory
+                    )
+
+            self._add_record({
+                PROFILE_STAGE_COL: frame.stage,
+                PROFILE_AGGREGATION_COL: frame.aggregation,
+                PROFILE_METRICS_COL: frame.metrics,
+                PROFILE_DEPTH_COL: frame.depth,
+                PROFILE_ROWS_COL: frame.rows,
+                PROFILE_SECONDS_COL: seconds,
+                PROFILE_ALLOCATED_BYTES_COL: allocated_bytes
+            })
+
+    def _add_record(self, record):
+        self.records.append(record)
+
+        for callback in self.callbacks:
+            callback(record)
+
+    def clear(self):
+        self.records = []
+
+    def get_records(self):
+        return pd.DataFrame(self.records, columns=PROFILE_COLUMNS)
+
+    def get_summary(self, by=None):
+        records_df = self.get_records()
+
+        if by is None:
+            by = [PROFILE_STAGE_COL]
+
+        return records_df\
+            .groupby(by, sort=False, dropna=False)\
+            .agg(**{
+                PROFILE_CALLS_COL: (PROFILE_SECONDS_COL, 'size'),
+                PROFILE_ROWS_COL: (PROFILE_ROWS_COL, 'sum'),
+                PROFILE_SECONDS_COL: (PROFILE_SECONDS_COL, 'sum'),
+                PROFILE_ALLOCATED_BYTES_COL: (
+                    PROFILE_ALLOCATED_BYTES_COL,
+                    'max'
+                )
+            })\
+            .sort_values(PROFILE_SECONDS_COL, ascending=False)
+
+    def save_summary(self, filename_or_path, by=None):
+        summary_df = self.get_summary(by)
+
+        if str(filename_or_path).endswith('.xlsx'):
+            summary_df.to_excel(filename_or_path)
+        else:
+            summary_df.to_csv(filename_or_path)
+
+
+def profile_stage(profiler, stage, aggregation=None, metrics=None, rows=None):
+    if profiler is None:
+        return nullcontext()
+
+    return profiler.stage(
+        stage,
+        aggregation=aggregation.get_full_name()
+            if aggregation is not None else None,
+        metrics=metrics,
+        rows=rows
+    )
@@ -1,9 +1,17 @@
-from IPython.display import display
-
+from .ab_consts import DEFAULT_CHUNK_ROWS
+from .ab_consts import DEFAULT_RESULT_CACHE_MAX_BYTES
+from .ab_consts import DEFAULT_SRM_SIGNIFICANCE_LEVEL
 from .ab_manager import ABManager, _ALL_VALIDATORS
+from .registry import ExperimentRegistry
+
 
+_registry = ExperimentRegistry()
 
-_managers = {}
+def set_memory_budget(max_bytes):
+    _registry.set_max_bytes(max_bytes)
+
+def remove_ab_test(ab_test_name):
+    return _registry.remove(ab_test_name)
 
 def set_ab_test(
     ab_test_name,
@@ -14,9 +22,16 @@ def set_ab_test(
     control_group_name=None,
     data_cols=None,
     significance_level=None,
-    aggregations=None
+    aggregations=None,
+    n_jobs=None,
+    headless=False,
+    encode_columns=True,
+    downcast_numeric=False,
+    cache_dir=None,
+    cache_max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES,
+    data_loader=None
 ):
-    _managers[ab_test_name] = ABManager(
+    ab_manager = ABManager(
         ab_test_name,
         dataframe,
         abgroup_col,
@@ -25,19 +40,109 @@ def set_ab_test(
         control_group_name,
         data_cols,
         significance_level=significance_level,
-        aggregations=aggregations
+        aggregations=aggregations,
+        n_jobs=n_jobs,
+        headless=headless,
+        encode_columns=encode_columns,
+        downcast_numeric=downcast_numeric,
+        cache_dir=cache_dir,
+        cache_max_bytes=cache_max_bytes
+    )
+    ab_manager.set_data_loader(data_loader)
+
+    return _registry.register(ab_test_name, ab_manager)
+
+def set_ab_test_from_csv(
+    ab_test_name,
+    path,
+    abgroup_col,
+    date_col,
+    uniq_id_col,
+    metrics_specs,
+    control_group_name=None,
+    significance_level=None,
+    aggregations=None,
+    dimension_cols=None,
+    chunksize=DEFAULT_CHUNK_ROWS,
+    read_csv_kwargs=None,
+    n_jobs=None,
+    headless=False,
+    cache_dir=None,
+    cache_max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES
+):
+    ab_manager = ABManager.from_csv(
+        ab_test_name,
+        path,
+        abgroup_col,
+        date_col,
+        uniq_id_col,
+        metrics_specs,
+        dimension_cols=dimension_cols,
+        chunksize=chunksize,
+        read_csv_kwargs=read_csv_kwargs,
+        control_group_name=control_group_name,
+        significance_level=significance_level,
+        aggregations=aggregations,
+        n_jobs=n_jobs,
+        headless=headless,
+        cache_dir=cache_dir,
+        cache_max_bytes=cache_max_bytes
+    )
+
+    return _registry.register(ab_test_name, ab_manager)
+
+def set_ab_test_from_parquet(
+    ab_test_name,
+    path,
+    abgroup_col,
+    date_col,
+    uniq_id_col,
+    metrics_specs,
+    control_group_name=None,
+    significance_level=None,
+    aggregations=None,
+    dimension_cols=None,
+    batch_size=DEFAULT_CHUNK_ROWS,
+    n_jobs=None,
+    headless=False,
+    cache_dir=None,
+    cache_max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES
+):
+    ab_manager = ABManager.from_parquet(
+        ab_test_name,
+        path,
+        abgroup_col,
+        date_col,
+        uniq_id_col,
+        metrics_specs,
+        dimension_cols=dimension_cols,
+        batch_size=batch_size,
+        control_group_name=control_group_name,
+        significance_level=significance_level,
+        aggregations=aggregations,
+        n_jobs=n_jobs,
+        headless=headless,
+        cache_dir=cache_dir,
+        cache_max_bytes=cache_max_bytes
     )
 
-    return _managers[ab_test_name]
+    return _registry.register(ab_test_name, ab_manager)
 
 def validate_ab_test_data(
     ab_test_name,
-    validators=_ALL_VALIDATORS
+    validators=_ALL_VALIDATORS,
+    describe=False,
+    expected_group_ratios=None,
+    srm_significance_level=DEFAULT_SRM_SIGNIFICANCE_LEVEL
 ):
-    if ab_test_name in _managers:
-        _managers[ab_test_name].validate_ab_test_data(
-            validators
-        )
+    with _registry.use(ab_test_name) as ab_manager:
+        if ab_manager is not None:
+            return ab_manager.validate_ab_test_data(
+                validators,
+                describe=describe,
+                expected_group_ratios=expected_group_ratios,
+                srm_significance_level=srm_significance_level
+            )
 
 def calc_metrics(
     ab_test_name,
@@ -48,47 +153,148 @@ def calc_metrics(
     nominator_col=None,
     denominator_col=None,
     is_uniq_id_proportions=False,
+    is_ratio=False,
     na_is_zero=False,
     outliers=None,
     outliers_quantile=None,
     outliers_quantile_min_value=None,
+    outliers_sketch_error=None,
     hypothesis=None,
-    aggregation_values=None
+    bootstrap=None,
+    aggregation_values=None,
+    n_jobs=None
 ):
-    if ab_test_name in _managers:
-        return _managers[ab_test_name].calc_metrics(
-            name=name,
-            mask=mask,
-            silent=silent,
-            continuous_measure_col=continuous_measure_col,
-            nominator_col=nominator_col,
-            denominator_col=denominator_col,
-            is_uniq_id_proportions=is_uniq_id_proportions,
-            outliers=outliers,
-            outliers_quantile=outliers_quantile,
-            outliers_quantile_min_value=outliers_quantile_min_value,
-            na_is_zero=na_is_zero,
-            hypothesis=hypothesis,
-            aggregation_values=aggregation_values
-        )
-    else:
-        print('no such ab test - ', ab_test_name)
+    with _registry.use(ab_test_name) as ab_manager:
+        if ab_manager is not None:
+            metrics_results = ab_manager.calc_metrics(
+                name=name,
+                mask=mask,
+                silent=silent,
+                continuous_measure_col=continuous_measure_col,
+                nominator_col=nominator_col,
+                denominator_col=denominator_col,
+                is_uniq_id_proportions=is_uniq_id_proportions,
+                is_ratio=is_ratio,
+                outliers=outliers,
+                outliers_quantile=outliers_quantile,
+                outliers_quantile_min_value=outliers_quantile_min_value,
+                outliers_sketch_error=outliers_sketch_error,
+                na_is_zero=na_is_zero,
+                hypothesis=hypothesis,
+                bootstrap=bootstrap,
+                aggregation_values=aggregation_values,
+                n_jobs=n_jobs
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
+            return
+
+    _registry.update_memory_usage(ab_test_name)
+
+    return metrics_results
+
+def calc_metrics_batch(
+    ab_test_name,
+    metrics_specs,
+    silent=False,
+    aggregation_values=None,
+    n_jobs=None
+):
+    with _registry.use(ab_test_name) as ab_manager:
+        if ab_manager is not None:
+            metrics_results = ab_manager.calc_metrics_batch(
+                metrics_specs,
+                silent=silent,
+                aggregation_values=aggregation_values,
+                n_jobs=n_jobs
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
+            return
+
+    _registry.update_memory_usage(ab_test_name)
+
+    return metrics_results
+
+def append_ab_test_data(
+    ab_test_name,
+    new_rows_df,
+    masks=None,
+    silent=False,
+    n_jobs=None
+):
+    with _registry.use(ab_test_name) as ab_manager:
+        if ab_manager is not None:
+            metrics_results = ab_manager.append(
+                new_rows_df,
+                masks=masks,
+                silent=silent,
+                n_jobs=n_jobs
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
+            return
+
+    _registry.update_memory_usage(ab_test_name)
+
+    return metrics_results
+
+def get_statistics_report(ab_test_name, correction_method='holm'):
+    with _registry.use(ab_test_name, needs_data=False) as ab_manager:
+        if ab_manager is not None:
+            return ab_manager.get_statistics_report(
+                correction_method
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
 
 def print_statistics_report(ab_test_name, correction_method='holm'):
-    if ab_test_name in _managers:
-        _managers[ab_test_name].print_statistics_report(correction_method)
-    else:
-        display('no such ab test', ab_test_name)
+    with _registry.use(ab_test_name, needs_data=False) as ab_manager:
+        if ab_manager is not None:
+            return ab_manager.print_statistics_report(
+                correction_method
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
 
 def save_report_to_excel(
     ab_test_name,
     filename_or_path,
     correction_method='holm'
 ):
-    if ab_test_name in _managers:
-        _managers[ab_test_name].save_report_to_excel(
-            filename_or_path,
-            correction_method
-        )
-    else:
-        display('save_report_to_excel')
+    with _registry.use(ab_test_name, needs_data=False) as ab_manager:
+        if ab_manager is not None:
+            ab_manager.save_report_to_excel(
+                filename_or_path,
+                correction_method
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
+
+def save_report_to_parquet(
+    ab_test_name,
+    filename_or_path,
+    correction_method='holm'
+):
+    with _registry.use(ab_test_name, needs_data=False) as ab_manager:
+        if ab_manager is not None:
+            ab_manager.save_report_to_parquet(
+                filename_or_path,
+                correction_method
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
+
+def save_report_to_jsonl(
+    ab_test_name,
+    filename_or_path,
+    correction_method='holm'
+):
+    with _registry.use(ab_test_name, needs_data=False) as ab_manager:
+        if ab_manager is not None:
+            ab_manager.save_report_to_jsonl(
+                filename_or_path,
+                correction_method
+            )
+        else:
+            print('no such ab test - ', ab_test_name)
@@ -1,7 +1,5 @@
 from copy import copy
 
-from IPython.core.display_functions import display
-
 import numpy as np
 import pandas as pd
 
@@ -9,8 +7,30 @@ from .ab_consts import METRIC_COL_NAME
 from .ab_consts import UPLIFT_FORMAT
 from .ab_consts import PROPORTION_FORMAT
 from .ab_consts import CONTINUOUS_MEASURE_FORMAT
+from .ab_consts import DEFAULT_QUANTILE_SKETCH_ERROR
 from .ab_consts import OUTLIERS_GROUPS_TYPE
+from .ab_consts import OUTLIERS_GROUPS_SKETCH_TYPE
 from .ab_consts import OUTLIERS_METRICS_DATA_TYPE
+from .ab_consts import OUTLIERS_METRICS_DATA_SKETCH_TYPE
+from .quantile_sketch import QuantileSketch
+from .quantile_sketch import merge_quantile_sketches
+from .result_cache import get_cache_key
+from .result_cache import index_from_arrays
+from .result_cache import index_to_arrays
+from .result_cache import stats_from_arrays
+from .result_cache import stats_to_arrays
+from .result_cache import units_from_arrays
+from .result_cache import units_to_arrays
+from .slice_index import FrameSlice
+from .sufficient_stats import GroupStats
+from .sufficient_stats import UnitGrouper
+from .sufficient_stats import UnitValues
+from .sufficient_stats import as_float_values
+from .sufficient_stats import cumulative_group_stats
+from .sufficient_stats import factorize_columns
+from .sufficient_stats import group_quantiles
+from .sufficient_stats import period_group_stats
+from .sufficient_stats import stack_group_stats
 
 
 QUANTILE_COL_NAME = '_quantile'
@@ -28,10 +48,12 @@ class Metrics:
         name,
         data_df,
         mask=None,
+        rows=None,
         grouping=None,
         outliers=None,
         outliers_quantile=None,
         outliers_quantile_min_value=None,
+        outliers_sketch_error=None,
         format_str=None,
         relation_format_str=None,
         relation_value=None,
@@ -40,14 +62,16 @@ class Metrics:
         nominator_col=None,
         denominator_col=None,
         is_uniq_id_proportions=False,
+        is_ratio=False,
         na_is_zero=False
     ):
         self.name = name
 
+        self.data_df = data_df
+        self.rows = rows
+
         if mask is not None:
-            self.data_df = data_df[mask]
-        else:
-            self.data_df = data_df
+            self.append_mask(mask)
 
         self.grouping = copy(grouping)
 
@@ -59,9 +83,13 @@ class Metrics:
         self.denominator_col = denominator_col
         self.na_is_zero = na_is_zero
         self.is_uniq_id_proportions = is_uniq_id_proportions
+        self.is_ratio = is_ratio
         self.outliers=outliers
         self.outliers_quantile=outliers_quantile
         self.outliers_quantile_min_value = outliers_quantile_min_value
+        self.outliers_sketch_error = outliers_sketch_error \
+            if outliers_sketch_error is not None \
+            else DEFAULT_QUANTILE_SKETCH_ERROR
 
         if is_uniq_id_proportions:
             self.proportion_func = uniq_id_proportion
@@ -70,7 +98,7 @@ class Metrics:
 
         if format_str is not None:
             self.format_str = format_str
-        elif self.continuous_measure_col is not None:
+        elif self.continuous_measure_col is not None or is_ratio:
             self.format_str = CONTINUOUS_MEASURE_FORMAT
         else:
             self.format_str = PROPORTION_FORMAT
@@ -80,9 +108,21 @@ class Metrics:
         else:
             self.relation_format_str = UPLIFT_FORMAT
 
+        self.stats = None
+        self.units = None
+        self.output_df = None
+        self.metrics_df = None
+        self.uplift_ci_df = None
+
+        self.result_cache = None
+        self.cache_key = None
+
     def get_name(self):
         return self.name
 
+    def get_relation_value(self):
+        return self.relation_value
+
     def get_output_col(self):
         if self.continuous_measure_col is not None:
             return self.continuous_measure_col
@@ -92,7 +132,7 @@ class Metrics:
         return METRIC_COL_NAME
 
     def append_mask(self, mask):
-        self.data_df = self.data_df[mask]
+        self.rows = self.get_slice().get_mask_rows(mask)
 
     def append_grouping(self, grouping):
         if self.grouping is not None:
@@ -104,26 +144,55 @@ class Metrics:
         self.grouping = copy(grouping)
 
     def get_data(self):
-        return self.data_df
+        return self.get_slice().to_frame()
+
+    def set_data(self, data_df):
+        self.data_df = data_df
+        self.rows = None
+
+    def rebind_data(self, data_df):
+        self.data_df = data_df
+
+    def get_slice(self):
+        return FrameSlice(self.data_df, self.rows)
+
+    def set_result_cache(self, result_cache, cache_key):
+        self.result_cache = result_cache
+        self.cache_key = cache_key
+
+    def get_cache_key(self, *parts):
+        if self.result_cache is None or self.cache_key is None:
+            return None
+
+        return get_cache_key(self.cache_key, self.grouping, *parts)
 
     def copy(self):
-        return Metrics(
+        metrics = Metrics(
             name=self.name,
             data_df=self.data_df,
+            rows=self.rows,
             grouping=copy(self.grouping),
             format_str=self.format_str,
             outliers=self.outliers,
             outliers_quantile=self.outliers_quantile,
             outliers_quantile_min_value=self.outliers_quantile_min_value,
+            outliers_sketch_error=self.outliers_sketch_error,
             relation_format_str=self.relation_format_str,
             relation_value=self.relation_value,
             continuous_measure_col=self.continuous_measure_col,
             continuous_measure_id_col=self.continuous_measure_id_col,
             is_uniq_id_proportions=self.is_uniq_id_proportions,
+            is_ratio=self.is_ratio,
             nominator_col=self.nominator_col,
             denominator_col=self.denominator_col,
             na_is_zero=self.na_is_zero
         )
+        metrics.set_result_cache(self.result_cache, self.cache_key)
+
+        if self.stats is not None:
+            metrics.set_stats(self.stats, self.units)
+
+        return metrics
 
     def _get_grouping(self, grouping, add_continuous_measure_id_col):
         _grouping = []
@@ -143,23 +212,6 @@ class Metrics:
 
         return _grouping
 
-    def group_data(
-        self,
-        grouping,
-        interm_df,
-        add_continuous_measure_id_col=False
-    ):
-        _grouping = self._get_grouping(
-            grouping,
-            add_continuous_measure_id_col
-        )
-
-        if _grouping is not None:
-            interm_df = interm_df\
-                .groupby(_grouping)
-
-        return interm_df
-
     def get_quantile_df(self, m_df, outliers, grouping=None):
         grp = self._get_grouping(grouping, False)
 
@@ -170,6 +222,26 @@ class Metrics:
             grp_q_df.columns = [QUANTILE_COL_NAME]
 
             return grp_q_df
+        elif outliers in (
+            OUTLIERS_GROUPS_SKETCH_TYPE,
+            OUTLIERS_METRICS_DATA_SKETCH_TYPE
+        ):
+            group_codes, group_index = factorize_columns(
+                m_df.reset_index(),
+                grp
+            )
+
+            return pd.DataFrame(
+                {
+                    QUANTILE_COL_NAME: self.get_outliers_quantiles(
+                        as_float_values(m_df[self.continuous_measure_col]),
+                        group_codes,
+                        len(group_index),
+                        outliers
+                    )
+                },
+                index=group_index
+            )
         elif outliers == OUTLIERS_METRICS_DATA_TYPE:
             grp_q_index = m_df.reset_index()[grp].drop_duplicates()
 
@@ -196,91 +268,396 @@ class Metrics:
         else:
             raise Exception('wrong outliers removing type')
 
-    def remove_outliers(self, grouping, m_df):
+    def remove_outliers(self, units, group_index):
         if self.outliers is None:
-            return m_df
+            return units
 
         if self.outliers_quantile_min_value is not None:
-            no_min_value_m_df = m_df[
-                m_df[self.continuous_measure_col] >
-                    self.outliers_quantile_min_value
-            ]
+            q_values = np.where(
+                units.x > self.outliers_quantile_min_value,
+                units.x,
+                np.nan
+            )
         else:
-            no_min_value_m_df = m_df
-
-        quantile_df = self.get_quantile_df(
-            no_min_value_m_df,
-            outliers=self.outliers,
-            grouping=grouping
+            q_values = units.x
+
+        quantiles = self.get_outliers_quantiles(
+            q_values,
+            units.group_codes,
+            len(group_index),
+            self.outliers
+        )[units.group_codes]
+
+        return units.take(units.x <= quantiles)
+
+    def get_quantile_sketches(self, values, group_codes, n_groups):
+        return QuantileSketch.from_groups(
+            values,
+            group_codes,
+            n_groups,
+            error=self.outliers_sketch_error
         )
 
-        m_joined_q_df = m_df.join(quantile_df)
+    def get_outliers_quantiles(self, values, group_codes, n_groups, outliers):
+        if outliers == OUTLIERS_GROUPS_TYPE:
+            return group_quantiles(
+                values,
+                group_codes,
+                n_groups,
+                self.outliers_quantile
+            )
+        elif outliers == OUTLIERS_METRICS_DATA_TYPE:
+            values = values[~np.isnan(values)]
+
+            return np.full(
+                n_groups,
+                np.quantile(values, self.outliers_quantile)
+                    if len(values) > 0 else np.nan
+            )
+        elif outliers == OUTLIERS_GROUPS_SKETCH_TYPE:
+            return np.array([
+                sketch.quantile(self.outliers_quantile)
+                for sketch in self.get_quantile_sketches(
+                    values,
+                    group_codes,
+                    n_groups
+                )
+            ])
+        elif outliers == OUTLIERS_METRICS_DATA_SKETCH_TYPE:
+            sketch = merge_quantile_sketches(
+                self.get_quantile_sketches(values, group_codes, n_groups),
+                error=self.outliers_sketch_error
+            )
+
+            return np.full(n_groups, sketch.quantile(self.outliers_quantile))
+        else:
+            raise Exception('wrong outliers removing type')
 
-        no_outliers_m_df = m_joined_q_df[
-            m_joined_q_df[self.continuous_measure_col] <= \
-                m_joined_q_df[QUANTILE_COL_NAME]
-        ]
+    def _get_unit_col(self):
+        if self.continuous_measure_id_col is not None \
+            and self.continuous_measure_id_col in self.data_df.columns:
+            return self.continuous_measure_id_col
+
+    def get_unit_grouper(self, grouping=None, mask=None):
+        interm_df = self.get_slice()
+
+        if mask is not None:
+            interm_df = interm_df.filter(mask)
+
+        return UnitGrouper.from_columns(
+            interm_df,
+            self._get_grouping(grouping, False),
+            self._get_unit_col()
+        )
+
+    def calc_units(self, unit_grouper, row_mask=None, keep_empty=False):
+        if self.continuous_measure_col is None:
+            positive_only = self.proportion_func is uniq_id_proportion
+
+            return unit_grouper.get_units(
+                as_float_values(
+                    unit_grouper.get_column(self.nominator_col),
+                    positive_only
+                ),
+                as_float_values(
+                    unit_grouper.get_column(self.denominator_col),
+                    positive_only
+                ),
+                row_mask=row_mask,
+                keep_empty=keep_empty
+            )
 
-        return no_outliers_m_df.drop(columns=quantile_df.columns)
+        return unit_grouper.get_units(
+            as_float_values(
+                unit_grouper.get_column(self.continuous_measure_col)
+            ),
+            row_mask=row_mask,
+            keep_empty=keep_empty
+        )
 
     def calc(
         self,
         mask=None,
         grouping=None,
-        remove_outliers=True
+        remove_outliers=True,
+        unit_grouper=None,
+        row_mask=None
     ):
-        interm_df = self.data_df
+        if unit_grouper is None:
+            unit_grouper = self.get_unit_grouper(grouping, mask)
 
-        if mask is not None:
-            interm_df = interm_df[mask]
+        group_index = unit_grouper.get_group_index()
+
+        self.set_units(
+            self.calc_units(unit_grouper, row_mask),
+            group_index,
+            remove_outliers=remove_outliers
+        )
 
-        interm_df = self.group_data(grouping, interm_df, True)
+        return self.get_output()
 
-        if self.continuous_measure_col is None:
-            output_df = interm_df[[self.nominator_col, self.denominator_col]]\
-                .agg({
-                    self.nominator_col: self.proportion_func,
-                    self.denominator_col: self.proportion_func
-                })
+    def _get_unfiltered_cache_key(self):
+        if self.outliers is None:
+            # units of the metrics entry are not filtered by outliers
+            return self.cache_key if self.result_cache is not None else None
 
-            metrics_df = output_df
+        return self.get_cache_key('unfiltered')
 
-            metrics_df[METRIC_COL_NAME] = (output_df[self.nominator_col] /\
-                output_df[self.denominator_col])
+    def calc_unfiltered(self):
+        if self.outliers is None and self.units is not None:
+            return self.get_output()
 
-        else:
-            output_df = interm_df[[self.continuous_measure_col]].sum()
+        cache_key = self._get_unfiltered_cache_key()
+
+        if cache_key is not None:
+            arrays = self.result_cache.get(cache_key)
+            units = units_from_arrays(arrays) if arrays is not None else None
+
+            if units is not None:
+                self.set_stats(stats_from_arrays(arrays), units)
+                return self.get_output()
+
+        self.calc(remove_outliers=False)
+
+        if cache_key is not None and self.outliers is not None:
+            arrays = stats_to_arrays(self.stats)
+            units_arrays = units_to_arrays(self.units)
+
+            if arrays is not None and units_arrays is not None:
+                arrays.update(units_arrays)
+                self.result_cache.put(cache_key, arrays)
+
+        return self.get_output()
+
+    def set_units(self, units, group_index, remove_outliers=True):
+        if self.continuous_measure_col is not None and remove_outliers:
+            units = self.remove_outliers(units, group_index)
 
-            if remove_outliers:
-                output_df = self.remove_outliers(grouping, output_df)
+        self.set_stats(
+            GroupStats.from_unit_values(units, group_index),
+            units
+        )
+
+    def calc_cumulative(self, timeseries_col):
+        return self._get_period_stats(
+            'cumulative',
+            timeseries_col,
+            self._calc_cumulative
+        )
+
+    def calc_daily(self, timeseries_col):
+        return self._get_period_stats(
+            'daily',
+            timeseries_col,
+            self._calc_daily
+        )
+
+    def _get_period_stats(self, kind, timeseries_col, calc_func):
+        cache_key = self.get_cache_key(kind, timeseries_col)
+
+        if cache_key is not None:
+            arrays = self.result_cache.get(cache_key)
+            if arrays is not None:
+                return stats_from_arrays(arrays), \
+                    index_from_arrays(arrays, 'periods_')
+
+        stats, periods = calc_func(timeseries_col)
+
+        if cache_key is not None:
+            arrays = stats_to_arrays(stats)
+            periods_arrays = index_to_arrays(pd.Index(periods), 'periods_')
+
+            if arrays is not None and periods_arrays is not None:
+                arrays.update(periods_arrays)
+                self.result_cache.put(cache_key, arrays)
+
+        return stats, periods
+
+    def _calc_unit_days(self, timeseries_col):
+        interm_df = self.get_slice()
+
+        group_codes, group_index = factorize_columns(
+            interm_df,
+            self._get_grouping(None, False)
+        )
+        period_codes, periods = pd.factorize(
+            interm_df[timeseries_col],
+            sort=True
+        )
+
+        n_periods = len(periods)
+        group_codes = np.where(
+            (group_codes >= 0) & (period_codes >= 0),
+            group_codes * n_periods + period_codes,
+            -1
+        )
+
+        unit_days = self.calc_units(UnitGrouper(
+            interm_df,
+            group_codes,
+            group_index,
+            self._get_unit_col()
+        ))
+
+        return unit_days, group_index, periods
+
+    def _calc_daily(self, timeseries_col):
+        unit_days, group_index, periods = self._calc_unit_days(timeseries_col)
+
+        if self.continuous_measure_col is not None:
+            unit_days = self.remove_outliers(
+                unit_days,
+                pd.RangeIndex(len(group_index) * len(periods))
+            )
+
+        return period_group_stats(
+            unit_days,
+            group_index,
+            len(periods)
+        ), periods
+
+    def _calc_cumulative(self, timeseries_col):
+        unit_days, group_index, periods = self._calc_unit_days(timeseries_col)
+        n_periods = len(periods)
+
+        if self.continuous_measure_col is None or self.outliers is None:
+            return cumulative_group_stats(
+                unit_days,
+                group_index,
+                n_periods
+            ), periods
+
+        unit_ids, unit_pairs = pd.factorize(
+            (unit_days.group_codes // n_periods)
+                * max(len(unit_days.unit_levels), 1)
+                + unit_days.unit_codes
+        )
+
+        n_units = len(unit_pairs)
+        units = UnitValues(
+            group_codes=unit_pairs // max(len(unit_days.unit_levels), 1),
+            unit_codes=unit_pairs % max(len(unit_days.unit_levels), 1),
+            unit_levels=unit_days.unit_levels,
+            x=np.zeros(n_units)
+        )
+
+        unit_periods = unit_days.group_codes % n_periods
+        order = np.argsort(unit_periods, kind='stable')
+        bounds = np.searchsorted(
+            unit_periods[order],
+            np.arange(n_periods + 1)
+        )
+
+        seen = np.zeros(n_units, dtype=bool)
 
-            metrics_df = output_df
+        stats_list = []
+        for period_code in range(n_periods):
+            period_rows = order[bounds[period_code]:bounds[period_code + 1]]
 
-            metrics_df.index = metrics_df.index.droplevel(
-                [self.continuous_measure_id_col]
+            units.x += np.bincount(
+                unit_ids[period_rows],
+                weights=unit_days.x[period_rows],
+                minlength=n_units
             )
+            seen[unit_ids[period_rows]] = True
 
-            metrics_df = metrics_df.reset_index()
+            stats_list.append(GroupStats.from_unit_values(
+                self.remove_outliers(units.take(seen), group_index),
+                group_index
+            ))
+
+        return stack_group_stats(stats_list), periods
 
-            metrics_df = self.group_data(grouping, metrics_df, False).sum()
+    def set_stats(self, stats, units=None):
+        self.stats = stats
+        self.units = units
+        self.output_df = None
+
+        if self.continuous_measure_col is None:
+            metrics_df = pd.DataFrame(
+                {
+                    self.nominator_col: stats.x_sum,
+                    self.denominator_col: stats.y_sum,
+                    METRIC_COL_NAME: stats.ratio()
+                },
+                index=stats.get_index()
+            )
 
-            columns = []
-            for col in metrics_df.columns:
-                if col == self.continuous_measure_col:
-                    columns.append(METRIC_COL_NAME)
-                else:
-                    columns.append(col)
-            metrics_df.columns = columns
+            self.output_df = metrics_df
+        else:
+            metrics_df = pd.DataFrame(
+                {METRIC_COL_NAME: stats.x_sum},
+                index=stats.get_index()
+            )
 
         self.metrics_df = metrics_df
-        self.output_df = output_df
 
-        return output_df
+    def calc_values(self, x_sum, y_sum=None):
+        if self.continuous_measure_col is not None:
+            return x_sum
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return x_sum / y_sum
+
+    def get_stats(self):
+        return self.stats
+
+    def get_units(self):
+        return self.units
+
+    def set_uplift_ci(self, uplift_ci_df):
+        self.uplift_ci_df = uplift_ci_df
+
+    def get_uplift_ci(self):
+        return self.uplift_ci_df
+
+    def _get_uplift_ci_output(self, use_format):
+        ci_df = self.uplift_ci_df.stack(dropna=False)
+        ci_df.index = list(map(
+            lambda i: str(i[0]) + ' ' + str(i[1]),
+            ci_df.index
+        ))
+
+        ci_df = ci_df.to_frame(METRIC_COL_NAME)
+
+        if use_format:
+            ci_df = ci_df.applymap(self.relation_format_str.format)
+
+        return ci_df
+
+    def _get_units_output(self):
+        units = self.units
+        group_index = self.stats.get_index()
+
+        order = np.lexsort((units.unit_codes, units.group_codes))
+        units = units.take(order)
+
+        group_labels = group_index.take(units.group_codes)
+        if isinstance(group_labels, pd.MultiIndex):
+            levels = [
+                group_labels.get_level_values(i)
+                for i in range(group_labels.nlevels)
+            ]
+        else:
+            levels = [group_labels]
+
+        unit_col = self._get_unit_col()
+
+        return pd.DataFrame(
+            {self.continuous_measure_col: units.x},
+            index=pd.MultiIndex.from_arrays(
+                levels + [units.get_unit_labels()],
+                names=list(group_index.names) + [unit_col]
+            )
+        )
 
     def set_output(self, output_df):
         self.output_df = output_df
 
     def get_output(self):
+        if self.output_df is None and self.units is not None:
+            self.output_df = self._get_units_output()
+
         return self.output_df
 
     def get_calc(
@@ -316,4 +693,10 @@ class Metrics:
 
             foutput_dt = pd.concat([foutput_dt, rel_output_df])
 
+            if self.uplift_ci_df is not None:
+                foutput_dt = pd.concat([
+                    foutput_dt,
+                    self._get_uplift_ci_output(use_format)
+                ])
+
         return foutput_dt
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .ab_hypothesis import ABHypothesis
+from .metrics import Metrics
+from .sufficient_stats import UnitGrouper
+from .sufficient_stats import factorize_columns
+
+
+GROUP_KEY = 'group:'
+UNIT_KEY = 'unit:'
+VALUE_KEY_PREFIX = 'value:'
+MASK_KEY_PREFIX = 'mask:'
+
+_worker_columns = {}
+
+
+def codes_with_na(codes):
+    # missing codes are stored as nan so workers factorize them as missing
+    # values, as the serial path does, instead of as a -1 level
+    return np.where(codes >= 0, codes, np.nan)
+
+
+class SharedColumns:
+    def __init__(self, dirname=None):
+        self.dirname = tempfile.mkdtemp(prefix='burnaby_', dir=dirname)
+        self.paths = {}
+
+    def add(self, key, values):
+        if key in self.paths:
+            return key
+
+        values = np.asarray(values)
+        path = os.path.join(self.dirname, str(len(self.paths)) + '.npy')
+
+        mapped = np.lib.format.open_memmap(
+            path,
+            mode='w+',
+            dtype=values.dtype,
+            shape=values.shape
+        )
+        mapped[:] = values
+        mapped.flush()
+        del mapped
+
+        self.paths[key] = path
+
+        return key
+
+    def get_paths(self):
+        return self.paths
+
+    def close(self):
+        shutil.rmtree(self.dirname, ignore_errors=True)
+
+
+class MappedColumns:
+    def __init__(self, columns, rows=None):
+        self.columns = columns
+        self.rows = rows
+
+    def __len__(self):
+        if self.rows is None:
+            return len(self.columns[GROUP_KEY])
+        return len(self.rows)
+
+    def __getitem__(self, key):
+        if self.rows is None:
+            return np.asarray(self.columns[key])
+        return self.columns[key][self.rows]
+
+
+def _init_worker(paths):
+    _worker_columns.clear()
+
+    for key, path in paths.items():
+        _worker_columns[key] = np.load(path, mmap_mode='r')
+
+
+def _calc_slice_task(task):
+    rows, group_labels, specs = task
+
+    columns = MappedColumns(_worker_columns, rows)
+
+    group_codes, group_index = factorize_columns(columns, [GROUP_KEY])
+    group_index = pd.Index(
+        group_labels.take(np.asarray(group_index, dtype=np.int64)),
+        name=group_labels.name
+    )
+
+    unit_grouper = UnitGrouper(columns, group_codes, group_index, UNIT_KEY)
+
+    results = []
+    for spec in specs:
+        metrics = Metrics(spec['name'], None, **spec['metrics'])
+
+        metrics.calc(
+            unit_grouper=unit_grouper,
+            row_mask=columns[spec['mask']]
+                if spec['mask'] is not None else None
+        )
+
+        pvalues = None
+        if spec['hypothesis'] is not None:
+            pvalues = ABHypothesis(**spec['hypothesis']).calc_pvalues(
+                metrics.get_stats()
+            )
+
+        results.append((metrics.get_stats(), metrics.get_units(), pvalues))
+
+    return results
+
+
+def calc_slices(tasks, shared_columns, n_jobs):
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_init_worker,
+        initargs=(shared_columns.get_paths(),)
+    ) as executor:
+        return list(executor.map(_calc_slice_task, tasks))
@@ -0,0 +1,153 @@
+import numpy as np
+
+from .ab_consts import DEFAULT_QUANTILE_SKETCH_ERROR
+
+
+_CAPACITY_RATIO = 2 / 3
+_MIN_CAPACITY = 2
+_ERROR_SCALE = 2.446
+_ERROR_POWER = 0.9433
+
+
+def get_sketch_size(error):
+    if error is None or error <= 0 or error >= 1:
+        raise ValueError('sketch error should be between 0 and 1')
+
+    return max(
+        _MIN_CAPACITY * 4,
+        int(np.ceil((_ERROR_SCALE / error) ** (1 / _ERROR_POWER)))
+    )
+
+
+class QuantileSketch:
+    def __init__(self, error=DEFAULT_QUANTILE_SKETCH_ERROR, seed=0):
+        self.error = error
+        self.k = get_sketch_size(error)
+        self.rng = np.random.default_rng(seed)
+
+        self.levels = [np.empty(0)]
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _get_capacity(self, level):
+        depth = len(self.levels) - level - 1
+
+        return max(
+            _MIN_CAPACITY,
+            int(np.ceil(self.k * _CAPACITY_RATIO ** depth))
+        )
+
+    def _compact_level(self, level):
+        items = np.sort(self.levels[level])
+
+        n_compacted = len(items) - len(items) % 2
+        offset = self.rng.integers(2)
+
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty(0))
+
+        self.levels[level] = items[n_compacted:]
+        self.levels[level + 1] = np.concatenate([
+            self.levels[level + 1],
+            items[offset:n_compacted:2]
+        ])
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._get_capacity(level):
+                self._compact_level(level)
+                level = 0
+            else:
+                level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            self.levels[level] = np.concatenate([self.levels[level], items])
+
+        self.count += other.count
+        self._compress()
+
+        return self
+
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def get_items(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(items), 2.0 ** level)
+            for level, items in enumerate(self.levels)
+        ])
+
+        order = np.argsort(values, kind='stable')
+
+        return values[order], weights[order]
+
+    def quantile(self, quantile):
+        if self.count == 0:
+            return np.nan
+
+        if self.is_exact():
+            return np.quantile(self.levels[0], quantile)
+
+        values, weights = self.get_items()
+        ranks = np.cumsum(weights)
+
+        position = np.searchsorted(
+            ranks,
+            quantile * ranks[-1],
+            side='left'
+        )
+
+        return values[min(position, len(values) - 1)]
+
+    @staticmethod
+    def from_groups(
+        values,
+        group_codes,
+        n_groups,
+        error=DEFAULT_QUANTILE_SKETCH_ERROR
+    ):
+        values = np.asarray(values, dtype=np.float64)
+
+        valid = ~np.isnan(values) & (group_codes >= 0)
+        values = values[valid]
+        group_codes = group_codes[valid]
+
+        order = np.argsort(group_codes, kind='stable')
+        bounds = np.searchsorted(group_codes[order], np.arange(n_groups + 1))
+
+        return [
+            QuantileSketch(error).update(
+                values[order[bounds[group]:bounds[group + 1]]]
+            )
+            for group in range(n_groups)
+        ]
+
+
+def merge_quantile_sketches(sketches, error=DEFAULT_QUANTILE_SKETCH_ERROR):
+    merged = QuantileSketch(error)
+
+    for sketch in sketches:
+        merged.merge(sketch)
+
+    return merged
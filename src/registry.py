@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class RegistryEntry:
+    def __init__(self, manager):
+        self.manager = manager
+        self.lock = threading.RLock()
+        self.pins = 0
+        self.memory_bytes = manager.get_memory_usage()
+
+    def is_evictable(self):
+        return self.pins == 0 \
+            and self.manager.has_data() \
+            and self.manager.get_data_loader() is not None
+
+    def get_memory_bytes(self):
+        if self.manager.has_data():
+            return self.memory_bytes
+
+        return self.manager.get_retained_memory_usage()
+
+
+class ExperimentRegistry:
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def get_names(self):
+        with self._lock:
+            return list(self._entries)
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def get_memory_usage(self):
+        with self._lock:
+            return sum(
+                entry.get_memory_bytes()
+                for entry in self._entries.values()
+            )
+
+    def register(self, name, manager):
+        with self._lock:
+            self._entries.pop(name, None)
+            self._entries[name] = RegistryEntry(manager)
+            self._evict()
+
+        return manager
+
+    def remove(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+
+        return entry.manager if entry is not None else None
+
+    def update_memory_usage(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+
+        if entry is None:
+            return
+
+        memory_bytes = entry.manager.get_memory_usage()
+
+        with self._lock:
+            entry.memory_bytes = memory_bytes
+            self._evict()
+
+    def evict(self, name):
+        with self._lock:
+            entry = self._entries[name]
+
+            if not entry.is_evictable():
+                raise ValueError(
+                    'ab test ' + str(name) + ' is in use, has no data loader '
+                        'or is already evicted'
+                )
+
+            entry.manager.release_data()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+
+        memory_bytes = sum(
+            entry.get_memory_bytes()
+            for entry in self._entries.values()
+        )
+
+        for entry in list(self._entries.values()):
+            if memory_bytes <= self.max_bytes:
+                break
+
+            if entry.is_evictable():
+                entry.manager.release_data()
+                memory_bytes -= entry.memory_bytes - entry.get_memory_bytes()
+
+    @contextmanager
+    def use(self, name, needs_data=True):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.pins += 1
+                self._entries.move_to_end(name)
+
+        if entry is None:
+            yield None
+            return
+
+        try:
+            with entry.lock:
+                if needs_data and not entry.manager.has_data():
+                    entry.manager.restore_data()
+                    entry.memory_bytes = entry.manager.get_memory_usage()
+
+                    with self._lock:
+                        self._evict()
+
+                yield entry.manager
+        finally:
+            with self._lock:
+                entry.pins -= 1
+                self._evict()
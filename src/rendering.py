@@ -0,0 +1,106 @@
+def display_validation_result(validation_result):
+    from IPython.display import display
+    from IPython.core.display import Markdown
+
+    for agg in validation_result.get_aggregations():
+        display(Markdown('# Aggregation ' + agg.get_name()))
+
+        describe_df = validation_result.get_describe(agg)
+        if describe_df is not None:
+            display(describe_df)
+
+        groups_stats_df = validation_result.get_groups_stats(agg)
+        if groups_stats_df is not None:
+            display(groups_stats_df)
+
+        missing_df = validation_result.get_missing(agg)
+        if missing_df is not None and missing_df.shape[0] > 0:
+            display(Markdown('### Missing values'))
+            display(missing_df)
+
+    srm_df = validation_result.get_srm()
+    if srm_df is not None:
+        display(Markdown('# Sample ratio mismatch'))
+        display(srm_df)
+
+
+def display_metrics_result(
+    metrics_result,
+    hue_col,
+    timeseries_col,
+    draw_charts=True
+):
+    from IPython.display import display
+    from IPython.core.display import Markdown
+
+    metrics = metrics_result.get_metrics()
+    h = metrics_result.get_hypothesis()
+
+    for combination_name in metrics_result.get_untested_groups():
+        display(
+            'not enough data to test "' + h.get_name() +
+            '" hypothesis in groups ' + combination_name +
+            ' - empty result'
+        )
+
+    display(Markdown('### Metrics ' + metrics.get_name()))
+    display(metrics_result.get_report(use_format=True))
+
+    if not draw_charts:
+        return
+
+    from .charts.distribution_chart import DistributionChart
+    from .charts.period_chart import PeriodChart
+    from .charts.pvalue_chart import PValueChart
+
+    PeriodChart(
+        metrics.copy(),
+        hue_col=hue_col,
+        timeseries_col=timeseries_col
+    ).draw()
+
+    if metrics.continuous_measure_col is not None:
+        DistributionChart(
+            metrics.copy(),
+            hue_col=hue_col,
+            outliers=metrics.outliers,
+            outliers_quantile=metrics.outliers_quantile,
+            outliers_quantile_min_value=metrics.outliers_quantile_min_value
+        ).draw()
+
+    if h is not None:
+        PValueChart(
+            metrics.copy(),
+            hue_col,
+            timeseries_col=timeseries_col,
+            hypothesis=h
+        ).draw()
+
+
+def display_metrics_results(
+    metrics_results,
+    hue_col,
+    timeseries_col,
+    silent=False
+):
+    from IPython.display import display
+
+    current_agg = None
+    for metrics_result in metrics_results:
+        if metrics_result.get_aggregation() is not current_agg:
+            current_agg = metrics_result.get_aggregation()
+            display(current_agg.get_formatted_name())
+
+        if not silent:
+            display_metrics_result(metrics_result, hue_col, timeseries_col)
+
+
+def display_report_result(report_result):
+    from IPython.display import display
+
+    for agg in report_result.get_aggregations():
+        display(agg.get_formatted_name())
+
+        display(report_result.get_report(agg))
+
+        display(report_result.get_multiple_hypothesis_report(agg))
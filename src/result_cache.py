@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from .ab_consts import DEFAULT_RESULT_CACHE_MAX_BYTES
+from .ab_consts import RESULT_CACHE_VERSION
+from .sufficient_stats import GroupStats
+from .sufficient_stats import UnitValues
+
+
+_CACHE_FILE_EXT = '.npz'
+_STATS_FIELDS = ['count', 'x_sum', 'x_sq_sum', 'y_sum', 'y_sq_sum', 'xy_sum']
+
+
+def fingerprint_values(values):
+    if isinstance(values, (pd.Series, pd.Index)):
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    else:
+        hashes = np.ascontiguousarray(np.asarray(values))
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(hashes.dtype).encode())
+    digest.update(str(hashes.shape).encode())
+    digest.update(hashes.tobytes())
+
+    return digest.hexdigest()
+
+
+def get_cache_key(*parts):
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(RESULT_CACHE_VERSION).encode())
+
+    for part in parts:
+        digest.update(
+            json.dumps(part, sort_keys=True, default=str).encode()
+        )
+
+    return digest.hexdigest()
+
+
+def _as_plain_array(values):
+    values = np.asarray(values)
+
+    if values.dtype != object:
+        return values
+
+    inferred_type = pd.api.types.infer_dtype(values, skipna=False)
+    if inferred_type == 'string':
+        return values.astype(str)
+    if inferred_type == 'integer':
+        return values.astype(np.int64)
+    if inferred_type == 'floating':
+        return values.astype(np.float64)
+
+    return None
+
+
+def index_to_arrays(index, prefix):
+    if isinstance(index, pd.MultiIndex):
+        levels = [
+            index.get_level_values(i) for i in range(index.nlevels)
+        ]
+    else:
+        levels = [index]
+
+    arrays = {
+        prefix + 'names': np.array(json.dumps(
+            [name if name is None else str(name) for name in index.names]
+        ))
+    }
+
+    for pos, level in enumerate(levels):
+        if isinstance(level.dtype, pd.CategoricalDtype):
+            categories = _as_plain_array(level.categories)
+            if categories is None:
+                return None
+
+            arrays[prefix + 'categories_' + str(pos)] = categories
+            arrays[prefix + 'ordered_' + str(pos)] = np.array(
+                level.dtype.ordered
+            )
+            values = np.asarray(level.codes)
+        else:
+            values = _as_plain_array(level)
+            if values is None:
+                return None
+
+        arrays[prefix + str(pos)] = values
+
+    return arrays
+
+
+def _level_from_arrays(arrays, prefix, pos):
+    values = arrays[prefix + str(pos)]
+
+    categories = arrays.get(prefix + 'categories_' + str(pos))
+    if categories is None:
+        return values
+
+    return pd.Categorical.from_codes(
+        values,
+        categories=categories,
+        ordered=bool(arrays[prefix + 'ordered_' + str(pos)])
+    )
+
+
+def index_from_arrays(arrays, prefix):
+    names = json.loads(str(arrays[prefix + 'names']))
+
+    levels = [
+        _level_from_arrays(arrays, prefix, pos) for pos in range(len(names))
+    ]
+
+    if len(levels) == 1:
+        return pd.Index(levels[0], name=names[0])
+
+    return pd.MultiIndex.from_arrays(levels, names=names)
+
+
+def stats_to_arrays(stats, prefix='stats_'):
+    arrays = index_to_arrays(stats.get_index(), prefix + 'index_')
+    if arrays is None:
+        return None
+
+    for field in _STATS_FIELDS:
+        values = getattr(stats, field)
+        if values is not None:
+            arrays[prefix + field] = np.asarray(values)
+
+    return arrays
+
+
+def stats_from_arrays(arrays, prefix='stats_'):
+    return GroupStats(
+        index_from_arrays(arrays, prefix + 'index_'),
+        **{
+            field: arrays.get(prefix + field)
+            for field in _STATS_FIELDS
+        }
+    )
+
+
+def units_to_arrays(units, prefix='units_'):
+    arrays = index_to_arrays(pd.Index(units.unit_levels), prefix + 'levels_')
+    if arrays is None:
+        return None
+
+    arrays[prefix + 'group_codes'] = units.group_codes
+    arrays[prefix + 'unit_codes'] = units.unit_codes
+    arrays[prefix + 'x'] = units.x
+    if units.y is not None:
+        arrays[prefix + 'y'] = units.y
+
+    return arrays
+
+
+def units_from_arrays(arrays, prefix='units_'):
+    if prefix + 'group_codes' not in arrays:
+        return None
+
+    return UnitValues(
+        group_codes=arrays[prefix + 'group_codes'],
+        unit_codes=arrays[prefix + 'unit_codes'],
+        unit_levels=index_from_arrays(arrays, prefix + 'levels_'),
+        x=arrays[prefix + 'x'],
+        y=arrays.get(prefix + 'y')
+    )
+
+
+class ResultCache:
+    def __init__(self, directory, max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + _CACHE_FILE_EXT)
+
+    def get(self, key):
+        path = self._get_path(key)
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zipfile.BadZipFile):
+            self.remove(key)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return arrays
+
+    def put(self, key, arrays):
+        if arrays is None:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.directory,
+            suffix=_CACHE_FILE_EXT + '.tmp'
+        )
+
+        try:
+            with os.fdopen(fd, 'wb') as fcache:
+                np.savez(fcache, **arrays)
+
+            os.replace(tmp_path, self._get_path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.evict()
+
+    def remove(self, key):
+        try:
+            os.remove(self._get_path(key))
+        except OSError:
+            pass
+
+    def get_entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(_CACHE_FILE_EXT):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        return sorted(entries)
+
+    def get_size(self):
+        return sum(size for _, size, _ in self.get_entries())
+
+    def evict(self):
+        entries = self.get_entries()
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total_size -= size
+
+    def clear(self):
+        for _, _, path in self.get_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from .ab_consts import H_PVALUE_KEY
+from .ab_consts import R_AGGREGATION_COL
+from .ab_consts import V_SRM_MISMATCH_KEY
+
+
+def get_metrics_report(metrics_df, h_df):
+    rep_df = metrics_df.copy()
+
+    pvalue_cols = list(map(
+        lambda c: c + ' pvalue',
+        h_df.columns
+    ))
+
+    if h_df.shape[0] > 0:
+        pvalue_df = h_df[h_df.index == H_PVALUE_KEY]
+        pvalue_df.index = metrics_df.index
+
+        rep_df[pvalue_cols] = pvalue_df
+    elif len(pvalue_cols) > 0:
+        rep_df[pvalue_cols] = \
+            pd.DataFrame([np.NaN] * rep_df.shape[0], index=rep_df.index)
+
+    return rep_df
+
+
+class MetricsResult:
+    def __init__(self, agg, metrics, hypothesis=None):
+        self.agg = agg
+        self.metrics = metrics
+        self.hypothesis = hypothesis
+
+    def get_aggregation(self):
+        return self.agg
+
+    def get_metrics(self):
+        return self.metrics
+
+    def get_hypothesis(self):
+        return self.hypothesis
+
+    def get_name(self):
+        return self.metrics.get_name()
+
+    def get_values(self, use_format=False):
+        return self.metrics.get_calc(
+            calc_relation=True,
+            use_format=use_format
+        )
+
+    def get_test(self):
+        if self.hypothesis is None:
+            return None
+        return self.hypothesis.get_test()
+
+    def get_untested_groups(self):
+        h_df = self.get_test()
+        if h_df is None:
+            return []
+        return list(h_df.index[h_df[H_PVALUE_KEY].isna()])
+
+    def get_report(self, use_format=True):
+        h_df = self.get_test()
+
+        return get_metrics_report(
+            self.get_values(use_format=use_format).T,
+            h_df.T if h_df is not None else pd.DataFrame()
+        )
+
+    def __repr__(self):
+        return self.agg.get_full_name() + ': ' + self.get_name()
+
+
+class ValidationResult:
+    def __init__(self):
+        self.aggregations = []
+        self.describe_by_agg = {}
+        self.groups_stats_by_agg = {}
+        self.missing_by_agg = {}
+        self.srm_df = None
+
+    def add(
+        self,
+        agg,
+        describe_df=None,
+        groups_stats_df=None,
+        missing_df=None
+    ):
+        self.aggregations.append(agg)
+        self.describe_by_agg[agg.get_full_name()] = describe_df
+        self.groups_stats_by_agg[agg.get_full_name()] = groups_stats_df
+        self.missing_by_agg[agg.get_full_name()] = missing_df
+
+    def set_describe(self, agg, describe_df):
+        self.describe_by_agg[agg.get_full_name()] = describe_df
+
+    def set_srm(self, srm_df):
+        self.srm_df = srm_df
+
+    def get_aggregations(self):
+        return self.aggregations
+
+    def get_describe(self, agg):
+        return self.describe_by_agg[agg.get_full_name()]
+
+    def get_groups_stats(self, agg):
+        return self.groups_stats_by_agg[agg.get_full_name()]
+
+    def get_missing(self, agg):
+        return self.missing_by_agg[agg.get_full_name()]
+
+    def get_srm(self, agg=None):
+        if agg is None or self.srm_df is None:
+            return self.srm_df
+
+        return self.srm_df.loc[[agg.get_full_name()]]
+
+    def get_srm_mismatches(self):
+        if self.srm_df is None:
+            return None
+
+        return self.srm_df[self.srm_df[V_SRM_MISMATCH_KEY]]
+
+
+class ReportResult:
+    def __init__(self, aggregations, report_df, report_mh_df):
+        self.aggregations = aggregations
+        self.report_df = report_df
+        self.report_mh_df = report_mh_df
+
+    def get_aggregations(self):
+        return self.aggregations
+
+    def get_report(self, agg=None):
+        return self._get_agg_df(self.report_df, agg)
+
+    def get_multiple_hypothesis_report(self, agg=None):
+        return self._get_agg_df(self.report_mh_df, agg)
+
+    def _get_agg_df(self, report_df, agg):
+        if agg is None or report_df is None or report_df.shape[0] == 0:
+            return report_df
+
+        return report_df[
+            report_df[R_AGGREGATION_COL] == agg.get_full_name()
+        ].drop(columns=[R_AGGREGATION_COL])
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+
+class SliceIndex:
+    def __init__(self, data_df, col):
+        self.col = col
+        self.positions = data_df.groupby(
+            col,
+            sort=False,
+            observed=True
+        ).indices
+
+    def get_col(self):
+        return self.col
+
+    def get_values(self):
+        return list(self.positions.keys())
+
+    def get_positions(self, value):
+        return self.positions[value]
+
+
+class FrameSlice:
+    def __init__(self, data_df, rows=None):
+        self.data_df = data_df
+        self.rows = rows
+
+    @property
+    def columns(self):
+        return self.data_df.columns
+
+    def __len__(self):
+        if self.rows is None:
+            return len(self.data_df)
+        return len(self.rows)
+
+    def __getitem__(self, col):
+        values = self.data_df[col].array
+
+        if self.rows is None:
+            return values
+        return values.take(self.rows)
+
+    def get_rows(self):
+        return self.rows
+
+    def to_frame(self):
+        if self.rows is None:
+            return self.data_df
+        return self.data_df.take(self.rows)
+
+    def get_mask_values(self, mask):
+        if isinstance(mask, pd.Series):
+            if mask.index.equals(self.data_df.index):
+                pass
+            elif self.data_df.index.has_duplicates \
+                or mask.index.has_duplicates:
+
+                raise ValueError(
+                    'mask with duplicate index labels must have the same '
+                        'index as the ab test data'
+                )
+            else:
+                mask = mask.reindex(self.data_df.index, fill_value=False)
+
+            mask = mask.to_numpy(dtype=bool, na_value=False)
+        else:
+            mask = np.asarray(mask, dtype=bool)
+
+        if self.rows is not None and len(mask) == len(self.data_df):
+            return mask[self.rows]
+
+        return mask
+
+    def get_mask_rows(self, mask):
+        mask = self.get_mask_values(mask)
+
+        if self.rows is None:
+            return np.flatnonzero(mask)
+
+        return self.rows[mask]
+
+    def filter(self, mask):
+        return FrameSlice(self.data_df, self.get_mask_rows(mask))
@@ -0,0 +1,560 @@
+import numpy as np
+import pandas as pd
+
+
+def factorize_columns(data_df, cols):
+    if cols is None or len(cols) == 0:
+        return np.zeros(len(data_df), dtype=np.int64), pd.RangeIndex(1)
+
+    codes_list = []
+    levels = []
+    for col in cols:
+        codes, uniques = pd.factorize(data_df[col], sort=True)
+        codes_list.append(codes.astype(np.int64))
+        levels.append(uniques)
+
+    if len(cols) == 1:
+        return codes_list[0], pd.Index(levels[0], name=cols[0])
+
+    valid = np.logical_and.reduce([codes >= 0 for codes in codes_list])
+    dims = tuple(max(len(level), 1) for level in levels)
+
+    flat = np.full(len(data_df), -1, dtype=np.int64)
+    flat[valid] = np.ravel_multi_index(
+        [codes[valid] for codes in codes_list],
+        dims
+    )
+
+    uniq_flat, inverse = np.unique(flat[valid], return_inverse=True)
+
+    group_codes = np.full(len(data_df), -1, dtype=np.int64)
+    group_codes[valid] = inverse
+
+    level_codes = np.unravel_index(uniq_flat, dims)
+    group_index = pd.MultiIndex.from_arrays(
+        [
+            pd.Index(level).take(codes)
+            for level, codes in zip(levels, level_codes)
+        ],
+        names=cols
+    )
+
+    return group_codes, group_index
+
+
+def as_float_values(values, positive_only=False):
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(
+        dtype=np.float64,
+        na_value=np.nan
+    )
+
+    if positive_only:
+        return (values > 0).astype(np.float64)
+
+    return np.nan_to_num(values, nan=0.0)
+
+
+def group_quantiles(values, group_codes, n_groups, quantile):
+    result = np.full(n_groups, np.nan)
+
+    valid = ~np.isnan(values) & (group_codes >= 0)
+    values = values[valid]
+    group_codes = group_codes[valid]
+
+    if len(values) == 0:
+        return result
+
+    order = np.lexsort((values, group_codes))
+    sorted_values = values[order]
+
+    counts = np.bincount(group_codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    present = counts > 0
+    position = quantile * (counts[present] - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    fraction = position - low
+
+    low_values = sorted_values[starts[present] + low]
+    high_values = sorted_values[starts[present] + high]
+
+    result[present] = low_values + (high_values - low_values) * fraction
+
+    return result
+
+
+def group_quantile_grid(values, group_codes, n_groups, quantiles):
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    result = np.full((n_groups, len(quantiles)), np.nan)
+
+    valid = ~np.isnan(values) & (group_codes >= 0)
+    values = values[valid]
+    group_codes = group_codes[valid]
+
+    if len(values) == 0:
+        return result
+
+    order = np.lexsort((values, group_codes))
+    sorted_values = values[order]
+
+    counts = np.bincount(group_codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    present = counts > 0
+    position = quantiles[np.newaxis, :] \
+        * (counts[present, np.newaxis] - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    fraction = position - low
+
+    low_values = sorted_values[starts[present, np.newaxis] + low]
+    high_values = sorted_values[starts[present, np.newaxis] + high]
+
+    result[present] = low_values + (high_values - low_values) * fraction
+
+    return result
+
+
+def group_histograms(values, group_codes, n_groups, bin_edges):
+    n_bins = len(bin_edges) - 1
+
+    valid = ~np.isnan(values) & (group_codes >= 0)
+    values = values[valid]
+    group_codes = group_codes[valid]
+
+    bins = np.clip(
+        np.searchsorted(bin_edges, values, side='right') - 1,
+        0,
+        n_bins - 1
+    )
+
+    return np.bincount(
+        group_codes * n_bins + bins,
+        minlength=n_groups * n_bins
+    ).reshape(n_groups, n_bins)
+
+
+class UnitValues:
+    def __init__(
+        self,
+        group_codes,
+        unit_codes,
+        unit_levels,
+        x,
+        y=None
+    ):
+        self.group_codes = group_codes
+        self.unit_codes = unit_codes
+        self.unit_levels = unit_levels
+        self.x = x
+        self.y = y
+
+    def __len__(self):
+        return len(self.group_codes)
+
+    def take(self, mask):
+        return UnitValues(
+            group_codes=self.group_codes[mask],
+            unit_codes=self.unit_codes[mask],
+            unit_levels=self.unit_levels,
+            x=self.x[mask],
+            y=self.y[mask] if self.y is not None else None
+        )
+
+    def get_unit_labels(self):
+        return pd.Index(self.unit_levels).take(self.unit_codes)
+
+
+def merge_unit_values(units, group_index, new_units, new_group_index):
+    merged_index = group_index
+    if not new_group_index.isin(group_index).all():
+        merged_index = group_index.append(new_group_index).unique()\
+            .sort_values()
+
+    unit_levels = pd.Index(np.asarray(units.unit_levels))
+    new_unit_levels = pd.Index(np.asarray(new_units.unit_levels))
+    merged_levels = unit_levels.union(new_unit_levels)
+    n_levels = max(len(merged_levels), 1)
+
+    group_codes = merged_index.get_indexer(group_index)[units.group_codes]
+    unit_codes = merged_levels.get_indexer(unit_levels)[units.unit_codes]
+
+    new_group_codes = merged_index.get_indexer(new_group_index)[
+        new_units.group_codes
+    ]
+    new_unit_codes = merged_levels.get_indexer(new_unit_levels)[
+        new_units.unit_codes
+    ]
+
+    positions = pd.Index(group_codes * n_levels + unit_codes).get_indexer(
+        new_group_codes * n_levels + new_unit_codes
+    )
+    found = positions >= 0
+    added = ~found
+
+    def _merge(values, new_values):
+        if values is None:
+            return None
+
+        values = values.copy()
+        values[positions[found]] += new_values[found]
+
+        return np.concatenate([values, new_values[added]])
+
+    merged_units = UnitValues(
+        group_codes=np.concatenate([group_codes, new_group_codes[added]]),
+        unit_codes=np.concatenate([unit_codes, new_unit_codes[added]]),
+        unit_levels=merged_levels,
+        x=_merge(units.x, new_units.x),
+        y=_merge(units.y, new_units.y)
+    )
+
+    return merged_units, merged_index
+
+
+class UnitGrouper:
+    def __init__(
+        self,
+        frame_slice,
+        group_codes,
+        group_index,
+        unit_col=None
+    ):
+        self.frame_slice = frame_slice
+        self.group_codes = group_codes
+        self.group_index = group_index
+        self.columns = {}
+
+        if unit_col is not None:
+            unit_codes, self.unit_levels = pd.factorize(
+                self.get_column(unit_col),
+                sort=True
+            )
+            unit_codes = unit_codes.astype(np.int64)
+        else:
+            unit_codes = np.arange(len(frame_slice), dtype=np.int64)
+            self.unit_levels = pd.RangeIndex(len(frame_slice))
+
+        self.valid = (group_codes >= 0) & (unit_codes >= 0)
+
+        self.n_unit_levels = max(len(self.unit_levels), 1)
+        pair_codes, self.pairs = pd.factorize(
+            group_codes[self.valid] * self.n_unit_levels
+                + unit_codes[self.valid]
+        )
+
+        self.pair_codes = np.full(len(frame_slice), -1, dtype=np.int64)
+        self.pair_codes[self.valid] = pair_codes
+
+    @staticmethod
+    def from_columns(frame_slice, grouping, unit_col=None):
+        group_codes, group_index = factorize_columns(frame_slice, grouping)
+
+        return UnitGrouper(frame_slice, group_codes, group_index, unit_col)
+
+    def get_group_index(self):
+        return self.group_index
+
+    def get_column(self, col):
+        if col not in self.columns:
+            self.columns[col] = self.frame_slice[col]
+
+        return self.columns[col]
+
+    def get_row_mask(self, mask):
+        return self.frame_slice.get_mask_values(mask)
+
+    def get_pair_counts(self, row_mask=None):
+        rows = self.valid
+        if row_mask is not None:
+            rows = rows & row_mask
+
+        return np.bincount(self.pair_codes[rows], minlength=len(self.pairs))
+
+    def get_units(self, x, y=None, row_mask=None, keep_empty=False):
+        n_units = len(self.pairs)
+
+        rows = self.valid
+        if row_mask is not None:
+            rows = rows & row_mask
+
+        pair_codes = self.pair_codes[rows]
+
+        def _unit_sum(weights):
+            return np.bincount(
+                pair_codes,
+                weights=weights[rows] if weights is not None else None,
+                minlength=n_units
+            )
+
+        units = UnitValues(
+            group_codes=self.pairs // self.n_unit_levels,
+            unit_codes=self.pairs % self.n_unit_levels,
+            unit_levels=self.unit_levels,
+            x=_unit_sum(x),
+            y=_unit_sum(y) if y is not None else None
+        )
+
+        if row_mask is not None and not keep_empty:
+            units = units.take(_unit_sum(None) > 0)
+
+        return units
+
+
+class GroupStats:
+    def __init__(
+        self,
+        index,
+        count,
+        x_sum,
+        x_sq_sum,
+        y_sum=None,
+        y_sq_sum=None,
+        xy_sum=None
+    ):
+        self.index = index
+        self.count = count
+        self.x_sum = x_sum
+        self.x_sq_sum = x_sq_sum
+        self.y_sum = y_sum
+        self.y_sq_sum = y_sq_sum
+        self.xy_sum = xy_sum
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def has_ratio(self):
+        return self.y_sum is not None
+
+    def get_loc(self, key):
+        return self.index.get_loc(key)
+
+    def get_index(self):
+        return self.index
+
+    def x_mean(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.x_sum / self.count
+
+    def x_var(self, ddof=1):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = (self.x_sq_sum - self.x_sum ** 2 / self.count) \
+                / (self.count - ddof)
+
+        return np.where(self.count > ddof, np.maximum(var, 0), np.nan)
+
+    def y_var(self, ddof=1):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = (self.y_sq_sum - self.y_sum ** 2 / self.count) \
+                / (self.count - ddof)
+
+        return np.where(self.count > ddof, np.maximum(var, 0), np.nan)
+
+    def xy_cov(self, ddof=1):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self.xy_sum - self.x_sum * self.y_sum / self.count) \
+                / (self.count - ddof)
+
+        return np.where(self.count > ddof, cov, np.nan)
+
+    def ratio(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.x_sum / self.y_sum
+
+    def ratio_var(self):
+        ratio = self.ratio()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_mean = self.y_sum / self.count
+
+            var = (
+                self.x_var()
+                - 2 * ratio * self.xy_cov()
+                + ratio ** 2 * self.y_var()
+            ) / (self.count * y_mean ** 2)
+
+        return np.where(np.isfinite(var), np.maximum(var, 0), np.nan)
+
+    def reindex(self, index):
+        indexer = self.index.get_indexer(index)
+        present = indexer >= 0
+
+        def _reindex(values):
+            if values is None:
+                return None
+            return np.where(present, values[indexer], 0.0)
+
+        return GroupStats(
+            index,
+            count=_reindex(self.count),
+            x_sum=_reindex(self.x_sum),
+            x_sq_sum=_reindex(self.x_sq_sum),
+            y_sum=_reindex(self.y_sum),
+            y_sq_sum=_reindex(self.y_sq_sum),
+            xy_sum=_reindex(self.xy_sum)
+        )
+
+    @staticmethod
+    def from_unit_values(units, group_index):
+        n_groups = len(group_index)
+        codes = units.group_codes
+
+        def _sum(weights):
+            return np.bincount(codes, weights=weights, minlength=n_groups)
+
+        if units.y is None:
+            return GroupStats(
+                group_index,
+                count=_sum(None).astype(np.float64),
+                x_sum=_sum(units.x),
+                x_sq_sum=_sum(units.x ** 2)
+            )
+
+        return GroupStats(
+            group_index,
+            count=_sum(None).astype(np.float64),
+            x_sum=_sum(units.x),
+            x_sq_sum=_sum(units.x ** 2),
+            y_sum=_sum(units.y),
+            y_sq_sum=_sum(units.y ** 2),
+            xy_sum=_sum(units.x * units.y)
+        )
+
+    def to_frame(self):
+        columns = {
+            'count': self.count,
+            'x_sum': self.x_sum,
+            'x_sq_sum': self.x_sq_sum
+        }
+
+        if self.has_ratio():
+            columns.update({
+                'y_sum': self.y_sum,
+                'y_sq_sum': self.y_sq_sum,
+                'xy_sum': self.xy_sum
+            })
+
+        return pd.DataFrame(columns, index=self.index)
+
+
+def _segment_cumsum(values, segment_starts):
+    cumsum = np.cumsum(values)
+    start_positions = np.maximum.accumulate(
+        np.where(segment_starts, np.arange(len(values)), 0)
+    )
+
+    return cumsum - (cumsum[start_positions] - values[start_positions])
+
+
+def cumulative_group_stats(unit_days, group_index, n_periods):
+    n_groups = len(group_index)
+
+    group_codes = unit_days.group_codes // n_periods
+    period_codes = unit_days.group_codes % n_periods
+
+    unit_ids, _ = pd.factorize(
+        group_codes * max(len(unit_days.unit_levels), 1) + unit_days.unit_codes
+    )
+
+    order = np.lexsort((period_codes, unit_ids))
+    unit_ids = unit_ids[order]
+    cells = group_codes[order] * n_periods + period_codes[order]
+
+    segment_starts = np.ones(len(unit_ids), dtype=bool)
+    segment_starts[1:] = unit_ids[1:] != unit_ids[:-1]
+
+    x = unit_days.x[order]
+    cum_x = _segment_cumsum(x, segment_starts)
+    prev_x = cum_x - x
+
+    def _cum_sum(weights):
+        return np.bincount(
+            cells,
+            weights=weights,
+            minlength=n_groups * n_periods
+        ).reshape(n_groups, n_periods).cumsum(axis=1)
+
+    if unit_days.y is None:
+        return GroupStats(
+            group_index,
+            count=_cum_sum(segment_starts.astype(np.float64)),
+            x_sum=_cum_sum(x),
+            x_sq_sum=_cum_sum(cum_x ** 2 - prev_x ** 2)
+        )
+
+    y = unit_days.y[order]
+    cum_y = _segment_cumsum(y, segment_starts)
+    prev_y = cum_y - y
+
+    return GroupStats(
+        group_index,
+        count=_cum_sum(segment_starts.astype(np.float64)),
+        x_sum=_cum_sum(x),
+        x_sq_sum=_cum_sum(cum_x ** 2 - prev_x ** 2),
+        y_sum=_cum_sum(y),
+        y_sq_sum=_cum_sum(cum_y ** 2 - prev_y ** 2),
+        xy_sum=_cum_sum(cum_x * cum_y - prev_x * prev_y)
+    )
+
+
+def period_group_stats(unit_days, group_index, n_periods):
+    n_groups = len(group_index)
+
+    stats = GroupStats.from_unit_values(
+        unit_days,
+        pd.RangeIndex(n_groups * n_periods)
+    )
+
+    def _reshape(values):
+        if values is None:
+            return None
+        return values.reshape(n_groups, n_periods)
+
+    return GroupStats(
+        group_index,
+        count=_reshape(stats.count),
+        x_sum=_reshape(stats.x_sum),
+        x_sq_sum=_reshape(stats.x_sq_sum),
+        y_sum=_reshape(stats.y_sum),
+        y_sq_sum=_reshape(stats.y_sq_sum),
+        xy_sum=_reshape(stats.xy_sum)
+    )
+
+
+def rolling_sums(values, window):
+    cumsum = np.cumsum(values, axis=-1)
+
+    sums = cumsum.copy()
+    sums[..., window:] -= cumsum[..., :-window]
+
+    return sums
+
+
+def stack_group_stats(stats_list, align=False):
+    if align:
+        index = stats_list[0].get_index()
+        for stats in stats_list[1:]:
+            index = index.union(stats.get_index())
+
+        stats_list = [stats.reindex(index) for stats in stats_list]
+
+    first = stats_list[0]
+
+    def _stack(field):
+        if getattr(first, field) is None:
+            return None
+        return np.stack([getattr(s, field) for s in stats_list], axis=-1)
+
+    return GroupStats(
+        first.get_index(),
+        count=_stack('count'),
+        x_sum=_stack('x_sum'),
+        x_sq_sum=_stack('x_sq_sum'),
+        y_sum=_stack('y_sum'),
+        y_sq_sum=_stack('y_sq_sum'),
+        xy_sum=_stack('xy_sum')
+    )
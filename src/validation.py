@@ -0,0 +1,265 @@
+import numpy as np
+import pandas as pd
+
+from .ab_consts import V_MISSING_TOTAL_COL
+from .ab_consts import V_SRM_MISMATCH_KEY
+from .ab_consts import V_SRM_PVALUE_KEY
+from .ab_consts import V_SRM_STATISTIC_KEY
+from .ab_consts import VALIDATION_TYPE__GROUPS_PER_UNIQ_ID
+from .ab_consts import VALIDATION_TYPE__MISSING_VALUES
+from .ab_consts import VALIDATION_TYPE__SAMPLE_RATIO_MISMATCH
+from .sufficient_stats import factorize_columns
+
+
+def srm_pvalues(observed, expected_ratios):
+    from scipy.stats import chi2
+
+    observed = np.asarray(observed, dtype=np.float64)
+    expected_ratios = np.asarray(expected_ratios, dtype=np.float64)
+    expected_ratios = expected_ratios / expected_ratios.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = observed.sum(axis=-1, keepdims=True) * expected_ratios
+
+        # units in an arm that was expected to get none are a mismatch
+        chi2_stat = np.where(
+            expected > 0,
+            (observed - expected) ** 2 / expected,
+            np.where(observed > 0, np.inf, 0.0)
+        ).sum(axis=-1)
+
+    pvalues = chi2.sf(
+        chi2_stat,
+        max(np.count_nonzero(expected_ratios > 0) - 1, 1)
+    )
+    is_empty = observed.sum(axis=-1) == 0
+
+    return np.where(is_empty, np.nan, chi2_stat), \
+        np.where(is_empty, np.nan, pvalues)
+
+
+def get_slice_sets(aggregations, n_rows):
+    slice_sets = []
+
+    aggs = None
+    for agg in aggregations:
+        if aggs is None or agg.get_positions() is None \
+            or aggs[-1].get_positions() is None \
+            or agg.get_name() != aggs[-1].get_name() \
+            or agg.get_value() in agg_values:
+            aggs = []
+            agg_values = set()
+            slice_codes = np.full(n_rows, -1, dtype=np.int64)
+            slice_sets.append((aggs, slice_codes))
+
+        positions = agg.get_positions()
+        if positions is None:
+            slice_codes[:] = 0
+        else:
+            slice_codes[positions] = len(aggs)
+
+        aggs.append(agg)
+        agg_values.add(agg.get_value())
+
+    return slice_sets
+
+
+class SliceValidator:
+    def __init__(self, data_df, abgroup_col, uniq_id_col):
+        self.data_df = data_df
+        self.abgroup_col = abgroup_col
+        self.uniq_id_col = uniq_id_col
+
+        self.group_codes, self.group_index = factorize_columns(
+            data_df,
+            [abgroup_col]
+        )
+        self.n_groups = max(len(self.group_index), 1)
+
+        self.unit_codes, unit_levels = factorize_columns(
+            data_df,
+            [uniq_id_col]
+        )
+        self.n_units = max(len(unit_levels), 1)
+
+        self.missing = None
+
+    def get_group_index(self):
+        return self.group_index
+
+    def get_missing(self):
+        if self.missing is None:
+            self.missing = {}
+
+            for col in self.data_df.columns:
+                is_missing = self.data_df[col].isna().to_numpy()
+                if is_missing.any():
+                    self.missing[col] = is_missing
+
+        return self.missing
+
+    def get_unit_counts(self, slice_codes, n_slices):
+        valid = (slice_codes >= 0) \
+            & (self.group_codes >= 0) \
+            & (self.unit_codes >= 0)
+
+        triples = pd.unique(
+            (slice_codes[valid] * self.n_units + self.unit_codes[valid])
+                * self.n_groups
+                + self.group_codes[valid]
+        )
+
+        slice_units = triples // self.n_groups
+        triple_slices = slice_units // self.n_units
+
+        units_per_group = np.bincount(
+            triple_slices * self.n_groups + triples % self.n_groups,
+            minlength=n_slices * self.n_groups
+        ).reshape(n_slices, self.n_groups)
+
+        slice_unit_codes, slice_unit_pairs = pd.factorize(slice_units)
+        groups_per_unit = np.bincount(slice_unit_codes)
+
+        units_per_groups_count = np.bincount(
+            (slice_unit_pairs // self.n_units) * (self.n_groups + 1)
+                + groups_per_unit,
+            minlength=n_slices * (self.n_groups + 1)
+        ).reshape(n_slices, self.n_groups + 1)
+
+        return units_per_group, units_per_groups_count
+
+    def get_missing_counts(self, slice_codes, n_slices):
+        valid = slice_codes >= 0
+        cells = np.where(
+            self.group_codes >= 0,
+            slice_codes * (self.n_groups + 1) + self.group_codes,
+            slice_codes * (self.n_groups + 1) + self.n_groups
+        )[valid]
+
+        return {
+            col: np.bincount(
+                cells,
+                weights=is_missing[valid],
+                minlength=n_slices * (self.n_groups + 1)
+            ).reshape(n_slices, self.n_groups + 1)
+            for col, is_missing in self.get_missing().items()
+        }
+
+    def get_groups_stats_df(self, units_per_groups_count):
+        n_groups = np.flatnonzero(units_per_groups_count)
+
+        return pd.DataFrame({
+            self.abgroup_col: n_groups,
+            self.uniq_id_col: units_per_groups_count[n_groups]
+        })
+
+    def get_missing_df(self, missing_counts, slice_pos):
+        cols = [
+            col for col, counts in missing_counts.items()
+            if counts[slice_pos].sum() > 0
+        ]
+
+        counts = np.array(
+            [missing_counts[col][slice_pos] for col in cols],
+            dtype=np.int64
+        ).reshape(len(cols), self.n_groups + 1)
+
+        missing_df = pd.DataFrame(
+            counts[:, :len(self.group_index)],
+            index=pd.Index(cols),
+            columns=self.group_index
+        )
+        missing_df[V_MISSING_TOTAL_COL] = counts.sum(axis=1)
+
+        return missing_df
+
+    def get_srm_df(
+        self,
+        aggs,
+        units_per_group,
+        expected_ratios,
+        significance_level
+    ):
+        units_per_group = units_per_group[:, :len(self.group_index)]
+        statistics, pvalues = srm_pvalues(units_per_group, expected_ratios)
+
+        srm_df = pd.DataFrame(
+            units_per_group,
+            index=pd.Index([agg.get_full_name() for agg in aggs]),
+            columns=self.group_index
+        )
+        srm_df[V_SRM_STATISTIC_KEY] = statistics
+        srm_df[V_SRM_PVALUE_KEY] = pvalues
+        srm_df[V_SRM_MISMATCH_KEY] = pvalues < significance_level
+
+        return srm_df
+
+    def get_expected_ratios(self, expected_group_ratios=None):
+        if expected_group_ratios is None:
+            return np.ones(len(self.group_index))
+
+        ratios = np.array([
+            expected_group_ratios.get(group, 0)
+            for group in self.group_index
+        ], dtype=np.float64)
+
+        if (ratios < 0).any() or ratios.sum() <= 0:
+            raise ValueError('expected group ratios should be positive')
+
+        return ratios
+
+    def validate(
+        self,
+        aggregations,
+        validation_result,
+        validators,
+        expected_group_ratios,
+        srm_significance_level
+    ):
+        check_units = VALIDATION_TYPE__GROUPS_PER_UNIQ_ID in validators \
+            or VALIDATION_TYPE__SAMPLE_RATIO_MISMATCH in validators
+        check_missing = VALIDATION_TYPE__MISSING_VALUES in validators
+        check_srm = VALIDATION_TYPE__SAMPLE_RATIO_MISMATCH in validators
+
+        srm_aggs = []
+        srm_units_per_group = []
+
+        for aggs, slice_codes in get_slice_sets(
+            aggregations,
+            len(self.data_df)
+        ):
+            if check_units:
+                units_per_group, units_per_groups_count = \
+                    self.get_unit_counts(slice_codes, len(aggs))
+
+            if check_missing:
+                missing_counts = self.get_missing_counts(
+                    slice_codes,
+                    len(aggs)
+                )
+
+            for slice_pos, agg in enumerate(aggs):
+                validation_result.add(
+                    agg,
+                    groups_stats_df=self.get_groups_stats_df(
+                        units_per_groups_count[slice_pos]
+                    )
+                        if VALIDATION_TYPE__GROUPS_PER_UNIQ_ID in validators
+                        else None,
+                    missing_df=self.get_missing_df(missing_counts, slice_pos)
+                        if check_missing else None
+                )
+
+            if check_srm:
+                srm_aggs += aggs
+                srm_units_per_group.append(units_per_group)
+
+        if check_srm and len(srm_aggs) > 0:
+            validation_result.set_srm(self.get_srm_df(
+                srm_aggs,
+                np.concatenate(srm_units_per_group),
+                self.get_expected_ratios(expected_group_ratios),
+                srm_significance_level
+            ))
+
+        return validation_result